@@ -28,6 +28,8 @@ const monthlyBasicInfoRoutes = require('./routes/monthlyBasicInfo')
 const prisonsRoutes = require('./routes/prisons')
 const checklistItemsRoutes = require('./routes/checklistItems')
 const compilationRoutes = require('./routes/compilation')
+const criminalReportWorkerPool = require('./utils/criminalReportWorkerPool')
+const templateRenderService = require('./utils/templateRenderService')
 
 const app = express()
 const PORT = process.env.PORT || 3000
@@ -110,6 +112,11 @@ async function startServer() {
             console.log(`✅ 服务器运行在 http://localhost:${PORT}`)
             console.log(`   健康检查: http://localhost:${PORT}/api/health`)
         })
+
+        // 预热犯情动态解析进程
+        criminalReportWorkerPool.warmUp()
+        // 预加载报告模板
+        templateRenderService.warmUp()
     } catch (error) {
         console.error('❌ 启动失败:', error)
         process.exit(1)
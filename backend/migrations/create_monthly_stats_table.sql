@@ -0,0 +1,32 @@
+-- ====================================
+-- 月度统计汇总表
+-- 按用户和月份汇总日/周/月检察记录中的各项次数，记录增删改时由模型钩子增量更新
+-- 建表后执行 npm run stats:rebuild 从已有记录回填
+-- ====================================
+
+CREATE TABLE IF NOT EXISTS monthly_stats (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  user_id INT NOT NULL COMMENT '用户ID',
+  report_month VARCHAR(7) NOT NULL COMMENT '统计月份 YYYY-MM',
+  daily_log_count INT NOT NULL DEFAULT 0 COMMENT '日检察记录数',
+  weekly_record_count INT NOT NULL DEFAULT 0 COMMENT '周检察记录数',
+  monthly_record_count INT NOT NULL DEFAULT 0 COMMENT '月检察记录数',
+  three_scene_checks INT NOT NULL DEFAULT 0 COMMENT '三大现场检察次数',
+  monitor_checks INT NOT NULL DEFAULT 0 COMMENT '监控抽查次数',
+  key_location_checks INT NOT NULL DEFAULT 0 COMMENT '重点场所（医院、禁闭室）检察次数',
+  total_talks INT NOT NULL DEFAULT 0 COMMENT '谈话总数',
+  new_admission_talks INT NOT NULL DEFAULT 0 COMMENT '新入监罪犯谈话数',
+  evil_talks INT NOT NULL DEFAULT 0 COMMENT '涉恶罪犯谈话数',
+  injury_talks INT NOT NULL DEFAULT 0 COMMENT '外伤罪犯谈话数',
+  confinement_talks INT NOT NULL DEFAULT 0 COMMENT '禁闭罪犯谈话数',
+  mailbox_opens INT NOT NULL DEFAULT 0 COMMENT '开启检察官信箱次数',
+  letters_received INT NOT NULL DEFAULT 0 COMMENT '收到信件数',
+  visit_checks INT NOT NULL DEFAULT 0 COMMENT '会见检察次数',
+  latest_log_id INT NULL COMMENT '当月最后一篇日志的ID',
+  latest_log_date DATE NULL COMMENT '当月最后一篇日志的日期',
+  strict_control_total INT NOT NULL DEFAULT 0 COMMENT '严管禁闭总人数（最后一篇日志）',
+  gang_prisoners_total INT NOT NULL DEFAULT 0 COMMENT '涉黑罪犯总人数（最后一篇日志）',
+  created_at DATETIME NOT NULL,
+  updated_at DATETIME NOT NULL,
+  UNIQUE KEY unique_stats_user_month (user_id, report_month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='月度统计汇总表';
@@ -0,0 +1,77 @@
+/**
+ * MonthlyStats 模型
+ * 月度统计汇总表 - 按用户和月份汇总日/周/月检察记录中的各项次数，
+ * 记录增删改时增量更新（见 utils/monthlyStats.js）。个人统计读取一行，
+ * 派驻单位的统计为该单位各用户的行之和
+ */
+const { DataTypes } = require('sequelize')
+
+module.exports = (sequelize) => {
+    const counter = (comment) => ({
+        type: DataTypes.INTEGER,
+        allowNull: false,
+        defaultValue: 0,
+        comment
+    })
+
+    const MonthlyStats = sequelize.define('MonthlyStats', {
+        id: {
+            type: DataTypes.INTEGER,
+            primaryKey: true,
+            autoIncrement: true
+        },
+        user_id: {
+            type: DataTypes.INTEGER,
+            allowNull: false,
+            comment: '用户ID'
+        },
+        report_month: {
+            type: DataTypes.STRING(7),
+            allowNull: false,
+            comment: '统计月份 YYYY-MM'
+        },
+        // 记录数
+        daily_log_count: counter('日检察记录数'),
+        weekly_record_count: counter('周检察记录数'),
+        monthly_record_count: counter('月检察记录数'),
+        // 日检察
+        three_scene_checks: counter('三大现场检察次数'),
+        monitor_checks: counter('监控抽查次数'),
+        // 周检察
+        key_location_checks: counter('重点场所（医院、禁闭室）检察次数'),
+        total_talks: counter('谈话总数'),
+        new_admission_talks: counter('新入监罪犯谈话数'),
+        evil_talks: counter('涉恶罪犯谈话数'),
+        injury_talks: counter('外伤罪犯谈话数'),
+        confinement_talks: counter('禁闭罪犯谈话数'),
+        mailbox_opens: counter('开启检察官信箱次数'),
+        letters_received: counter('收到信件数'),
+        // 月检察
+        visit_checks: counter('会见检察次数'),
+        // 当月最后一篇日志中的在册人数
+        latest_log_id: {
+            type: DataTypes.INTEGER,
+            allowNull: true,
+            comment: '当月最后一篇日志的ID'
+        },
+        latest_log_date: {
+            type: DataTypes.DATEONLY,
+            allowNull: true,
+            comment: '当月最后一篇日志的日期'
+        },
+        strict_control_total: counter('严管禁闭总人数（最后一篇日志）'),
+        gang_prisoners_total: counter('涉黑罪犯总人数（最后一篇日志）')
+    }, {
+        tableName: 'monthly_stats',
+        comment: '月度统计汇总表',
+        indexes: [
+            {
+                unique: true,
+                fields: ['user_id', 'report_month'],
+                name: 'unique_stats_user_month'
+            }
+        ]
+    })
+
+    return MonthlyStats
+}
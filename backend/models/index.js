@@ -44,6 +44,7 @@ const Blacklist = require('./Blacklist')(sequelize)
 const CriminalReport = require('./CriminalReport')(sequelize)
 const ReportChecklistItem = require('./ReportChecklistItem')(sequelize)
 const MonthlyBasicInfo = require('./MonthlyBasicInfo')(sequelize)
+const MonthlyStats = require('./MonthlyStats')(sequelize)
 const CompilationCategory = require('./CompilationCategory')(sequelize)
 const CompilationDocument = require('./CompilationDocument')(sequelize)
 
@@ -83,6 +84,9 @@ CompilationCategory.hasMany(CompilationDocument, {
     as: 'documents'
 })
 
+// 日/周/月检察记录增删改时增量更新月度统计汇总
+require('../utils/monthlyStats').registerStatsHooks({ DailyLog, WeeklyRecord, MonthlyRecord })
+
 module.exports = {
     sequelize,
     Sequelize,
@@ -104,6 +108,7 @@ module.exports = {
     CriminalReport,
     ReportChecklistItem,
     MonthlyBasicInfo,
+    MonthlyStats,
     // 汇编功能
     CompilationCategory,
     CompilationDocument
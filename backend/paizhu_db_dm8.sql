@@ -64,6 +64,12 @@ CREATE SEQUENCE seq_monthly_records_id START WITH 1 INCREMENT BY 1;
 -- 表: monthly_records
 CREATE TABLE monthly_records ( id INT DEFAULT NEXT VALUE FOR seq_monthly_records_id(11) NOT NULL , user_id int(11) NOT NULL COMMENT '用户ID', record_month varchar(7) NOT NULL COMMENT '记录月份 YYYY-MM', visit_check json NULL COMMENT '会见检察', meeting json NULL COMMENT '会议参加情况', punishment json NULL COMMENT '处分监督', position_stats json NULL COMMENT '岗位增减统计', notes text NULL COMMENT '备注', created_at datetime NOT NULL, updated_at datetime NOT NULL, log_id int(11) NULL DEFAULT NULL COMMENT '关联的日志ID', log_date date NULL DEFAULT NULL COMMENT '关联的日志日期', PRIMARY KEY (id) , INDEX idx_user_id(user_id ASC) , INDEX idx_record_month(record_month ASC) , INDEX monthly_records_user_id(user_id ASC) , INDEX monthly_records_record_month(record_month ASC) , INDEX idx_monthly_records_log_id(log_id ASC) , INDEX idx_monthly_records_log_date(log_date ASC) , INDEX monthly_records_log_id(log_id ASC) , INDEX monthly_records_log_date(log_date ASC) , CONSTRAINT monthly_records_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE ) = 3 COMMENT = '月检察记录表' ;
 
+-- 序列: monthly_stats
+CREATE SEQUENCE seq_monthly_stats_id START WITH 1 INCREMENT BY 1;
+
+-- 表: monthly_stats
+CREATE TABLE monthly_stats ( id INT DEFAULT NEXT VALUE FOR seq_monthly_stats_id(11) NOT NULL , user_id int(11) NOT NULL COMMENT '用户ID', report_month varchar(7) NOT NULL COMMENT '统计月份 YYYY-MM', daily_log_count int(11) NOT NULL DEFAULT 0 COMMENT '日检察记录数', weekly_record_count int(11) NOT NULL DEFAULT 0 COMMENT '周检察记录数', monthly_record_count int(11) NOT NULL DEFAULT 0 COMMENT '月检察记录数', three_scene_checks int(11) NOT NULL DEFAULT 0 COMMENT '三大现场检察次数', monitor_checks int(11) NOT NULL DEFAULT 0 COMMENT '监控抽查次数', key_location_checks int(11) NOT NULL DEFAULT 0 COMMENT '重点场所（医院、禁闭室）检察次数', total_talks int(11) NOT NULL DEFAULT 0 COMMENT '谈话总数', new_admission_talks int(11) NOT NULL DEFAULT 0 COMMENT '新入监罪犯谈话数', evil_talks int(11) NOT NULL DEFAULT 0 COMMENT '涉恶罪犯谈话数', injury_talks int(11) NOT NULL DEFAULT 0 COMMENT '外伤罪犯谈话数', confinement_talks int(11) NOT NULL DEFAULT 0 COMMENT '禁闭罪犯谈话数', mailbox_opens int(11) NOT NULL DEFAULT 0 COMMENT '开启检察官信箱次数', letters_received int(11) NOT NULL DEFAULT 0 COMMENT '收到信件数', visit_checks int(11) NOT NULL DEFAULT 0 COMMENT '会见检察次数', latest_log_id int(11) NULL DEFAULT NULL COMMENT '当月最后一篇日志的ID', latest_log_date date NULL DEFAULT NULL COMMENT '当月最后一篇日志的日期', strict_control_total int(11) NOT NULL DEFAULT 0 COMMENT '严管禁闭总人数（最后一篇日志）', gang_prisoners_total int(11) NOT NULL DEFAULT 0 COMMENT '涉黑罪犯总人数（最后一篇日志）', created_at datetime NOT NULL, updated_at datetime NOT NULL, PRIMARY KEY (id) , UNIQUE INDEX unique_stats_user_month(user_id ASC, report_month ASC) ) COMMENT = '月度统计汇总表' ;
+
 -- 序列: prisoners
 CREATE SEQUENCE seq_prisoners_id START WITH 1 INCREMENT BY 1;
 
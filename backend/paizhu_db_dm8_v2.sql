@@ -24,6 +24,7 @@ CREATE SEQUENCE SEQ_MAIL_RECORDS_ID START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE SEQ_MONTHLY_ARCHIVES_ID START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE SEQ_MONTHLY_BASIC_INFO_ID START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE SEQ_MONTHLY_RECORDS_ID START WITH 1 INCREMENT BY 1;
+CREATE SEQUENCE SEQ_MONTHLY_STATS_ID START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE SEQ_PRISONERS_ID START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE SEQ_RESTRAINT_USAGES_ID START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE SEQ_STRICT_EDUCATIONS_ID START WITH 1 INCREMENT BY 1;
@@ -65,6 +66,9 @@ CREATE TABLE monthly_basic_info ( id INT NOT NULL DEFAULT SEQ_MONTHLY_BASIC_INFO
 -- 表: monthly_records
 CREATE TABLE monthly_records ( id INT NOT NULL DEFAULT SEQ_MONTHLY_RECORDS_ID.NEXTVAL, user_id INT NOT NULL COMMENT '用户ID', record_month varchar(7) NOT NULL COMMENT '记录月份 YYYY-MM', visit_check TEXT NULL COMMENT '会见检察', meeting TEXT NULL COMMENT '会议参加情况', punishment TEXT NULL COMMENT '处分监督', position_stats TEXT NULL COMMENT '岗位增减统计', notes text NULL COMMENT '备注', created_at datetime NOT NULL, updated_at datetime NOT NULL, log_id INT NULL DEFAULT NULL COMMENT '关联的日志ID', log_date date NULL DEFAULT NULL COMMENT '关联的日志日期', PRIMARY KEY (id) , INDEX idx_user_id(user_id ASC) , INDEX idx_record_month(record_month ASC) , INDEX monthly_records_user_id(user_id ASC) , INDEX monthly_records_record_month(record_month ASC) , INDEX idx_monthly_records_log_id(log_id ASC) , INDEX idx_monthly_records_log_date(log_date ASC) , INDEX monthly_records_log_id(log_id ASC) , INDEX monthly_records_log_date(log_date ASC) , CONSTRAINT monthly_records_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE ) CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '月检察记录表';
 
+-- 表: monthly_stats
+CREATE TABLE monthly_stats ( id INT NOT NULL DEFAULT SEQ_MONTHLY_STATS_ID.NEXTVAL, user_id INT NOT NULL COMMENT '用户ID', report_month varchar(7) NOT NULL COMMENT '统计月份 YYYY-MM', daily_log_count INT NOT NULL DEFAULT 0 COMMENT '日检察记录数', weekly_record_count INT NOT NULL DEFAULT 0 COMMENT '周检察记录数', monthly_record_count INT NOT NULL DEFAULT 0 COMMENT '月检察记录数', three_scene_checks INT NOT NULL DEFAULT 0 COMMENT '三大现场检察次数', monitor_checks INT NOT NULL DEFAULT 0 COMMENT '监控抽查次数', key_location_checks INT NOT NULL DEFAULT 0 COMMENT '重点场所（医院、禁闭室）检察次数', total_talks INT NOT NULL DEFAULT 0 COMMENT '谈话总数', new_admission_talks INT NOT NULL DEFAULT 0 COMMENT '新入监罪犯谈话数', evil_talks INT NOT NULL DEFAULT 0 COMMENT '涉恶罪犯谈话数', injury_talks INT NOT NULL DEFAULT 0 COMMENT '外伤罪犯谈话数', confinement_talks INT NOT NULL DEFAULT 0 COMMENT '禁闭罪犯谈话数', mailbox_opens INT NOT NULL DEFAULT 0 COMMENT '开启检察官信箱次数', letters_received INT NOT NULL DEFAULT 0 COMMENT '收到信件数', visit_checks INT NOT NULL DEFAULT 0 COMMENT '会见检察次数', latest_log_id INT NULL DEFAULT NULL COMMENT '当月最后一篇日志的ID', latest_log_date date NULL DEFAULT NULL COMMENT '当月最后一篇日志的日期', strict_control_total INT NOT NULL DEFAULT 0 COMMENT '严管禁闭总人数（最后一篇日志）', gang_prisoners_total INT NOT NULL DEFAULT 0 COMMENT '涉黑罪犯总人数（最后一篇日志）', created_at datetime NOT NULL, updated_at datetime NOT NULL, PRIMARY KEY (id) , UNIQUE INDEX unique_stats_user_month(user_id ASC, report_month ASC) ) CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci COMMENT = '月度统计汇总表';
+
 -- 表: prisoners
 CREATE TABLE prisoners ( id INT NOT NULL DEFAULT SEQ_PRISONERS_ID.NEXTVAL, prisoner_id varchar(20) NOT NULL COMMENT '罪犯编号，如 1000000001', name varchar(50) NOT NULL COMMENT '罪犯姓名', gender varchar(10) NULL DEFAULT NULL COMMENT '性别', birth_date date NULL DEFAULT NULL COMMENT '出生日期', ethnicity varchar(20) NULL DEFAULT NULL COMMENT '民族', education varchar(50) NULL DEFAULT NULL COMMENT '文化程度', sentence_type varchar(50) NULL DEFAULT NULL COMMENT '刑种，如有期徒刑、无期徒刑', crime varchar(200) NULL DEFAULT NULL COMMENT '罪名', original_term varchar(20) NULL DEFAULT NULL COMMENT '原判刑期，格式如 10_06_00', term_start date NULL DEFAULT NULL COMMENT '刑期起日', term_end date NULL DEFAULT NULL COMMENT '刑期止日', prison_unit varchar(100) NULL DEFAULT NULL COMMENT '所属单位（监狱名称）', prison_area varchar(50) NULL DEFAULT NULL COMMENT '所属监区', native_place varchar(100) NULL DEFAULT NULL COMMENT '籍贯/国籍', political_status varchar(50) NULL DEFAULT NULL COMMENT '捕前面貌', admission_date date NULL DEFAULT NULL COMMENT '入监日期', created_at datetime NOT NULL, updated_at datetime NOT NULL, PRIMARY KEY (id) , UNIQUE INDEX prisoner_id(prisoner_id ASC) , UNIQUE INDEX prisoners_prisoner_id(prisoner_id ASC) , UNIQUE INDEX prisoner_id_2(prisoner_id ASC) , UNIQUE INDEX prisoner_id_3(prisoner_id ASC) , UNIQUE INDEX prisoner_id_4(prisoner_id ASC) , UNIQUE INDEX prisoner_id_5(prisoner_id ASC) , UNIQUE INDEX prisoner_id_6(prisoner_id ASC) , UNIQUE INDEX prisoner_id_7(prisoner_id ASC) , UNIQUE INDEX prisoner_id_8(prisoner_id ASC) , UNIQUE INDEX prisoner_id_9(prisoner_id ASC) , UNIQUE INDEX prisoner_id_10(prisoner_id ASC) , UNIQUE INDEX prisoner_id_11(prisoner_id ASC) , UNIQUE INDEX prisoner_id_12(prisoner_id ASC) , UNIQUE INDEX prisoner_id_13(prisoner_id ASC) , UNIQUE INDEX prisoner_id_14(prisoner_id ASC) , UNIQUE INDEX prisoner_id_15(prisoner_id ASC) , UNIQUE INDEX prisoner_id_16(prisoner_id ASC) , UNIQUE INDEX prisoner_id_17(prisoner_id ASC) , UNIQUE INDEX prisoner_id_18(prisoner_id ASC) , UNIQUE INDEX prisoner_id_19(prisoner_id ASC) , UNIQUE INDEX prisoner_id_20(prisoner_id ASC) , UNIQUE INDEX prisoner_id_21(prisoner_id ASC) , UNIQUE INDEX prisoner_id_22(prisoner_id ASC) , UNIQUE INDEX prisoner_id_23(prisoner_id ASC) , UNIQUE INDEX prisoner_id_24(prisoner_id ASC) , UNIQUE INDEX prisoner_id_25(prisoner_id ASC) , UNIQUE INDEX prisoner_id_26(prisoner_id ASC) , UNIQUE INDEX prisoner_id_27(prisoner_id ASC) , UNIQUE INDEX prisoner_id_28(prisoner_id ASC) , INDEX prisoners_prison_unit(prison_unit ASC) , INDEX prisoners_prison_area(prison_area ASC) ) CHARACTER SET = utf8mb4 COLLATE = utf8mb4_unicode_ci;
 
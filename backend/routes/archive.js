@@ -6,8 +6,10 @@ const express = require('express')
 const router = express.Router()
 const path = require('path')
 const fs = require('fs')
-const archiver = require('archiver')
-const { MonthlyArchive, User, DailyLog, Attachment, WeeklyRecord, MonthlyRecord, ImmediateEvent } = require('../models')
+const { hashKey, fileStamp, isArchiveCurrent, buildArchive, removeArchive } = require('../utils/archiveBuilder')
+const { loadMonthSnapshot } = require('../utils/monthSnapshot')
+const { getMonthlyStats } = require('../utils/monthlyStats')
+const { MonthlyArchive, User, DailyLog, Attachment, ImmediateEvent } = require('../models')
 const { authenticateToken, requireRole } = require('../middleware/auth')
 const multer = require('multer')
 const { Op } = require('sequelize')
@@ -405,10 +407,7 @@ router.delete('/:id', async (req, res) => {
 
         // 删除关联的文件
         if (archive.archive_url) {
-            const archivePath = path.join(__dirname, '..', archive.archive_url)
-            if (fs.existsSync(archivePath)) {
-                fs.unlinkSync(archivePath)
-            }
+            removeArchive(path.join(__dirname, '..', archive.archive_url))
         }
 
         if (archive.signature_url) {
@@ -427,8 +426,68 @@ router.delete('/:id', async (req, res) => {
     }
 })
 
+/**
+ * 附件对应的归档条目：来源指纹取文件路径、大小和修改时间，文件不存在时返回 null
+ */
+function attachmentEntry(att, name) {
+    const filePath = path.isAbsolute(att.file_path) ? att.file_path : path.join(__dirname, '..', att.file_path)
+    let stat
+    try {
+        stat = fs.statSync(filePath)
+    } catch (e) {
+        return null
+    }
+    return {
+        name,
+        key: hashKey('file', name, filePath, stat.size, stat.mtimeMs),
+        time: stat.mtimeMs,
+        load: () => ({ file: filePath })
+    }
+}
+
+/**
+ * 数据行转为参与指纹计算的普通对象
+ */
+function rowData(row) {
+    return row && typeof row.toJSON === 'function' ? row.toJSON() : row
+}
+
+/**
+ * 归档记录的指纹（不含生成归档包时回写的 archive_url 和更新时间）
+ */
+function archiveStamp(archive) {
+    const { archive_url, updatedAt, updated_at, ...data } = rowData(archive)
+    return hashKey('archive', data)
+}
+
+// 归档包边生成边下载（设为 off 时先生成完整的归档包再下载）
+const STREAM_DOWNLOAD = process.env.ARCHIVE_STREAM !== 'off'
+
+// 生成文档的代码和模板，变化后已生成的文档全部重新生成
+const RENDER_SOURCES = [
+    path.join(__dirname, '../utils/templateGenerator.js'),
+    path.join(__dirname, '../utils/docxGenerator.js'),
+    path.join(__dirname, '../utils/immediateEventGenerator.js'),
+    path.join(__dirname, '../scripts/replace_template.py')
+]
+const TEMPLATE_DIR = path.join(__dirname, '../muban')
+
+function renderVersion() {
+    let templates = []
+    try {
+        templates = fs.readdirSync(TEMPLATE_DIR)
+            .filter(name => name.endsWith('.docx'))
+            .map(name => path.join(TEMPLATE_DIR, name))
+    } catch (e) {
+        // 模板目录不存在时只按代码计算
+    }
+    return fileStamp([...RENDER_SOURCES, ...templates])
+}
+
 /**
  * 生成并下载压缩包
+ * 归档包按条目增量生成（见 utils/archiveBuilder.js）：数据没有改动的日志、事件和附件直接复用上次压缩好的数据，
+ * 已审批且记录没有变化的归档包直接下载已生成的文件；其他情况下各条目并行生成，边生成边写入响应
  */
 router.get('/download/:id', async (req, res) => {
     try {
@@ -452,177 +511,76 @@ router.get('/download/:id', async (req, res) => {
             }
         }
 
-        // 创建压缩包
         const archiveName = `${archive.prison_name}_${archive.year}年${archive.month}月归档.zip`
         const archivePath = path.join(__dirname, '../uploads/archives', archiveName)
+        const archiveUrl = `/uploads/archives/${archiveName}`
+        const stamp = archiveStamp(archive)
 
-        // 确保目录存在
-        const archiveDir = path.dirname(archivePath)
-        if (!fs.existsSync(archiveDir)) {
-            fs.mkdirSync(archiveDir, { recursive: true })
-        }
-
-        // 如果文件已存在,先删除(避免权限问题)
-        if (fs.existsSync(archivePath)) {
-            try {
-                fs.unlinkSync(archivePath)
-                console.log('已删除旧的归档文件:', archivePath)
-            } catch (unlinkError) {
-                console.error('删除旧归档文件失败:', unlinkError.message)
-                return res.status(500).json({ 
-                    success: false, 
-                    message: '归档文件被占用,请关闭后重试' 
-                })
-            }
-        }
-
-        const output = fs.createWriteStream(archivePath)
-        const zipArchive = archiver('zip', { zlib: { level: 9 } })
-
-        // 错误处理
-        output.on('error', (err) => {
-            console.error('文件写入错误:', err)
-            res.status(500).json({ 
-                success: false, 
-                message: '归档文件创建失败: ' + err.message 
-            })
-        })
-
-        zipArchive.on('error', (err) => {
-            console.error('压缩错误:', err)
-            res.status(500).json({ 
-                success: false, 
-                message: '压缩失败: ' + err.message 
-            })
-        })
-
-        output.on('close', async () => {
-            // 更新归档记录
-            await archive.update({ archive_url: `/uploads/archives/${archiveName}` })
-
-            console.log('✓ 归档包生成成功:', archiveName)
-            
-            // 尝试获取文件大小(可能会失败,不影响主流程)
-            try {
-                const fileSize = (fs.statSync(archivePath).size / 1024 / 1024).toFixed(2)
-                console.log('  文件大小:', fileSize, 'MB')
-            } catch (statError) {
-                console.log('  (无法获取文件大小)')
-            }
-
-            // 发送文件
+        const sendArchive = () => {
             res.download(archivePath, archiveName, (err) => {
                 if (err) {
                     console.error('文件下载失败:', err)
                 }
             })
-        })
-
-        zipArchive.pipe(output)
+        }
 
-        console.log('开始生成归档包:', archiveName)
+        // 已审批的归档内容不再变化，归档包已生成过时直接下载
+        if (archive.status === 'approved' && isArchiveCurrent(archivePath, stamp)) {
+            console.log('✓ 使用已生成的归档包:', archiveName)
+            return sendArchive()
+        }
 
-        // 获取同一派驻单位的所有用户ID
-        const usersInSamePrison = await User.findAll({
-            where: { prison_name: archive.prison_name },
-            attributes: ['id']
-        })
-        const userIds = usersInSamePrison.map(u => u.id)
+        // 确保目录存在
+        fs.mkdirSync(path.dirname(archivePath), { recursive: true })
 
-        // 获取当月所有日志
-        const startDate = `${archive.year}-${String(archive.month).padStart(2, '0')}-01`;
-        const endDate = archive.month === 12
-            ? `${archive.year + 1}-01-01`
-            : `${archive.year}-${String(archive.month + 1).padStart(2, '0')}-01`;
+        console.log('开始生成归档包:', archiveName)
+        const version = renderVersion()
+        const entries = []
 
-        const dailyLogs = await DailyLog.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                log_date: {
-                    [Op.gte]: startDate,
-                    [Op.lt]: endDate
-                }
-            },
-            order: [['log_date', 'ASC']]
-        })
+        // 一次读取当月全部数据和附件（见 utils/monthSnapshot.js），下面各部分都从快照取数据
+        const snapshot = await loadMonthSnapshot(archive.prison_name, archive.year, archive.month)
+        const {
+            dailyLogs, weeklyRecords, monthlyRecords, immediateEvents, otherAttachments,
+            basicInfo, criminalReport, checklistItems
+        } = snapshot
+        const targetMonth = snapshot.targetMonth
 
         // 生成日志Word文档（优先使用模板）
         const { generateLogFromTemplate } = require('../utils/templateGenerator')
         const { generateLogDocx } = require('../utils/docxGenerator')
 
-        // 先获取当月的周/月检察记录（用于关联到日志）
-        const weeklyRecordsForLogs = await WeeklyRecord.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                record_date: {
-                    [Op.gte]: new Date(archive.year, archive.month - 1, 1),
-                    [Op.lt]: new Date(archive.year, archive.month, 1)
-                }
-            }
-        })
-        const monthlyRecordsForLogs = await MonthlyRecord.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                record_month: `${archive.year}-${String(archive.month).padStart(2, '0')}`
-            }
-        })
+        // 日志文档用到当月的周/月检察记录，它们变化时日志文档也重新生成
+        const logContextKey = hashKey(weeklyRecords.map(rowData), monthlyRecords.map(rowData))
 
-        // 生成日检察日志文档 + 附件(按日期组织)
+        // 日检察日志文档 + 附件(按日期组织)
         for (const log of dailyLogs) {
             try {
-                // 生成日志Word文档
-                let docBuffer
-                try {
-                    docBuffer = await generateLogFromTemplate(log, weeklyRecordsForLogs, monthlyRecordsForLogs)
-                } catch (templateError) {
-                    console.log('模板生成失败，使用默认生成器:', templateError.message)
-                    docBuffer = await generateLogDocx(log)
-                }
-
                 const dateStr = log.log_date ? new Date(log.log_date).toISOString().split('T')[0] : 'unknown'
-                zipArchive.append(docBuffer, { name: `01-日检察/${dateStr}_日检察日志.docx` })
-                
-                // 查找该日志的附件(通过related_log_id关联)
-                const logAttachments = await Attachment.findAll({
-                    where: {
-                        related_log_type: 'daily',
-                        related_log_id: log.id
+                const name = `01-日检察/${dateStr}_日检察日志.docx`
+                entries.push({
+                    name,
+                    key: hashKey('daily', name, version, logContextKey, rowData(log)),
+                    load: async () => {
+                        try {
+                            return await generateLogFromTemplate(log, weeklyRecords, monthlyRecords)
+                        } catch (templateError) {
+                            console.log('模板生成失败，使用默认生成器:', templateError.message)
+                            return { buffer: await generateLogDocx(log), transient: true }
+                        }
                     }
                 })
                 
-                // 添加该日志的附件到对应日期文件夹
-                if (logAttachments.length > 0) {
-                    for (const att of logAttachments) {
-                        let filePath
-                        if (path.isAbsolute(att.file_path)) {
-                            filePath = att.file_path
-                        } else {
-                            filePath = path.join(__dirname, '..', att.file_path)
-                        }
-                        
-                        if (fs.existsSync(filePath)) {
-                            zipArchive.file(filePath, { name: `01-日检察/${dateStr}_附件/${att.original_name}` })
-                        }
-                    }
+                // 添加该日志的附件(通过related_log_id关联)到对应日期文件夹
+                for (const att of snapshot.recordAttachments('daily', log.id)) {
+                    const entry = attachmentEntry(att, `01-日检察/${dateStr}_附件/${att.original_name}`)
+                    if (entry) entries.push(entry)
                 }
             } catch (e) {
                 console.error('生成日志文档失败:', e)
             }
         }
 
-        // 获取及时检察事件
-        const immediateEvents = await ImmediateEvent.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                event_date: {
-                    [Op.gte]: new Date(archive.year, archive.month - 1, 1),
-                    [Op.lt]: new Date(archive.year, archive.month, 1)
-                }
-            },
-            order: [['event_date', 'ASC']]
-        })
-
-        // 生成及时检察事件文档 + 附件(按日期和类型组织)
+        // 及时检察事件文档 + 附件(按日期和类型组织)
         const { generateImmediateEventDocument } = require('../utils/immediateEventGenerator')
         const eventTypeMap = {
             'escape': '脱逃',
@@ -636,43 +594,42 @@ router.get('/download/:id', async (req, res) => {
         
         for (const event of immediateEvents) {
             try {
-                const docBuffer = await generateImmediateEventDocument(event)
                 const dateStr = event.event_date ? new Date(event.event_date).toISOString().split('T')[0] : 'unknown'
                 const eventTypeName = eventTypeMap[event.event_type] || '未分类'
                 const eventTitle = event.title || '无标题'
                 
                 // 文件名: 日期_类型_标题.docx
-                zipArchive.append(docBuffer, { name: `04-及时检察/${dateStr}_${eventTypeName}_${eventTitle}.docx` })
+                const name = `04-及时检察/${dateStr}_${eventTypeName}_${eventTitle}.docx`
+                entries.push({
+                    name,
+                    key: hashKey('event', name, version, rowData(event)),
+                    load: () => generateImmediateEventDocument(event)
+                })
                 
                 // 添加该事件的附件到对应文件夹
-                if (event.attachment_ids && event.attachment_ids.length > 0) {
-                    const eventAttachments = await Attachment.findAll({
-                        where: {
-                            id: { [Op.in]: event.attachment_ids }
-                        }
-                    })
-                    
-                    for (const att of eventAttachments) {
-                        let filePath
-                        if (path.isAbsolute(att.file_path)) {
-                            filePath = att.file_path
-                        } else {
-                            filePath = path.join(__dirname, '..', att.file_path)
-                        }
-                        
-                        if (fs.existsSync(filePath)) {
-                            // 附件放在: 04-及时检察/日期_类型_附件/文件名
-                            zipArchive.file(filePath, { name: `04-及时检察/${dateStr}_${eventTypeName}_附件/${att.original_name}` })
-                        }
-                    }
+                for (const att of snapshot.eventAttachments(event)) {
+                    // 附件放在: 04-及时检察/日期_类型_附件/文件名
+                    const entry = attachmentEntry(att, `04-及时检察/${dateStr}_${eventTypeName}_附件/${att.original_name}`)
+                    if (entry) entries.push(entry)
                 }
             } catch (e) {
                 console.error('生成及时检察文档失败:', e)
             }
         }
 
-        // 添加归档说明
-        const readmeContent = `${archive.prison_name} ${archive.year}年${archive.month}月工作归档
+        // 添加归档说明（内容变化时才重新生成，生成时间为内容最后一次变化的时间）
+        const readmeInfo = {
+            prison: archive.prison_name,
+            year: archive.year,
+            month: archive.month,
+            counts: [dailyLogs.length, weeklyRecords.length, monthlyRecords.length, immediateEvents.length],
+            status: archive.status,
+            reviewedAt: archive.reviewed_at
+        }
+        entries.push({
+            name: 'README.txt',
+            key: hashKey('readme', readmeInfo),
+            load: () => Buffer.from(`${archive.prison_name} ${archive.year}年${archive.month}月工作归档
 
 ================================================================================
                               归档内容说明
@@ -689,8 +646,8 @@ router.get('/download/:id', async (req, res) => {
 
 二、数据统计
   日检察记录: ${dailyLogs.length} 条
-  周检察记录: ${weeklyRecordsForLogs.length} 条
-  月检察记录: ${monthlyRecordsForLogs.length} 条
+  周检察记录: ${weeklyRecords.length} 条
+  月检察记录: ${monthlyRecords.length} 条
   及时检察事件: ${immediateEvents.length} 件
   
 三、审批状态
@@ -707,277 +664,190 @@ router.get('/download/:id', async (req, res) => {
 2. 及时检察按"日期_类型"组织,便于快速查找
 3. 所有附件保持原文件名,便于识别
 ================================================================================
-`
-        zipArchive.append(readmeContent, { name: 'README.txt' })
+`)
+        })
 
         // 添加签名
         if (archive.signature_url) {
-            const signaturePath = path.join(__dirname, '..', archive.signature_url)
-            if (fs.existsSync(signaturePath)) {
-                zipArchive.file(signaturePath, { name: '审批签名.png' })
-            }
+            const entry = attachmentEntry({ file_path: archive.signature_url }, '审批签名.png')
+            if (entry) entries.push(entry)
         }
 
-        // 获取周检察记录并生成文档 + 附件
-        const weeklyRecords = await WeeklyRecord.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                record_date: {
-                    [Op.gte]: new Date(archive.year, archive.month - 1, 1),
-                    [Op.lt]: new Date(archive.year, archive.month, 1)
-                }
-            },
-            order: [['record_date', 'ASC']]
-        })
-        
-        // 生成周检察文档和附件(按日期组织)
+        // 周检察附件(按日期组织)
         for (const record of weeklyRecords) {
             try {
                 const dateStr = record.record_date ? new Date(record.record_date).toISOString().split('T')[0] : 'unknown'
                 
                 // 生成周检察记录文档(如果有生成器的话)
                 // TODO: 添加周检察文档生成器
-                // zipArchive.append(docBuffer, { name: `02-周检察/${dateStr}_周检察记录.docx` })
                 
-                // 查找该周检察的附件
-                const weeklyAttachments = await Attachment.findAll({
-                    where: {
-                        related_log_type: 'weekly',
-                        related_log_id: record.id
-                    }
-                })
-                
-                // 添加附件
-                if (weeklyAttachments.length > 0) {
-                    for (const att of weeklyAttachments) {
-                        let filePath
-                        if (path.isAbsolute(att.file_path)) {
-                            filePath = att.file_path
-                        } else {
-                            filePath = path.join(__dirname, '..', att.file_path)
-                        }
-                        
-                        if (fs.existsSync(filePath)) {
-                            zipArchive.file(filePath, { name: `02-周检察/${dateStr}_附件/${att.original_name}` })
-                        }
-                    }
+                // 该周检察的附件
+                for (const att of snapshot.recordAttachments('weekly', record.id)) {
+                    const entry = attachmentEntry(att, `02-周检察/${dateStr}_附件/${att.original_name}`)
+                    if (entry) entries.push(entry)
                 }
             } catch (e) {
                 console.error('处理周检察记录失败:', e)
             }
         }
 
-        // 获取月检察记录并生成文档 + 附件
-        const targetMonth = `${archive.year}-${String(archive.month).padStart(2, '0')}`
-        const monthlyRecords = await MonthlyRecord.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                record_month: targetMonth
-            }
-        })
-        
-        // 生成月检察文档和附件
+        // 月检察附件
         for (const record of monthlyRecords) {
             try {
                 // 生成月检察记录文档(如果有生成器的话)
                 // TODO: 添加月检察文档生成器
-                // zipArchive.append(docBuffer, { name: `03-月检察/${targetMonth}_月检察记录.docx` })
                 
-                // 查找该月检察的附件
-                const monthlyAttachments = await Attachment.findAll({
-                    where: {
-                        related_log_type: 'monthly',
-                        related_log_id: record.id
-                    }
-                })
-                
-                // 添加附件
-                if (monthlyAttachments.length > 0) {
-                    for (const att of monthlyAttachments) {
-                        let filePath
-                        if (path.isAbsolute(att.file_path)) {
-                            filePath = att.file_path
-                        } else {
-                            filePath = path.join(__dirname, '..', att.file_path)
-                        }
-                        
-                        if (fs.existsSync(filePath)) {
-                            zipArchive.file(filePath, { name: `03-月检察/${targetMonth}_附件/${att.original_name}` })
-                        }
-                    }
+                // 该月检察的附件
+                for (const att of snapshot.recordAttachments('monthly', record.id)) {
+                    const entry = attachmentEntry(att, `03-月检察/${targetMonth}_附件/${att.original_name}`)
+                    if (entry) entries.push(entry)
                 }
             } catch (e) {
                 console.error('处理月检察记录失败:', e)
             }
         }
         
-        // 处理其他材料(没有关联到具体日志的附件)
-        // targetMonth 已在上面定义
-        
-        // 获取所有已关联的附件ID
-        const relatedAttachmentIds = new Set()
-        
-        // 日检察附件
-        const dailyAttachments = await Attachment.findAll({
-            where: {
-                related_log_type: 'daily',
-                related_log_id: { [Op.in]: dailyLogs.map(l => l.id) }
-            },
-            attributes: ['id']
-        })
-        dailyAttachments.forEach(att => relatedAttachmentIds.add(att.id))
-        
-        // 周检察附件
-        const weeklyAttachments = await Attachment.findAll({
-            where: {
-                related_log_type: 'weekly',
-                related_log_id: { [Op.in]: weeklyRecords.map(r => r.id) }
-            },
-            attributes: ['id']
-        })
-        weeklyAttachments.forEach(att => relatedAttachmentIds.add(att.id))
-        
-        // 月检察附件
-        const monthlyAttachments = await Attachment.findAll({
-            where: {
-                related_log_type: 'monthly',
-                related_log_id: { [Op.in]: monthlyRecords.map(r => r.id) }
-            },
-            attributes: ['id']
-        })
-        monthlyAttachments.forEach(att => relatedAttachmentIds.add(att.id))
-        
-        // 及时检察附件
-        for (const event of immediateEvents) {
-            if (event.attachment_ids && Array.isArray(event.attachment_ids)) {
-                event.attachment_ids.forEach(id => relatedAttachmentIds.add(id))
-            }
-        }
-        
-        // 查找未关联的附件(其他材料)
-        const otherAttachments = await Attachment.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                [Op.or]: [
-                    { upload_month: targetMonth },
-                    {
-                        [Op.and]: [
-                            { upload_month: { [Op.or]: [null, ''] } },
-                            {
-                                createdAt: {
-                                    [Op.gte]: new Date(archive.year, archive.month - 1, 1),
-                                    [Op.lt]: new Date(archive.year, archive.month, 1)
-                                }
-                            }
-                        ]
-                    }
-                ],
-                id: { [Op.notIn]: Array.from(relatedAttachmentIds) }
-            }
-        })
-        
-        // 添加其他材料
+        // 其他材料(当月上传、没有关联到具体日志的附件)
         for (const att of otherAttachments) {
-            let filePath
-            if (path.isAbsolute(att.file_path)) {
-                filePath = att.file_path
-            } else {
-                filePath = path.join(__dirname, '..', att.file_path)
-            }
-            
-            if (fs.existsSync(filePath)) {
-                zipArchive.file(filePath, { name: `05-其他材料/${att.original_name}` })
+            const entry = attachmentEntry(att, `05-其他材料/${att.original_name}`)
+            if (entry) {
+                entries.push(entry)
             } else {
-                console.warn(`附件文件不存在: ${filePath}`)
+                console.warn(`附件文件不存在: ${att.file_path}`)
             }
         }
         
         console.log(`归档统计: 日检察${dailyLogs.length}条, 周检察${weeklyRecords.length}条, 月检察${monthlyRecords.length}条, 及时检察${immediateEvents.length}件, 其他材料${otherAttachments.length}个`)
 
-        // 收集所有附件(用于生成报告)
-        const allAttachmentsForReport = [
-            ...dailyAttachments,
-            ...weeklyAttachments,
-            ...monthlyAttachments,
-            ...otherAttachments
-        ]
-        // 去重
-        const attachmentMapForReport = new Map()
-        for (const att of allAttachmentsForReport) {
-            attachmentMapForReport.set(att.id, att)
-        }
-        const attachments = Array.from(attachmentMapForReport.values())
-
-        // 🔥 查询 monthly_basic_info 数据（报告和清单都需要）
-        const { MonthlyBasicInfo } = require('../models')
-        const reportMonth = `${archive.year}-${String(archive.month).padStart(2, '0')}`
-        const basicInfo = await MonthlyBasicInfo.findOne({
-            where: {
-                prison_name: archive.prison_name,
-                report_month: reportMonth
-            }
-        })
+        // 报告统计用的附件
+        const attachments = snapshot.reportAttachments
         console.log('查询到基本信息:', basicInfo ? '有数据' : '无数据')
+        console.log(`月度数据共 ${snapshot.queries} 次查询`)
 
         // 使用模板生成文档（generateLogFromTemplate 已在上方引入）
         const { generateReportFromTemplate, generateChecklistFromTemplate } = require('../utils/templateGenerator')
 
-        // 生成月度报告（Word文档）
-        try {
-            const reportBuffer = await generateReportFromTemplate({
-                archive,
-                dailyLogs,
-                weeklyRecords,
-                monthlyRecords,
-                immediateEvents,
-                attachments,
-                basicInfo  // 🔥 传递基本信息数据
-            })
-            zipArchive.append(reportBuffer, { name: '报告/派驻检察室月度工作情况报告.docx' })
-        } catch (e) {
-            console.error('生成月度报告失败:', e)
-            // 如果模板生成失败，使用文本备用方案
-            const reportSummary = generateReportSummary({
-                archive,
-                dailyLogs,
-                weeklyRecords,
-                monthlyRecords,
-                immediateEvents,
-                attachments
-            })
-            zipArchive.append(reportSummary, { name: '报告/月度报告概览.txt' })
+        // 报告和清单汇总整月的数据，任何一项变化都重新生成
+        const monthKey = hashKey(
+            version,
+            stamp,
+            dailyLogs.map(rowData),
+            weeklyRecords.map(rowData),
+            monthlyRecords.map(rowData),
+            immediateEvents.map(rowData),
+            attachments.map(att => att.id),
+            rowData(basicInfo),
+            rowData(criminalReport),
+            checklistItems.map(rowData)
+        )
+
+        // 月度报告（Word文档）
+        entries.push({
+            name: '报告/派驻检察室月度工作情况报告.docx',
+            key: hashKey('report', monthKey),
+            load: async () => {
+                try {
+                    return await generateReportFromTemplate({
+                        archive,
+                        dailyLogs,
+                        weeklyRecords,
+                        monthlyRecords,
+                        immediateEvents,
+                        attachments,
+                        basicInfo,  // 🔥 传递基本信息数据
+                        criminalData: criminalReport
+                    })
+                } catch (e) {
+                    console.error('生成月度报告失败:', e)
+                    // 如果模板生成失败，使用文本备用方案（各项次数取月度统计汇总）
+                    const reportSummary = generateReportSummary({
+                        archive,
+                        stats: await getMonthlyStats(archive.prison_name, targetMonth),
+                        dailyLogs,
+                        weeklyRecords,
+                        monthlyRecords,
+                        immediateEvents,
+                        attachments
+                    })
+                    return { buffer: Buffer.from(reportSummary), name: '报告/月度报告概览.txt', transient: true }
+                }
+            }
+        })
+
+        // 检察工作事项清单（Word文档）
+        entries.push({
+            name: '报告/派驻检察工作报告事项清单.docx',
+            key: hashKey('checklist', monthKey),
+            load: async () => {
+                try {
+                    console.log('开始生成事项清单...')
+                    const checklistBuffer = await generateChecklistFromTemplate({
+                        archive,
+                        dailyLogs,
+                        weeklyRecords,
+                        monthlyRecords,
+                        immediateEvents,
+                        basicInfo,  // 🔥 传递基本信息数据
+                        checklistItems
+                    })
+                    console.log('✓ 事项清单生成成功')
+                    return checklistBuffer
+                } catch (e) {
+                    console.error('生成事项清单失败:', e.message)
+                    console.error('详细错误:', e.stack)
+                    // 如果模板生成失败，使用文本备用方案
+                    const checklist = generateChecklist({
+                        archive,
+                        dailyLogs,
+                        weeklyRecords,
+                        monthlyRecords,
+                        immediateEvents
+                    })
+                    return { buffer: Buffer.from(checklist), name: '报告/检察工作事项清单.txt', transient: true }
+                }
+            }
+        })
+
+        if (STREAM_DOWNLOAD) {
+            // 边生成边下载：先发出响应头，各条目生成后立即写入响应
+            res.attachment(archiveName)
+            res.flushHeaders()
         }
 
-        // 生成检察工作事项清单（Word文档）
+        let result
         try {
-            console.log('开始生成事项清单...')
-            const checklistBuffer = await generateChecklistFromTemplate({
-                archive,
-                dailyLogs,
-                weeklyRecords,
-                monthlyRecords,
-                immediateEvents,
-                basicInfo  // 🔥 传递基本信息数据
-            })
-            zipArchive.append(checklistBuffer, { name: '报告/派驻检察工作报告事项清单.docx' })
-            console.log('✓ 事项清单生成成功')
-        } catch (e) {
-            console.error('生成事项清单失败:', e.message)
-            console.error('详细错误:', e.stack)
-            // 如果模板生成失败，使用文本备用方案
-            const checklist = generateChecklist({
-                archive,
-                dailyLogs,
-                weeklyRecords,
-                monthlyRecords,
-                immediateEvents
-            })
-            zipArchive.append(checklist, { name: '报告/检察工作事项清单.txt' })
+            result = await buildArchive(archivePath, { stamp, entries, output: STREAM_DOWNLOAD ? res : undefined })
+        } catch (buildError) {
+            console.error('归档包生成失败:', buildError)
+            if (res.headersSent) {
+                // 已经开始下载，只能中断连接，客户端会得到不完整的文件
+                return res.destroy()
+            }
+            // Windows 下归档包正被打开时无法替换
+            const message = buildError.code === 'EPERM' || buildError.code === 'EBUSY'
+                ? '归档文件被占用,请关闭后重试'
+                : '归档文件创建失败: ' + buildError.message
+            return res.status(500).json({ success: false, message })
         }
 
-        zipArchive.finalize()
+        if (result.size !== null && archive.archive_url !== archiveUrl) {
+            await archive.update({ archive_url: archiveUrl })
+        }
+
+        console.log(`✓ 归档包生成成功: ${archiveName}（重新生成 ${result.rendered} 个条目，复用 ${result.reused} 个` +
+            `${result.rewritten ? '' : '，文件未变化'}）`)
+        if (result.size !== null) {
+            console.log('  文件大小:', (result.size / 1024 / 1024).toFixed(2), 'MB')
+        }
+
+        if (!STREAM_DOWNLOAD) {
+            sendArchive()
+        }
     } catch (error) {
         console.error('下载归档失败:', error)
+        if (res.headersSent) {
+            return res.destroy()
+        }
         res.status(500).json({ success: false, message: '下载归档失败' })
     }
 })
@@ -1003,16 +873,9 @@ router.get('/download-report/:id', async (req, res) => {
             }
         }
 
-        // 从数据库查询 monthly_basic_info 数据
-        const { MonthlyBasicInfo } = require('../models')
-        const reportMonth = `${archive.year}-${String(archive.month).padStart(2, '0')}`
-        
-        const basicInfo = await MonthlyBasicInfo.findOne({
-            where: {
-                prison_name: archive.prison_name,
-                report_month: reportMonth
-            }
-        })
+        // 月度快照只读取基本信息和犯情动态（报告只用到这两项）
+        const snapshot = await loadMonthSnapshot(archive.prison_name, archive.year, archive.month, { records: false })
+        const { basicInfo } = snapshot
         
         console.log('查询到基本信息:', basicInfo ? '有数据' : '无数据')
 
@@ -1021,7 +884,13 @@ router.get('/download-report/:id', async (req, res) => {
 
         const reportBuffer = await generateReportFromTemplate({
             archive,
-            basicInfo: basicInfo || {}  // 传递基本信息数据
+            dailyLogs: snapshot.dailyLogs,
+            weeklyRecords: snapshot.weeklyRecords,
+            monthlyRecords: snapshot.monthlyRecords,
+            immediateEvents: snapshot.immediateEvents,
+            attachments: snapshot.reportAttachments,
+            basicInfo: basicInfo || {},  // 传递基本信息数据
+            criminalData: snapshot.criminalReport
         })
 
         // 设置响应头
@@ -1068,16 +937,8 @@ async function handleDownloadChecklist(req, res) {
             }
         }
 
-        // 从数据库查询 monthly_basic_info 数据
-        const { MonthlyBasicInfo } = require('../models')
-        const reportMonth = `${archive.year}-${String(archive.month).padStart(2, '0')}`
-        
-        const basicInfo = await MonthlyBasicInfo.findOne({
-            where: {
-                prison_name: archive.prison_name,
-                report_month: reportMonth
-            }
-        })
+        // 从月度快照取 monthly_basic_info 数据
+        const { basicInfo } = await loadMonthSnapshot(archive.prison_name, archive.year, archive.month, { records: false })
         
         console.log('查询到基本信息:', basicInfo ? '有数据' : '无数据')
 
@@ -1103,44 +964,7 @@ async function handleDownloadChecklist(req, res) {
 /**
  * 生成月度报告概览
  */
-function generateReportSummary({ archive, dailyLogs, weeklyRecords, monthlyRecords, immediateEvents, attachments }) {
-    const stats = {
-        threeSceneChecks: 0,
-        monitorChecks: 0,
-        keyLocationChecks: 0,
-        totalTalks: 0,
-        mailboxOpens: 0,
-        lettersReceived: 0
-    }
-
-    // 从日检察统计
-    for (const log of dailyLogs) {
-        if (log.three_scenes) {
-            const scenes = log.three_scenes
-            if (scenes.labor?.checked) stats.threeSceneChecks++
-            if (scenes.living?.checked) stats.threeSceneChecks++
-            if (scenes.study?.checked) stats.threeSceneChecks++
-        }
-        if (log.monitor_check?.checked) {
-            stats.monitorChecks += log.monitor_check.count || 1
-        }
-    }
-
-    // 从周检察统计
-    for (const record of weeklyRecords) {
-        if (record.hospital_check) {
-            if (record.hospital_check.hospitalChecked) stats.keyLocationChecks++
-            if (record.hospital_check.confinementChecked) stats.keyLocationChecks++
-        }
-        if (record.talk_records && Array.isArray(record.talk_records)) {
-            stats.totalTalks += record.talk_records.length
-        }
-        if (record.mailbox) {
-            stats.mailboxOpens += record.mailbox.openCount || 0
-            stats.lettersReceived += record.mailbox.receivedCount || 0
-        }
-    }
-
+function generateReportSummary({ archive, stats, dailyLogs, weeklyRecords, monthlyRecords, immediateEvents, attachments }) {
     return `
 ================================================================================
                         ${archive.prison_name} 月度检察工作报告
@@ -6,6 +6,7 @@ const router = express.Router()
 const { DailyLog, User, Attachment, WeeklyRecord, MonthlyRecord } = require('../models')
 const { authenticateToken, requireRole } = require('../middleware/auth')
 const { Op } = require('sequelize')
+const { getUserMonthlyStats } = require('../utils/monthlyStats')
 
 // 所有路由需要认证
 router.use(authenticateToken)
@@ -471,42 +472,14 @@ router.get('/stats/monthly', async (req, res) => {
         const now = new Date()
         const targetMonth = month || `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`
 
-        const [year, m] = targetMonth.split('-')
-        const start = new Date(year, m - 1, 1)
-        const end = new Date(year, m, 0)
-
-        const logs = await DailyLog.findAll({
-            where: {
-                user_id: req.userId,
-                log_date: { [Op.between]: [start, end] }
-            }
-        })
-
-        // 统计数据
+        // 读取当前用户的月度统计汇总（随日志增量更新，见 utils/monthlyStats.js）
+        const monthly = await getUserMonthlyStats(req.userId, targetMonth)
         const stats = {
-            totalLogs: logs.length,
-            threeSceneChecks: 0,
-            monitorChecks: 0,
-            strictControlTotal: 0,
-            gangPrisonersTotal: 0
-        }
-
-        for (const log of logs) {
-            if (log.three_scenes) {
-                const scenes = log.three_scenes
-                if (scenes.labor?.checked) stats.threeSceneChecks++
-                if (scenes.living?.checked) stats.threeSceneChecks++
-                if (scenes.study?.checked) stats.threeSceneChecks++
-            }
-            if (log.monitor_check?.checked) {
-                stats.monitorChecks += log.monitor_check.count || 1
-            }
-            if (log.strict_control) {
-                stats.strictControlTotal = log.strict_control.totalCount || 0
-            }
-            if (log.gang_prisoners) {
-                stats.gangPrisonersTotal = log.gang_prisoners.totalCount || 0
-            }
+            totalLogs: monthly.dailyLogCount,
+            threeSceneChecks: monthly.threeSceneChecks,
+            monitorChecks: monthly.monitorChecks,
+            strictControlTotal: monthly.strictControlTotal,
+            gangPrisonersTotal: monthly.gangPrisonersTotal
         }
 
         res.json(stats)
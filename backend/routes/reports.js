@@ -3,9 +3,8 @@
  */
 const express = require('express')
 const router = express.Router()
-const { DailyLog, WeeklyRecord, MonthlyRecord, ImmediateEvent, Attachment, User } = require('../models')
 const { authenticateToken } = require('../middleware/auth')
-const { Op } = require('sequelize')
+const { loadMonthSnapshot } = require('../utils/monthSnapshot')
 
 // 认证中间件
 router.use(authenticateToken)
@@ -38,98 +37,19 @@ router.get('/generate-report', async (req, res) => {
             }
         }
 
-        // 获取该监狱的所有用户
-        const usersInPrison = await User.findAll({
-            where: { prison_name },
-            attributes: ['id']
-        })
-        const userIds = usersInPrison.map(u => u.id)
+        // 一次读取当月全部数据（见 utils/monthSnapshot.js）
+        const snapshot = await loadMonthSnapshot(prison_name, year, month)
 
-        if (userIds.length === 0) {
+        if (snapshot.userIds.length === 0) {
             return res.status(404).json({ 
                 success: false, 
                 message: '该监狱没有用户数据' 
             })
         }
 
-        // 获取数据
-        const startDate = `${year}-${String(month).padStart(2, '0')}-01`
-        const endDate = parseInt(month) === 12
-            ? `${parseInt(year) + 1}-01-01`
-            : `${year}-${String(parseInt(month) + 1).padStart(2, '0')}-01`
-
-        const dailyLogs = await DailyLog.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                log_date: { [Op.gte]: startDate, [Op.lt]: endDate }
-            },
-            order: [['log_date', 'ASC']]
-        })
-
-        const weeklyRecords = await WeeklyRecord.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                record_date: {
-                    [Op.gte]: new Date(year, month - 1, 1),
-                    [Op.lt]: new Date(year, month, 1)
-                }
-            },
-            order: [['record_date', 'ASC']]
-        })
-
-        const targetMonth = `${year}-${String(month).padStart(2, '0')}`
-        const monthlyRecords = await MonthlyRecord.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                record_month: targetMonth
-            }
-        })
-
-        const immediateEvents = await ImmediateEvent.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                event_date: {
-                    [Op.gte]: new Date(year, month - 1, 1),
-                    [Op.lt]: new Date(year, month, 1)
-                }
-            },
-            order: [['event_date', 'ASC']]
-        })
-
-        const attachments = await Attachment.findAll({
-            where: {
-                user_id: { [Op.in]: userIds },
-                [Op.or]: [
-                    { upload_month: targetMonth },
-                    {
-                        [Op.and]: [
-                            { upload_month: { [Op.or]: [null, ''] } },
-                            {
-                                createdAt: {
-                                    [Op.gte]: new Date(year, month - 1, 1),
-                                    [Op.lt]: new Date(year, month, 1)
-                                }
-                            }
-                        ]
-                    }
-                ]
-            }
-        })
-
-        // 获取基本信息
-        const { sequelize } = require('../models')
-        const [basicInfoResults] = await sequelize.query(`
-            SELECT * FROM monthly_basic_info
-            WHERE prison_name = :prisonName AND report_month = :reportMonth
-            LIMIT 1
-        `, {
-            replacements: { 
-                prisonName: prison_name, 
-                reportMonth: targetMonth 
-            }
-        })
-        
-        const basicInfo = basicInfoResults.length > 0 ? basicInfoResults[0] : null
+        const { dailyLogs, weeklyRecords, monthlyRecords, immediateEvents, basicInfo } = snapshot
+        // 当月上传的全部附件
+        const attachments = snapshot.monthAttachments
         console.log('基本信息:', basicInfo ? `找到数据，在押罪犯 ${basicInfo.total_prisoners} 人` : '未找到数据')
 
         // 生成报告
@@ -160,7 +80,8 @@ router.get('/generate-report', async (req, res) => {
             monthlyRecords,
             immediateEvents,
             attachments,
-            basicInfo  // 添加基本信息
+            basicInfo,  // 添加基本信息
+            criminalData: snapshot.criminalReport
         })
 
         // 设置响应头
@@ -22,12 +22,9 @@ const {
     MailRecord, Blacklist, Attachment, User, CriminalReport, MonthlyBasicInfo
 } = require('../models')
 const { authenticateToken, requireAdmin } = require('../middleware/auth')
-const {
-    parseStrictEducation, parseConfinement, parseRestraintUsage,
-    parseMailRecord, parseBlacklist
-} = require('../utils/templateParser')
+const { parseExcelUpload } = require('../utils/excelIngest')
 const { parseCriminalReport } = require('../utils/criminalReportParser')
-const XLSX = require('xlsx')
+const { parseCriminalReportFile } = require('../utils/criminalReportWorkerPool')
 const mammoth = require('mammoth')
 
 // 文件上传配置
@@ -91,76 +88,135 @@ const checkUploadPermission = (req, res, next) => {
     next()
 }
 
+// 批量写入时每条 INSERT 语句包含的行数
+const BULK_BATCH_SIZE = 500
+
 /**
- * 读取Excel文件并返回原始数据
+ * 分批写入，整批失败时（某一行违反约束或校验不通过）逐行重试，
+ * 出错的行记入 errors，不影响同一批中的其他行
+ * @returns {Promise<number>} 成功写入的行数
  */
-function readExcelFile(filePath) {
-    const workbook = XLSX.readFile(filePath)
-    const sheetName = workbook.SheetNames[0]
-    const worksheet = workbook.Sheets[sheetName]
-    return XLSX.utils.sheet_to_json(worksheet, { header: 1 })
+async function bulkWrite(Model, rows, options, errors, label) {
+    let written = 0
+    for (let i = 0; i < rows.length; i += BULK_BATCH_SIZE) {
+        const batch = rows.slice(i, i + BULK_BATCH_SIZE)
+        try {
+            await Model.bulkCreate(batch, { ...options, validate: true })
+            written += batch.length
+        } catch (e) {
+            for (const row of batch) {
+                try {
+                    await Model.bulkCreate([row], { ...options, validate: true })
+                    written++
+                } catch (rowError) {
+                    errors.push(`${label}: ${rowError.message}`)
+                }
+            }
+        }
+    }
+    return written
 }
 
 /**
  * 通用同步处理函数
+ * 一次查出该派驻单位、该月份已有的记录，在内存中区分新增和更新，
+ * 在同一个事务中分批写入：新增为多行 INSERT，更新为按主键的 INSERT ... ON DUPLICATE KEY UPDATE
  */
 async function syncRecords(Model, records, syncBatch, syncedAt, prisonName, options = {}) {
     const stats = { inserted: 0, updated: 0, errors: [] }
     const { uniqueKey = 'prisoner_id', useCreateDate = true, uploadMonth } = options
+    if (records.length === 0) return stats
 
-    for (const record of records) {
-        try {
+    const toRow = (record) => ({
+        ...record,
+        prison_name: prisonName,
+        upload_month: uploadMonth,  // 使用归属月份而不是 Excel 中的日期
+        sync_batch: syncBatch,
+        synced_at: syncedAt
+    })
+
+    try {
+        await Model.sequelize.transaction(async (transaction) => {
             if (options.insertOnly) {
                 // 直接插入（如信件表）
-                await Model.create({
-                    ...record,
-                    prison_name: prisonName,
-                    upload_month: uploadMonth,  // 使用归属月份
-                    sync_batch: syncBatch,
-                    synced_at: syncedAt
-                })
-                stats.inserted++
-            } else {
-                // 根据唯一键查找并更新或插入（按派驻单位 + 归属月份过滤）
-                const whereClause = { 
-                    [uniqueKey]: record[uniqueKey],
-                    prison_name: prisonName
-                }
-                
-                // 使用归属月份而不是 Excel 中的日期
-                if (uploadMonth) {
-                    whereClause.upload_month = uploadMonth
-                }
-                
-                // 如果需要按创建日期区分（同一个月内可能有多条记录）
-                if (useCreateDate && record.create_date) {
-                    whereClause.create_date = record.create_date
-                }
+                stats.inserted = await bulkWrite(Model, records.map(toRow), { transaction },
+                    stats.errors, '记录同步失败')
+                return
+            }
 
-                const existing = await Model.findOne({ where: whereClause })
-                if (existing) {
-                    await existing.update({
-                        ...record,
-                        prison_name: prisonName,
-                        upload_month: uploadMonth,
-                        sync_batch: syncBatch,
-                        synced_at: syncedAt
-                    })
+            // 已有记录：按派驻单位 + 归属月份过滤
+            const where = {
+                prison_name: prisonName,
+                [uniqueKey]: { [Op.in]: [...new Set(records.map(r => r[uniqueKey]))] }
+            }
+            if (uploadMonth) {
+                where.upload_month = uploadMonth
+            }
+            const existing = await Model.findAll({
+                where,
+                attributes: ['id', uniqueKey, 'create_date'],
+                order: [['id', 'ASC']],
+                raw: true,
+                transaction
+            })
+
+            // 唯一键 → 记录；按创建日期区分时（同一个月内可能有多条记录）键中带上创建日期，
+            // 没有创建日期的行与逐条查找时一样匹配该唯一键的第一条记录
+            const byKey = new Map()
+            const byExactKey = new Map()
+            const remember = (key, createDate, target) => {
+                if (!byKey.has(key)) byKey.set(key, target)
+                const exact = `${key}\u0000${createDate}`
+                if (!byExactKey.has(exact)) byExactKey.set(exact, target)
+            }
+            for (const row of existing) {
+                remember(String(row[uniqueKey]), row.create_date, { id: row.id })
+            }
+
+            const inserts = []
+            const updates = new Map()
+            for (const record of records) {
+                const key = String(record[uniqueKey])
+                const match = useCreateDate && record.create_date
+                    ? byExactKey.get(`${key}\u0000${record.create_date}`)
+                    : byKey.get(key)
+
+                if (!match) {
+                    const row = toRow(record)
+                    inserts.push(row)
+                    remember(key, record.create_date, { row })
+                    stats.inserted++
+                } else if (match.row) {
+                    // 同一文件中重复的行，更新前面待插入的行
+                    Object.assign(match.row, toRow(record))
                     stats.updated++
                 } else {
-                    await Model.create({
-                        ...record,
-                        prison_name: prisonName,
-                        upload_month: uploadMonth,  // 🔥 修复：添加 upload_month
-                        sync_batch: syncBatch,
-                        synced_at: syncedAt
-                    })
-                    stats.inserted++
+                    updates.set(match.id, { ...toRow(record), id: match.id })
+                    stats.updated++
                 }
             }
-        } catch (e) {
-            stats.errors.push(`记录同步失败: ${e.message}`)
-        }
+
+            const insertedCount = await bulkWrite(Model, inserts, { transaction }, stats.errors, '记录同步失败')
+            stats.inserted -= inserts.length - insertedCount
+
+            const updateRows = [...updates.values()]
+            if (updateRows.length > 0) {
+                const fields = new Set()
+                for (const row of updateRows) {
+                    for (const field of Object.keys(row)) fields.add(field)
+                }
+                fields.delete('id')
+                fields.add('updated_at')
+                const updatedCount = await bulkWrite(Model, updateRows,
+                    { transaction, updateOnDuplicate: [...fields] }, stats.errors, '记录同步失败')
+                stats.updated -= updateRows.length - updatedCount
+            }
+        })
+    } catch (e) {
+        // 事务已回滚，本次没有写入任何记录
+        stats.inserted = 0
+        stats.updated = 0
+        stats.errors.push(`记录同步失败: ${e.message}`)
     }
 
     return stats
@@ -168,17 +224,34 @@ async function syncRecords(Model, records, syncBatch, syncedAt, prisonName, opti
 
 /**
  * 同步罪犯基本信息
+ * 按罪犯编号去重（同一罪犯以文件中最后一行为准），分批 INSERT ... ON DUPLICATE KEY UPDATE，
+ * 只更新文件中提供的字段
  */
 async function syncPrisoners(prisoners, syncedAt) {
+    const latest = new Map()
     for (const p of prisoners) {
-        try {
-            await Prisoner.upsert({
-                ...p,
-                updated_at: syncedAt
-            })
-        } catch (e) {
-            console.error(`罪犯信息同步失败 ${p.prisoner_id}:`, e.message)
-        }
+        latest.set(p.prisoner_id, { ...latest.get(p.prisoner_id), ...p, updated_at: syncedAt })
+    }
+    const rows = [...latest.values()]
+    if (rows.length === 0) return
+
+    const fields = new Set()
+    for (const row of rows) {
+        for (const field of Object.keys(row)) fields.add(field)
+    }
+    fields.delete('prisoner_id')
+
+    const errors = []
+    try {
+        await Prisoner.sequelize.transaction(async (transaction) => {
+            await bulkWrite(Prisoner, rows, { transaction, updateOnDuplicate: [...fields] },
+                errors, '罪犯信息同步失败')
+        })
+    } catch (e) {
+        errors.push(`罪犯信息同步失败: ${e.message}`)
+    }
+    for (const error of errors) {
+        console.error(error)
     }
 }
 
@@ -210,13 +283,11 @@ router.post('/strict-education', checkUploadPermission, upload.single('file'), a
         const syncedAt = new Date()
 
         // 读取并解析
-        const data = readExcelFile(req.file.path)
-        if (data.length <= 1) {
+        const parseResult = await parseExcelUpload(req.file.path, 'strict_education', req.file.size)
+        if (!parseResult) {
             return res.status(400).json({ error: '文件内容为空或只有标题行' })
         }
 
-        const parseResult = parseStrictEducation(data)
-
         // 同步罪犯信息
         if (parseResult.prisoners?.length > 0) {
             await syncPrisoners(parseResult.prisoners, syncedAt)
@@ -302,13 +373,11 @@ router.post('/confinement', checkUploadPermission, upload.single('file'), async
         const syncBatch = uuidv4()
         const syncedAt = new Date()
 
-        const data = readExcelFile(req.file.path)
-        if (data.length <= 1) {
+        const parseResult = await parseExcelUpload(req.file.path, 'confinement', req.file.size)
+        if (!parseResult) {
             return res.status(400).json({ error: '文件内容为空或只有标题行' })
         }
 
-        const parseResult = parseConfinement(data)
-
         if (parseResult.prisoners?.length > 0) {
             await syncPrisoners(parseResult.prisoners, syncedAt)
         }
@@ -392,13 +461,11 @@ router.post('/blacklist', checkUploadPermission, upload.single('file'), async (r
         const syncBatch = uuidv4()
         const syncedAt = new Date()
 
-        const data = readExcelFile(req.file.path)
-        if (data.length <= 1) {
+        const parseResult = await parseExcelUpload(req.file.path, 'blacklist', req.file.size)
+        if (!parseResult) {
             return res.status(400).json({ error: '文件内容为空或只有标题行' })
         }
 
-        const parseResult = parseBlacklist(data)
-
         // 涉黑恶名单以 prisoner_id 为唯一键，不需要 create_date
         const stats = await syncRecords(
             Blacklist,
@@ -481,13 +548,11 @@ router.post('/restraint', checkUploadPermission, upload.single('file'), async (r
         const syncBatch = uuidv4()
         const syncedAt = new Date()
 
-        const data = readExcelFile(req.file.path)
-        if (data.length <= 1) {
+        const parseResult = await parseExcelUpload(req.file.path, 'restraint', req.file.size)
+        if (!parseResult) {
             return res.status(400).json({ error: '文件内容为空或只有标题行' })
         }
 
-        const parseResult = parseRestraintUsage(data)
-
         if (parseResult.prisoners?.length > 0) {
             await syncPrisoners(parseResult.prisoners, syncedAt)
         }
@@ -548,13 +613,11 @@ router.post('/mail', checkUploadPermission, upload.single('file'), async (req, r
         const syncBatch = uuidv4()
         const syncedAt = new Date()
 
-        const data = readExcelFile(req.file.path)
-        if (data.length <= 1) {
+        const parseResult = await parseExcelUpload(req.file.path, 'mail', req.file.size)
+        if (!parseResult) {
             return res.status(400).json({ error: '文件内容为空或只有标题行' })
         }
 
-        const parseResult = parseMailRecord(data)
-
         // 先删除该监狱该月份的旧数据（覆盖而不是累加）
         const deletedCount = await MailRecord.destroy({
             where: {
@@ -615,7 +678,7 @@ router.post('/mail', checkUploadPermission, upload.single('file'), async (req, r
 })
 
 // ============================================================
-// 6. 犯情动态上传（Word文档）- 使用Python解析
+// 6. 犯情动态上传（Word文档）- 使用常驻Python进程解析
 // POST /api/template-sync/criminal-report
 // ============================================================
 router.post('/criminal-report', checkUploadPermission, uploadWord.single('file'), async (req, res) => {
@@ -641,47 +704,41 @@ router.post('/criminal-report', checkUploadPermission, uploadWord.single('file')
         const syncBatch = uuidv4()
         const syncedAt = new Date()
 
-        // 调用Python脚本解析Word文档
-        const { spawn } = require('child_process')
-        const pythonScript = path.join(__dirname, '../utils/parse_criminal_report.py')
-        
-        console.log('🐍 调用Python解析器:', pythonScript)
+        // 交给常驻的Python解析进程解析Word文档
+        console.log('🐍 调用Python解析器')
         console.log('📄 文件路径:', req.file.path)
         
-        const pythonProcess = spawn('python', [pythonScript, req.file.path])
-        
-        let pythonOutput = ''
-        let pythonError = ''
-        
-        pythonProcess.stdout.on('data', (data) => {
-            pythonOutput += data.toString()
-        })
-        
-        pythonProcess.stderr.on('data', (data) => {
-            pythonError += data.toString()
-        })
-        
-        await new Promise((resolve, reject) => {
-            pythonProcess.on('close', (code) => {
-                if (code !== 0) {
-                    console.error('❌ Python解析失败:', pythonError)
-                    reject(new Error(`Python解析失败: ${pythonError}`))
-                } else {
-                    resolve()
-                }
-            })
-        })
-        
-        // 解析Python输出的JSON
-        const parseResult = JSON.parse(pythonOutput)
+        const parseResult = await parseCriminalReportFile(req.file.path)
         
         if (!parseResult.success) {
             throw new Error(parseResult.error || 'Python解析失败')
         }
         
         const parsed = parseResult.data
+        const sources = parseResult.sources || {}
         
-        console.log('✅ Python解析成功:')
+        // 记录从表格中提取的字段，便于核对各监狱的文档格式
+        const tableFields = Object.entries(sources.prisoners || {})
+            .concat(Object.entries(sources.discipline || {}))
+            .filter(([, source]) => source === 'table')
+            .map(([field]) => field)
+        
+        console.log(parseResult.cached ? '✅ Python解析成功（命中缓存）:' : '✅ Python解析成功:',
+            `${parseResult.parseTimeMs}ms`)
+        if (tableFields.length > 0) {
+            console.log('  【来自表格的字段】', tableFields.join(', '))
+        }
+        if (parseResult.stats) {
+            const { timings, document } = parseResult.stats
+            const missing = Object.entries(parseResult.stats.fields.prisoners || {})
+                .concat(Object.entries(parseResult.stats.fields.discipline || {}))
+                .filter(([, hit]) => !hit.pattern)
+                .map(([field]) => field)
+            console.log('  【解析统计】', JSON.stringify(timings), JSON.stringify(document))
+            if (missing.length > 0) {
+                console.log('  【未命中的字段】', missing.join(', '))
+            }
+        }
         console.log('  【罪犯构成】')
         console.log('    在押罪犯总数:', parsed.prisoners.total)
         console.log('    重大刑事犯:', parsed.prisoners.majorCriminal)
@@ -822,7 +879,8 @@ router.post('/criminal-report', checkUploadPermission, uploadWord.single('file')
                 evilRelated: reportData.evil_related,
                 newlyAdmitted: reportData.newly_admitted,
                 confinementCount: reportData.confinement_count,
-                warningCount: reportData.warning_count
+                warningCount: reportData.warning_count,
+                fieldSources: sources
             }
         })
     } catch (error) {
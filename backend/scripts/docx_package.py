@@ -0,0 +1,108 @@
+"""
+.docx（zip）包的原样复制与局部替换
+只重写指定的部件，其余部件直接复制压缩后的字节，不解压也不重新压缩，
+图片、印章等大文件再多，写出的耗时和内存也基本不变。
+"""
+import io
+import struct
+import zlib
+import zipfile
+
+LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+CENTRAL_HEADER = struct.Struct('<4sHHHHHHIIIHHHHHII')
+END_OF_CENTRAL_DIR = struct.Struct('<4sHHHHIIH')
+
+LOCAL_SIGNATURE = b'PK\x03\x04'
+CENTRAL_SIGNATURE = b'PK\x01\x02'
+END_SIGNATURE = b'PK\x05\x06'
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+VERSION = 20
+ZIP32_LIMIT = 0xFFFFFFFF
+
+class Package:
+    """只读打开的 .docx 包，可以按部件名读取解压后的内容，或取出压缩后的原始字节"""
+
+    def __init__(self, content):
+        self.content = content
+        self.view = memoryview(content)
+        self.zip = zipfile.ZipFile(io.BytesIO(content))
+        self.infos = self.zip.infolist()
+
+    def read(self, name):
+        """读取解压后的部件内容"""
+        return self.zip.read(name)
+
+    def raw(self, info):
+        """部件压缩后的原始字节（不复制）"""
+        offset = info.header_offset
+        header = LOCAL_HEADER.unpack_from(self.content, offset)
+        if header[0] != LOCAL_SIGNATURE:
+            raise zipfile.BadZipFile(f'部件 {info.filename} 的本地文件头损坏')
+        start = offset + LOCAL_HEADER.size + header[9] + header[10]
+        return self.view[start:start + info.compress_size]
+
+def dos_datetime(date_time):
+    """zip 使用的 DOS 日期和时间"""
+    year, month, day, hour, minute, second = date_time
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return ((year - 1980) << 9 | month << 5 | day), (hour << 11 | minute << 5 | second // 2)
+
+def deflate(data):
+    """按 zip 的格式（raw deflate）压缩"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+def write_package(package, replacements, out):
+    """
+    写出新的 .docx：replacements 中的部件（{部件名: 新内容bytes}）重新压缩写入，
+    其余部件按原顺序直接复制压缩字节。不支持 zip64（超过4GB的包），遇到时在写出前抛出 ValueError。
+    """
+    if len(package.infos) >= 0xFFFF:
+        raise ValueError('包内部件过多，不支持原样复制')
+    # 写出前估算总大小（重新压缩的部件按最坏情况估计），超出时不写任何内容
+    estimate = sum(
+        (len(replacements[info.filename]) * 2 + 64 if info.filename in replacements else info.compress_size)
+        + LOCAL_HEADER.size + CENTRAL_HEADER.size + 2 * len(info.filename.encode('utf-8'))
+        for info in package.infos
+    )
+    if estimate >= ZIP32_LIMIT:
+        raise ValueError('包过大，不支持原样复制')
+
+    central = []
+    offset = 0
+    for info in package.infos:
+        name = info.filename.encode('utf-8')
+        flags = info.flag_bits & ~FLAG_DATA_DESCRIPTOR
+        if info.filename in replacements:
+            data = replacements[info.filename]
+            payload = deflate(data)
+            method = zipfile.ZIP_DEFLATED
+            crc = zlib.crc32(data)
+            size = len(data)
+            # 重新压缩后原来的压缩级别标记不再适用
+            flags &= ~0x06
+        else:
+            payload = package.raw(info)
+            method = info.compress_type
+            crc = info.CRC
+            size = info.file_size
+        if not info.filename.isascii():
+            flags |= FLAG_UTF8
+
+        date, time = dos_datetime(info.date_time)
+        out.write(LOCAL_HEADER.pack(LOCAL_SIGNATURE, VERSION, flags, method, time, date,
+                                    crc, len(payload), size, len(name), 0))
+        out.write(name)
+        out.write(payload)
+        central.append(CENTRAL_HEADER.pack(CENTRAL_SIGNATURE, VERSION, VERSION, flags, method, time, date,
+                                           crc, len(payload), size, len(name), 0, 0, 0,
+                                           info.internal_attr, info.external_attr, offset) + name)
+        offset += LOCAL_HEADER.size + len(name) + len(payload)
+
+    directory = b''.join(central)
+    out.write(directory)
+    out.write(END_OF_CENTRAL_DIR.pack(END_SIGNATURE, 0, 0, len(central), len(central),
+                                      len(directory), offset, 0))
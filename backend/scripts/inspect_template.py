@@ -0,0 +1,354 @@
+"""
+模板查看工具：段落、表格、占位符、单元格网格、数字
+用法:
+    python inspect_template.py [子命令] [模板或目录...] [--json] [--jobs N] [--no-cache]
+
+子命令:
+    paragraphs    正文段落（序号与 python-docx 的 doc.paragraphs 相同）
+    tables        各表格的行和单元格文字
+    grid          单元格网格：按表格网格列编号，合并单元格(gridSpan)显示为 ←，纵向合并(vMerge)显示为 ↑
+    placeholders  ***、{N}、{名称}、{{名称}} 占位符及其位置，被拆分到多个run中的标出
+    numbers       含数字的段落和单元格（不含占位符中的数字），改造成数字占位符前先看一遍
+
+不指定子命令时为 placeholders，不指定模板时查看 ../muban 下的全部 .docx，多个文件并行处理；
+--json 时每个文件输出一行JSON。不带任何参数运行即列出全部模板的占位符。
+
+每个模板只边解压边增量解析一遍 word/document.xml，得到的结构（段落、表格、占位符、数字）
+以 SHA-256(工具版本 + 文件内容) 为键缓存到 TEMPLATE_INSPECT_CACHE（默认 ../uploads/inspect_cache），
+之后再查看同一个模板的任何子命令都直接读取缓存；模板或本工具修改后自动重新解析。
+"""
+from template_manifest import PLACEHOLDER, DOCUMENT_PART
+import sys
+import os
+import io
+import re
+import json
+import hashlib
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('TEMPLATE_INSPECT_CACHE') or os.path.join(SCRIPT_DIR, '..', 'uploads', 'inspect_cache')
+SUBCOMMANDS = ('paragraphs', 'tables', 'grid', 'placeholders', 'numbers')
+NUMBER = re.compile(r'\d+')
+CHUNK_SIZE = 64 * 1024
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_T = W_NS + 't'
+W_TBL = W_NS + 'tbl'
+W_TR = W_NS + 'tr'
+W_TC = W_NS + 'tc'
+W_P_STYLE = W_NS + 'pStyle'
+W_GRID_COL = W_NS + 'gridCol'
+W_GRID_SPAN = W_NS + 'gridSpan'
+W_GRID_BEFORE = W_NS + 'gridBefore'
+W_V_MERGE = W_NS + 'vMerge'
+W_VAL = W_NS + 'val'
+W_BR = W_NS + 'br'
+W_BR_TYPE = W_NS + 'type'
+
+# run 内需要转换为文本的元素，与 python-docx 的 run.text 相同
+RUN_TEXT = {
+    W_NS + 'tab': '\t',
+    W_NS + 'ptab': '\t',
+    W_NS + 'cr': '\n',
+    W_NS + 'noBreakHyphen': '-',
+}
+
+def tool_version():
+    """本工具源文件的哈希，解析规则修改后旧缓存自然失效"""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def read_structure(source):
+    """
+    解析一遍 document.xml，返回段落、表格、占位符和数字：
+    正文段落和表格单元格中的段落都会记录，文本框等其他位置的段落与 python-docx 一样不记录
+    """
+    paragraphs = []
+    tables = []
+    placeholders = []
+    numbers = []
+
+    stack = []
+    # 正在解析的段落：{'runs': [各run的文字], 'style': 段落样式}
+    paragraph_stack = []
+    # 正在解析的表格：[表格, 下一个单元格的起始网格列]
+    table_stack = []
+
+    def location_of(parent_tag):
+        """段落所在位置：正文段落序号或表格单元格"""
+        if parent_tag == W_BODY:
+            return {'paragraph': len(paragraphs)}
+        if parent_tag == W_TC and table_stack:
+            table = table_stack[-1][0]
+            cell = table['rows'][-1][-1]
+            return {'table': table['index'], 'row': len(table['rows']) - 1, 'col': cell['col']}
+        return None
+
+    def finish_paragraph(paragraph, parent_tag):
+        location = location_of(parent_tag)
+        if location is None:
+            return
+        runs = paragraph['runs']
+        text = ''.join(runs)
+        if parent_tag == W_BODY:
+            paragraphs.append({'index': len(paragraphs), 'style': paragraph['style'], 'text': text})
+        else:
+            table_stack[-1][0]['rows'][-1][-1]['paragraphs'].append(text)
+
+        # 占位符是否完整位于一个run中
+        bounds = []
+        position = 0
+        for run in runs:
+            bounds.append((position, position + len(run)))
+            position += len(run)
+        for match in PLACEHOLDER.finditer(text):
+            contiguous = any(start <= match.start() and match.end() <= end for start, end in bounds)
+            placeholders.append({
+                'syntax': match.group(0),
+                'id': match.group(1) or match.group(2),
+                'location': location,
+                'split': not contiguous,
+                'text': text,
+            })
+
+        found = NUMBER.findall(PLACEHOLDER.sub('', text))
+        if found:
+            numbers.append({'location': location, 'numbers': found, 'text': text})
+
+    with zipfile.ZipFile(source) as zf, zf.open(DOCUMENT_PART) as stream:
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+
+            for event, elem in parser.read_events():
+                tag = elem.tag
+                if event == 'start':
+                    stack.append(tag)
+                    if tag == W_P:
+                        paragraph_stack.append({'runs': [], 'style': None})
+                    elif tag == W_R and paragraph_stack:
+                        paragraph_stack[-1]['runs'].append('')
+                    elif tag == W_TBL:
+                        parent = table_stack[-1][0]['index'] if table_stack else None
+                        table = {'index': len(tables), 'parent': parent, 'columns': 0, 'rows': []}
+                        tables.append(table)
+                        table_stack.append([table, 0])
+                    elif tag == W_TR and table_stack:
+                        table_stack[-1][0]['rows'].append([])
+                        table_stack[-1][1] = 0
+                    elif tag == W_TC and table_stack:
+                        table_stack[-1][0]['rows'][-1].append({
+                            'col': table_stack[-1][1], 'span': 1, 'vmerge': None, 'paragraphs': [],
+                        })
+                    continue
+
+                stack.pop()
+                parent_tag = stack[-1] if stack else None
+                if tag == W_P:
+                    finish_paragraph(paragraph_stack.pop(), parent_tag)
+                elif tag == W_T or tag in RUN_TEXT or tag == W_BR:
+                    if tag == W_T:
+                        text = elem.text or ''
+                    elif tag == W_BR:
+                        text = '\n' if elem.get(W_BR_TYPE, 'textWrapping') == 'textWrapping' else ''
+                    else:
+                        text = RUN_TEXT[tag]
+                    if parent_tag == W_R and paragraph_stack and paragraph_stack[-1]['runs']:
+                        paragraph_stack[-1]['runs'][-1] += text
+                elif tag == W_P_STYLE and paragraph_stack:
+                    paragraph_stack[-1]['style'] = elem.get(W_VAL)
+                elif tag == W_GRID_COL and table_stack:
+                    table_stack[-1][0]['columns'] += 1
+                elif tag == W_GRID_BEFORE and table_stack:
+                    table_stack[-1][1] = int(elem.get(W_VAL, 0))
+                elif tag == W_GRID_SPAN and table_stack:
+                    table_stack[-1][0]['rows'][-1][-1]['span'] = int(elem.get(W_VAL, 1))
+                elif tag == W_V_MERGE and table_stack:
+                    table_stack[-1][0]['rows'][-1][-1]['vmerge'] = elem.get(W_VAL, 'continue')
+                elif tag == W_TC and table_stack:
+                    cell = table_stack[-1][0]['rows'][-1][-1]
+                    cell['text'] = '\n'.join(cell.pop('paragraphs'))
+                    table_stack[-1][1] = cell['col'] + cell['span']
+                elif tag == W_TBL and table_stack:
+                    table_stack.pop()
+
+                # 段落、表格处理完即释放
+                if tag in (W_P, W_TBL):
+                    elem.clear()
+
+            if not chunk:
+                break
+
+    return {'paragraphs': paragraphs, 'tables': tables, 'placeholders': placeholders, 'numbers': numbers}
+
+def load_structure(template_path, use_cache=True):
+    """读取模板结构，优先使用缓存"""
+    with open(template_path, 'rb') as f:
+        content = f.read()
+    key = hashlib.sha256(f'{tool_version()}:{hashlib.sha256(content).hexdigest()}'.encode('ascii')).hexdigest()
+    entry = os.path.join(CACHE_DIR, key + '.json')
+
+    if use_cache:
+        try:
+            with open(entry, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    structure = read_structure(io.BytesIO(content))
+    if use_cache:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            temp = f'{entry}.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(structure, f, ensure_ascii=False)
+            os.replace(temp, entry)
+        except OSError as e:
+            print(f"无法写入缓存 {entry}: {e}", file=sys.stderr)
+    return structure
+
+def inspect_file(job):
+    """并行任务：读取一个模板的结构，返回 (模板路径, 结构, 错误)"""
+    template_path, use_cache = job
+    try:
+        return template_path, load_structure(template_path, use_cache), None
+    except Exception as e:
+        # 实际为 .doc 的文件、损坏的文件
+        return template_path, None, str(e)
+
+def cell_grid(table):
+    """按网格列展开表格：合并单元格的后续列为 ←，纵向合并的后续行为 ↑"""
+    columns = max([table['columns']] + [cell['col'] + cell['span'] for row in table['rows'] for cell in row])
+    grid = []
+    for row in table['rows']:
+        line = [''] * columns
+        for cell in row:
+            line[cell['col']] = '↑' if cell['vmerge'] == 'continue' else cell['text']
+            for col in range(cell['col'] + 1, cell['col'] + cell['span']):
+                line[col] = '←'
+        grid.append(line)
+    return grid
+
+def describe_location(location):
+    if 'paragraph' in location:
+        return f"段落{location['paragraph']}"
+    return f"表格{location['table']} ({location['row']},{location['col']})"
+
+def short(text, length=30):
+    text = text.replace('\n', '|')
+    return text if len(text) <= length else text[:length - 3] + '...'
+
+def select(structure, subcommand):
+    """子命令对应的数据（--json 输出）"""
+    if subcommand == 'grid':
+        return [{'index': table['index'], 'grid': cell_grid(table)} for table in structure['tables']]
+    return structure[subcommand]
+
+def print_text(structure, subcommand):
+    if subcommand == 'paragraphs':
+        for paragraph in structure['paragraphs']:
+            if paragraph['text'].strip():
+                style = f" ({paragraph['style']})" if paragraph['style'] else ''
+                print(f"[{paragraph['index']}]{style} {paragraph['text']}")
+
+    elif subcommand == 'tables':
+        for table in structure['tables']:
+            nested = f"，嵌套在表格{table['parent']}中" if table['parent'] is not None else ''
+            print(f"表格 {table['index']}（{len(table['rows'])}行{nested}）:")
+            for row_index, row in enumerate(table['rows']):
+                print(f"  行{row_index}: {' | '.join(short(cell['text']) for cell in row)}")
+
+    elif subcommand == 'grid':
+        for table in structure['tables']:
+            print(f"表格 {table['index']}:")
+            for row_index, line in enumerate(cell_grid(table)):
+                print('  ' + ' '.join(f"({row_index},{col})[{short(text, 20)}]" for col, text in enumerate(line)))
+
+    elif subcommand == 'placeholders':
+        split = 0
+        for item in structure['placeholders']:
+            mark = '  ⚠️ 被拆分到多个run中' if item['split'] else ''
+            split += item['split']
+            print(f"  {item['syntax']:<20} {describe_location(item['location'])}  {short(item['text'], 40)}{mark}")
+        print(f"共 {len(structure['placeholders'])} 个占位符" +
+              (f"，{split} 个被拆分（可用 normalize_template.py 合并）" if split else ''))
+
+    elif subcommand == 'numbers':
+        for item in structure['numbers']:
+            print(f"  {describe_location(item['location'])}: {', '.join(item['numbers'])}  {short(item['text'], 40)}")
+
+def template_paths(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            for name in sorted(os.listdir(target)):
+                if name.endswith('.docx') and not name.startswith('~$'):
+                    paths.append(os.path.join(target, name))
+        else:
+            paths.append(target)
+    return paths
+
+def main():
+    args = sys.argv[1:]
+    as_json = '--json' in args
+    use_cache = '--no-cache' not in args
+    jobs = None
+    if '--jobs' in args:
+        position = args.index('--jobs')
+        jobs = int(args[position + 1])
+        del args[position:position + 2]
+    args = [arg for arg in args if arg not in ('--json', '--no-cache')]
+
+    # 不指定子命令时查看占位符
+    if not args or (args[0] not in SUBCOMMANDS and os.path.exists(args[0])):
+        args.insert(0, 'placeholders')
+    if args[0] not in SUBCOMMANDS:
+        print(f"Usage: python inspect_template.py [{'|'.join(SUBCOMMANDS)}] [template_or_dir...] "
+              "[--json] [--jobs N] [--no-cache]")
+        sys.exit(1)
+
+    subcommand = args[0]
+    paths = template_paths(args[1:] or [os.path.join(SCRIPT_DIR, '..', 'muban')])
+    # Windows 下进程池最多支持 61 个进程
+    jobs = max(1, min(jobs or os.cpu_count() or 1, 61, len(paths) or 1))
+
+    if jobs == 1:
+        results = [inspect_file((path, use_cache)) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(inspect_file, [(path, use_cache) for path in paths]))
+
+    failed = 0
+    for template_path, structure, error in results:
+        name = os.path.basename(template_path)
+        if as_json:
+            line = {'template': name}
+            if error is None:
+                line[subcommand] = select(structure, subcommand)
+            else:
+                line['error'] = error
+            print(json.dumps(line, ensure_ascii=False))
+            failed += error is not None
+            continue
+
+        print(f"\n{'=' * 80}\n{name}\n{'=' * 80}")
+        if error is not None:
+            print(f"❌ 无法读取: {error}")
+            failed += 1
+        else:
+            print_text(structure, subcommand)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
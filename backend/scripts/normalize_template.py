@@ -0,0 +1,282 @@
+"""
+模板规范化：把被Word拆到多个run中的占位符合并回一个run
+用法:
+    python normalize_template.py <模板.docx> [-o 输出.docx] [--in-place] [--check] [--json]
+
+Word 编辑模板时经常把 {{item1_content}}、{1}、{派驻监所}、*** 这样的占位符拆成几个 <w:r>，
+中间还会夹着拼写检查标记(w:proofErr)和书签，逐run替换时就找不到占位符。
+本工具逐段把正文、页眉、页脚中的占位符所在的run合并为一个：
+  - 只合并格式相同的纯文本run（比较 w:rPr 时忽略只影响拼写检查的 w:lang、w:noProof）
+  - 删除占位符中间的 w:proofErr、空run，以及书签（成对删除 bookmarkStart/bookmarkEnd）
+  - 只改动含被拆分占位符的部件，其余部件原样复制
+处理不了的占位符（格式不同、中间有制表符/域/超链接等）逐个列出，需要在Word中手工处理。
+
+默认输出到 <模板名>_normalized.docx，--in-place 覆盖原模板，--check 只检查不写出。
+有未能合并的占位符时退出码为 1。
+规范化后的模板中每个占位符都完整位于一个run内，replace_template.py 等渲染方式可以直接逐run替换。
+"""
+from docx.oxml.parser import parse_xml
+from docx.opc.oxml import serialize_part_xml
+from lxml import etree
+from docx_package import Package, write_package
+import sys
+import os
+import re
+import copy
+import json
+from collections import Counter
+
+# {{item1_content}}、{1}、{派驻监所}、***
+PLACEHOLDER = re.compile(r'\{\{[^{}]+\}\}|\{[^{}\s]+\}|\*\*\*')
+PART_NAME = re.compile(r'^word/(document|header\d*|footer\d*)\.xml$')
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_T = W_NS + 't'
+W_RPR = W_NS + 'rPr'
+W_PPR = W_NS + 'pPr'
+W_TAB = W_NS + 'tab'
+W_BR = W_NS + 'br'
+W_CR = W_NS + 'cr'
+W_LANG = W_NS + 'lang'
+W_NO_PROOF = W_NS + 'noProof'
+W_PROOF_ERR = W_NS + 'proofErr'
+W_BOOKMARK_START = W_NS + 'bookmarkStart'
+W_BOOKMARK_END = W_NS + 'bookmarkEnd'
+W_ID = W_NS + 'id'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# 占位符中间可以直接删除的元素
+NOISE = (W_PROOF_ERR, W_BOOKMARK_START, W_BOOKMARK_END)
+# 不影响显示格式、合并时可以忽略的 rPr 子元素
+IGNORED_FORMAT = (W_LANG, W_NO_PROOF)
+# 段落中不参与拼接的其他元素（超链接、域、修订等）用这个字符隔开，不会误认为跨元素的占位符
+BARRIER = '￼'
+
+def run_text(run):
+    """run 的文本；制表符、换行以及图片等非文本内容映射为分隔字符"""
+    parts = []
+    for child in run:
+        if child.tag == W_T:
+            parts.append(child.text or '')
+        elif child.tag == W_TAB:
+            parts.append('\t')
+        elif child.tag in (W_BR, W_CR):
+            parts.append('\n')
+        elif child.tag != W_RPR:
+            parts.append(BARRIER)
+    return ''.join(parts)
+
+def is_plain_run(run):
+    """只含 rPr 和 w:t 的run"""
+    return all(child.tag in (W_RPR, W_T) for child in run)
+
+def format_key(run):
+    """用于比较格式的 rPr 序列化结果"""
+    rpr = run.find(W_RPR)
+    if rpr is None:
+        return b''
+    rpr = copy.deepcopy(rpr)
+    for child in list(rpr):
+        if child.tag in IGNORED_FORMAT:
+            rpr.remove(child)
+    return etree.tostring(rpr, method='c14n')
+
+def paragraph_pieces(paragraph):
+    """返回段落的拼接文本和各直接子元素对应的 (元素, 起点, 终点)"""
+    pieces = []
+    texts = []
+    position = 0
+    for child in paragraph:
+        if child.tag == W_R:
+            text = run_text(child)
+        elif child.tag == W_PPR or child.tag in NOISE:
+            text = ''
+        else:
+            text = BARRIER
+        pieces.append((child, position, position + len(text)))
+        texts.append(text)
+        position += len(text)
+    return ''.join(texts), pieces
+
+def full_text(paragraph):
+    """段落的全部文字，包括超链接、域等元素内的run（不包括文本框中嵌套的段落）"""
+    return ''.join(t.text or '' for t in paragraph.iter(W_T) if next(t.iterancestors(W_P)) is paragraph)
+
+def set_run_text(run, text):
+    """把 run 中的所有 w:t 替换为一个"""
+    for t in run.findall(W_T):
+        run.remove(t)
+    t = etree.SubElement(run, W_T)
+    t.text = text
+    if text != text.strip():
+        t.set(XML_SPACE, 'preserve')
+
+def merge_placeholder(paragraph, start, end, removed_bookmarks):
+    """把覆盖 [start, end) 的run合并为一个，返回 None 表示成功，否则返回失败原因"""
+    _, pieces = paragraph_pieces(paragraph)
+    covered = [i for i, (child, s, e) in enumerate(pieces) if s < end and e > start]
+    first, last = covered[0], covered[-1]
+
+    runs = []
+    noise = []
+    for child, s, e in pieces[first:last + 1]:
+        if child.tag == W_R and s < e:
+            runs.append(child)
+        elif child.tag == W_R and is_plain_run(child):
+            # 空run
+            noise.append(child)
+        elif child.tag in NOISE:
+            noise.append(child)
+        else:
+            return '中间有超链接、域或修订等其他内容'
+
+    if not all(is_plain_run(run) for run in runs):
+        return '所在run中有制表符、换行或图片等非文本内容'
+    keys = {format_key(run) for run in runs}
+    if len(keys) > 1:
+        return '各部分的格式不同'
+
+    set_run_text(runs[0], ''.join(run_text(run) for run in runs))
+    for child in runs[1:] + noise:
+        if child.tag in (W_BOOKMARK_START, W_BOOKMARK_END):
+            removed_bookmarks.add(child.get(W_ID))
+        paragraph.remove(child)
+    return None
+
+def normalize_part(root, part):
+    """规范化一个XML部件，返回 (合并的占位符数, 本来就完整的占位符数, 未能合并的占位符列表)"""
+    merged = 0
+    intact = 0
+    failures = []
+    removed_bookmarks = set()
+
+    for paragraph_index, paragraph in enumerate(root.iter(W_P)):
+        whole = full_text(paragraph)
+        if '{' not in whole and '*' not in whole:
+            continue
+        text, pieces = paragraph_pieces(paragraph)
+        found = []
+
+        matches = list(PLACEHOLDER.finditer(text))
+        # 从后往前合并，前面占位符对应的run不受影响
+        for match in reversed(matches):
+            runs = [child for child, s, e in pieces
+                    if child.tag == W_R and s < match.end() and e > match.start()]
+            if len(runs) == 1:
+                intact += 1
+                continue
+            reason = merge_placeholder(paragraph, match.start(), match.end(), removed_bookmarks)
+            if reason is None:
+                merged += 1
+                _, pieces = paragraph_pieces(paragraph)
+            else:
+                found.append((match.group(0), len(runs), reason))
+        found.reverse()
+
+        # 跨超链接、域等元素的占位符在拼接文本中被隔开，只能在段落全部文字中找到，只能报告
+        crossing = Counter(PLACEHOLDER.findall(whole)) - \
+            Counter(match.group(0) for match in matches)
+        for placeholder in crossing.elements():
+            found.append((placeholder, None, '中间隔着制表符、超链接、域或修订等其他内容'))
+
+        for placeholder, runs, reason in found:
+            failures.append({
+                'part': part,
+                'paragraph': paragraph_index,
+                'placeholder': placeholder,
+                'runs': runs,
+                'reason': reason,
+                'text': whole[:80],
+            })
+
+    # 书签成对删除，避免留下只有开始或结束的书签
+    if removed_bookmarks:
+        for element in list(root.iter(W_BOOKMARK_START, W_BOOKMARK_END)):
+            if element.get(W_ID) in removed_bookmarks:
+                element.getparent().remove(element)
+
+    return merged, intact, failures
+
+def normalize_template(template_path, output_path=None):
+    """规范化模板，output_path 为 None 时只检查；返回报告"""
+    with open(template_path, 'rb') as f:
+        package = Package(f.read())
+
+    report = {'template': template_path, 'merged': 0, 'intact': 0, 'failures': [], 'parts': []}
+    replacements = {}
+    for info in package.infos:
+        if not PART_NAME.match(info.filename):
+            continue
+        root = parse_xml(package.read(info.filename))
+        merged, intact, failures = normalize_part(root, info.filename)
+        report['merged'] += merged
+        report['intact'] += intact
+        report['failures'].extend(failures)
+        if merged:
+            report['parts'].append(info.filename)
+            replacements[info.filename] = serialize_part_xml(root)
+
+    if output_path is not None:
+        # 先写临时文件，--in-place 时出错也不会损坏原模板
+        temp = f'{output_path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            write_package(package, replacements, f)
+        os.replace(temp, output_path)
+        report['output'] = output_path
+    return report
+
+def print_report(report):
+    print(f"模板: {report['template']}")
+    print(f"完整的占位符: {report['intact']} 个，合并: {report['merged']} 个，"
+          f"未能合并: {len(report['failures'])} 个")
+    if report['parts']:
+        print(f"改动的部件: {', '.join(report['parts'])}")
+    for failure in report['failures']:
+        runs = f"（分在{failure['runs']}个run中）" if failure['runs'] else ''
+        print(f"  [{failure['part']} 第{failure['paragraph'] + 1}段] {failure['placeholder']}{runs}: "
+              f"{failure['reason']}")
+        print(f"      {failure['text']}")
+    if 'output' in report:
+        print(f"已保存: {report['output']}")
+
+def main():
+    args = sys.argv[1:]
+    as_json = '--json' in args
+    in_place = '--in-place' in args
+    check = '--check' in args
+    output = None
+    if '-o' in args:
+        position = args.index('-o')
+        output = args[position + 1] if position + 1 < len(args) else ''
+        del args[position:position + 2]
+    args = [arg for arg in args if arg not in ('--json', '--in-place', '--check')]
+
+    if len(args) != 1 or args[0].startswith('-') or output == '':
+        print("Usage: python normalize_template.py <template.docx> [-o output.docx] [--in-place] [--check] [--json]")
+        sys.exit(1)
+
+    template_path = args[0]
+    if check:
+        output = None
+    elif in_place:
+        output = template_path
+    else:
+        output = output or os.path.splitext(template_path)[0] + '_normalized.docx'
+
+    try:
+        report = normalize_template(template_path, output)
+    except Exception as e:
+        print(f"处理失败: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if as_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    # --check 时还有需要合并的占位符同样算作不通过
+    sys.exit(1 if report['failures'] or (check and report['merged']) else 0)
+
+if __name__ == '__main__':
+    main()
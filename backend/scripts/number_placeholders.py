@@ -1,13 +1,18 @@
 """
 将模板中的***替换为{1}, {2}, {3}...数字占位符
+替换后为输出模板生成占位符清单（template_manifest.py）；占位符数量以已有的清单为准，
+数量不一致时不更新清单并以退出码 1 结束。
 """
 from docx import Document
+from template_manifest import build_manifest, load_manifest, write_manifest
 import sys
 import os
 
 def number_placeholders(doc_path, output_path):
     """将***替换为数字占位符"""
     doc = Document(doc_path)
+    # 预期的占位符数量：输出模板已有的清单，没有时用输入模板的清单
+    previous = load_manifest(output_path) or load_manifest(doc_path)
     
     placeholder_count = 0
     replacements = []
@@ -48,15 +53,22 @@ def number_placeholders(doc_path, output_path):
     
     print("\n" + "=" * 80)
     print(f"✅ 共替换了 {placeholder_count} 个占位符")
-    print(f"✅ 预期应该有59个占位符")
-    
-    if placeholder_count == 59:
-        print("✅ 数量正确!")
-    else:
-        print(f"⚠️  警告: 实际{placeholder_count}个，预期59个，相差{59-placeholder_count}个")
-    
     print(f"✅ 新文件已保存: {output_path}")
+
+    if previous is not None:
+        expected = len(previous['placeholders'])
+        print(f"✅ 预期应该有{expected}个占位符（{previous['template']} 的清单）")
+        if placeholder_count != expected:
+            print(f"❌ 实际{placeholder_count}个，预期{expected}个，相差{expected - placeholder_count}个，未更新占位符清单")
+            print("=" * 80)
+            return False
+        print("✅ 数量正确!")
+
+    manifest = build_manifest(output_path)
+    path = write_manifest(output_path, manifest)
+    print(f"✅ 占位符清单已更新: {path}（{len(manifest['placeholders'])} 个占位符）")
     print("=" * 80)
+    return True
 
 if __name__ == '__main__':
     template_dir = r"E:\CODE\paizhu-software\backend\muban"
@@ -70,4 +82,5 @@ if __name__ == '__main__':
     print("="*80)
     print("将***替换为数字占位符 {1}, {2}, {3}...")
     print("="*80)
-    number_placeholders(input_file, output_file)
+    if not number_placeholders(input_file, output_file):
+        sys.exit(1)
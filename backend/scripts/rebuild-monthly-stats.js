@@ -0,0 +1,50 @@
+/**
+ * 重建月度统计汇总（monthly_stats）
+ * 首次上线补历史数据，或汇总与记录不一致时按记录重新计算
+ * 汇总按用户和月份保存，--prison 重建该派驻单位现有用户的汇总
+ *
+ * 使用方式:
+ *   npm run stats:rebuild                                   重建全部
+ *   npm run stats:rebuild -- --month 2025-03                只重建某月
+ *   npm run stats:rebuild -- --prison 女子监狱 --month 2025-03
+ */
+require('dotenv').config()
+
+const { sequelize, MonthlyStats } = require('../models')
+const { rebuildMonthlyStats } = require('../utils/monthlyStats')
+
+function parseArgs(argv) {
+    const scope = {}
+    for (let i = 0; i < argv.length; i++) {
+        if (argv[i] === '--month') scope.reportMonth = argv[++i]
+        else if (argv[i] === '--prison') scope.prisonName = argv[++i]
+    }
+    return scope
+}
+
+async function main() {
+    const scope = parseArgs(process.argv.slice(2))
+    if (scope.reportMonth && !/^\d{4}-\d{2}$/.test(scope.reportMonth)) {
+        console.error('❌ 月份格式应为 YYYY-MM')
+        process.exit(1)
+    }
+
+    try {
+        await sequelize.authenticate()
+        console.log('✅ 数据库连接成功')
+
+        // 汇总表不存在时创建
+        await MonthlyStats.sync()
+
+        console.log(`🔄 开始重建月度统计: ${scope.prisonName || '全部派驻单位'} ${scope.reportMonth || '全部月份'}`)
+        const start = Date.now()
+        const count = await rebuildMonthlyStats(scope)
+        console.log(`✅ 重建完成，共 ${count} 行汇总，耗时 ${Date.now() - start}ms`)
+        process.exit(0)
+    } catch (error) {
+        console.error('❌ 重建月度统计失败:', error)
+        process.exit(1)
+    }
+}
+
+main()
@@ -1,48 +1,451 @@
 """
-直接替换Word模板中的***占位符
+直接替换Word模板中的***占位符（也支持 {1}、{2} 这样的数字占位符和 {名称}、{{名称}} 这样的命名占位符）
+用法:
+    python replace_template.py <template_path> <data_json>    填充模板，docx输出到stdout
+    python replace_template.py --compile <template_path>      只生成占位符索引
+    python replace_template.py --batch <jobs.jsonl|-> (--out-dir 目录 | --zip 文件|-) [--jobs N] [--summary 文件]
+                                                              批量填充，多进程并行
+    python replace_template.py --serve [模板目录]            常驻渲染服务，从stdin逐行读取请求
+    加 --python-docx 时用 python-docx 加载并整体保存文档（原来的方式）
+
+批量模式每行一个任务: {"template": "模板路径", "values": {...}, "output": "输出文件名"}
+输出写入目录，或者写入一个zip（可以是stdout）；每个进程中同一个模板只加载、解析一次。
+结束后按任务顺序输出每个任务的摘要（耗时、字节数、未填充的占位符），
+默认写到stdout（zip输出到stdout时写到stderr），可用 --summary 指定文件。
+
+常驻服务启动时加载模板目录（默认 ../muban）中的全部 .docx，解析结果和索引常驻内存，
+每次请求前检查模板文件的修改时间和大小，有变化时自动重新加载。协议:
+    请求（一行JSON）: {"id": 1, "template": "派驻检察室月度工作情况报告.docx", "values": {...}}
+    响应: 一行JSON头 {"id": 1, "success": true, "length": N, "unfilled": [...], "ms": 1.2}，
+          随后是恰好 N 字节的 .docx 内容（失败时 length 为 0，带 error）
+
+默认只重写含占位符的XML部件，其余部件（图片、样式、编号等）直接复制压缩后的字节，
+不经过 python-docx 的对象模型，也不重新压缩，模板中图片、印章再多，耗时和内存也基本不变。
+
+占位符按文档顺序编号（先正文段落，再表格，与 number_placeholders.py 一致）：
+{N} 取 data["N"]，第N个 *** 同样取 data["N"]；data 中没有该键时按值的顺序取第N个值，
+{名称}、{{名称}} 只按键取 data["名称"]；都没有时保留占位符原样。
+占位符的写法和编号与 template_manifest.py 的清单相同（共用同一个正则）。
+占位符需要完整位于一个run中；被Word拆开的占位符先用 normalize_template.py 合并。
+
+模板第一次使用时扫描一遍，把每个占位符所在的段落路径、run序号和偏移记录到
+模板旁的 <模板文件名>.placeholders.json；之后直接按索引写入，不再遍历整个文档。
+索引中记录了模板的SHA-256，模板被修改后自动重新生成。
+
+模板旁有占位符清单（template_manifest.py 生成的 <模板文件名>.manifest.json）时，渲染前先按清单校验取值，
+校验失败的任务不渲染：批量模式的摘要和常驻服务的响应头中 error 为“取值校验失败”，invalid 列出各项错误。
 """
 from docx import Document
+from docx.oxml.parser import parse_xml
+from docx.opc.oxml import serialize_part_xml
+from docx_package import Package, write_package
+from template_manifest import PLACEHOLDER, iter_body_paragraphs, lookup_value, load_manifest, validate_values
 import sys
+import os
+import io
+import copy
 import json
+import time
+import hashlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = '.placeholders.json'
+DOCUMENT_PART = 'word/document.xml'
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+
+def compile_placeholders(body):
+    """扫描一遍文档正文(w:body)，返回占位符列表（只识别完整位于同一个run中的占位符，与原来的替换方式相同）"""
+    placeholders = []
+    star_count = 0
+    for path, paragraph in iter_body_paragraphs(body):
+        for run_index, run in enumerate(paragraph.r_lst):
+            text = run.text
+            if '***' not in text and '{' not in text:
+                continue
+            for match in PLACEHOLDER.finditer(text):
+                if match.group(0) == '***':
+                    star_count += 1
+                    key = str(star_count)
+                else:
+                    key = match.group(1) or match.group(2)
+                placeholders.append({
+                    'key': key,
+                    'part': DOCUMENT_PART,
+                    'paragraph': path,
+                    'run': run_index,
+                    'offset': match.start(),
+                    'length': match.end() - match.start(),
+                })
+    return placeholders
+
+def index_path(template_path):
+    return template_path + INDEX_SUFFIX
+
+def load_index(template_path, template_hash, compile):
+    """读取模板旁的占位符索引，不存在或模板已修改时调用 compile() 重新扫描并保存"""
+    path = index_path(template_path)
+    try:
+        with open(path, encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION and index.get('sha256') == template_hash:
+            return index
+    except (OSError, ValueError):
+        pass
+
+    index = {
+        'version': INDEX_VERSION,
+        'sha256': template_hash,
+        'placeholders': compile(),
+    }
+    try:
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp, path)
+    except OSError as e:
+        # 模板目录不可写时只是每次重新扫描，不影响填充
+        print(f"无法保存占位符索引 {path}: {e}", file=sys.stderr)
+    return index
+
+def fill_placeholders(body, placeholders, data):
+    """按索引直接写入各占位符所在的run，返回没有取到值的占位符编号"""
+    values = list(data.values()) if isinstance(data, dict) else list(data)
+    unfilled = set()
+
+    by_run = {}
+    for item in placeholders:
+        by_run.setdefault((tuple(item['paragraph']), item['run']), []).append(item)
+
+    for (path, run_index), items in by_run.items():
+        paragraph = body
+        for i in path:
+            paragraph = paragraph[i]
+        run = paragraph.r_lst[run_index]
+
+        text = run.text
+        # 从后往前替换，前面占位符的偏移不受影响
+        for item in sorted(items, key=lambda x: x['offset'], reverse=True):
+            value = lookup_value(data, values, item['key'])
+            if value is None:
+                unfilled.add(id(item))
+                continue
+            start = item['offset']
+            text = text[:start] + str(value) + text[start + item['length']:]
+        run.text = text
+    return [item['key'] for item in placeholders if id(item) in unfilled]
 
 def replace_stars_in_document(doc_path, replacements):
-    """在Word文档中替换***占位符"""
-    doc = Document(doc_path)
-    
-    # 替换段落
-    for paragraph in doc.paragraphs:
-        for key, value in replacements.items():
-            if '***' in paragraph.text:
-                for run in paragraph.runs:
-                    run.text = run.text.replace('***', str(value), 1) if '***' in run.text else run.text
-   
-    # 替换表格
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    for key, value in replacements.items():
-                        if '***' in paragraph.text:
-                            for run in paragraph.runs:
-                                run.text = run.text.replace('***', str(value), 1) if '***' in run.text else run.text
-    
+    """在Word文档中替换***占位符（python-docx 方式，返回 Document）"""
+    with open(doc_path, 'rb') as f:
+        content = f.read()
+    doc = Document(io.BytesIO(content))
+    body = doc.element.body
+    index = load_index(doc_path, hashlib.sha256(content).hexdigest(), lambda: compile_placeholders(body))
+    fill_placeholders(body, index['placeholders'], replacements)
     return doc
 
+class Template:
+    """
+    已加载的模板：原始包、占位符索引和含占位符部件的解析结果，可以反复渲染。
+    每次渲染复制一份解析好的XML再填充，模板本身不变。
+    """
+
+    def __init__(self, template_path):
+        with open(template_path, 'rb') as f:
+            content = f.read()
+        template_hash = hashlib.sha256(content).hexdigest()
+        self.path = template_path
+        self.package = Package(content)
+        self.roots = {}
+        self.manifest = load_manifest(template_path, template_hash)
+        self.index = load_index(template_path, template_hash,
+                                lambda: compile_placeholders(self.part_root(DOCUMENT_PART).find(W_BODY)))
+
+        self.by_part = {}
+        for item in self.index['placeholders']:
+            self.by_part.setdefault(item['part'], []).append(item)
+        for part in self.by_part:
+            self.part_root(part)
+
+    def validate(self, replacements):
+        """按占位符清单校验取值，返回错误列表；模板没有清单时不校验"""
+        if self.manifest is None:
+            return []
+        return validate_values(self.manifest, replacements)
+
+    def part_root(self, name):
+        if name not in self.roots:
+            self.roots[name] = parse_xml(self.package.read(name))
+        return self.roots[name]
+
+    def render(self, replacements, out):
+        """
+        只重写含占位符的部件，其余部件原样复制压缩字节，结果写入 out，返回没有取到值的占位符编号
+        包过大等无法原样复制的情况回退到 python-docx 方式
+        """
+        unfilled = []
+        parts = {}
+        for part, placeholders in self.by_part.items():
+            root = copy.deepcopy(self.roots[part])
+            unfilled.extend(fill_placeholders(root.find(W_BODY), placeholders, replacements))
+            parts[part] = serialize_part_xml(root)
+
+        try:
+            write_package(self.package, parts, out)
+        except ValueError:
+            replace_stars_in_document(self.path, replacements).save(out)
+        return unfilled
+
+def render_template(template_path, replacements, out):
+    """填充模板并写入 out，返回没有取到值的占位符编号"""
+    return Template(template_path).render(replacements, out)
+
+# 批量模式下每个进程已加载的模板
+loaded_templates = {}
+
+def render_job(job):
+    """批量模式的单个任务，返回摘要；渲染结果写入文件时 content 为 None"""
+    index, template_path, values, output, out_dir = job
+    start = time.perf_counter()
+    summary = {'index': index, 'template': template_path, 'output': output}
+    try:
+        template = loaded_templates.get(template_path)
+        if template is None:
+            template = loaded_templates[template_path] = Template(template_path)
+
+        errors = template.validate(values)
+        if errors:
+            # 取值有误的任务不渲染
+            summary['success'] = False
+            summary['error'] = '取值校验失败'
+            summary['invalid'] = errors
+            summary['ms'] = round((time.perf_counter() - start) * 1000, 2)
+            return summary, None
+
+        buffer = io.BytesIO()
+        summary['unfilled'] = template.render(values, buffer)
+        content = buffer.getvalue()
+        summary['bytes'] = len(content)
+        if out_dir is not None:
+            path = os.path.join(out_dir, output)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            content = None
+        summary['success'] = True
+    except Exception as e:
+        summary['success'] = False
+        summary['error'] = str(e)
+        content = None
+    summary['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return summary, content
+
+class TemplateStore:
+    """常驻服务中已加载的模板，模板文件修改后自动重新加载"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        # 模板路径 -> ((修改时间, 大小), Template)
+        self.templates = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.docx') or name.startswith('~$'):
+                continue
+            try:
+                self.get(name)
+            except Exception as e:
+                # 个别模板损坏或实际是 .doc 文件，不影响其他模板
+                print(f"模板加载失败 {name}: {e}", file=sys.stderr)
+
+    def get(self, name):
+        """按模板文件名（相对于模板目录）或绝对路径取模板"""
+        path = name if os.path.isabs(name) else os.path.join(self.directory, name)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        loaded = self.templates.get(path)
+        if loaded is None or loaded[0] != signature:
+            loaded = self.templates[path] = (signature, Template(path))
+        return loaded[1]
+
+def run_service(template_dir):
+    """常驻渲染服务：逐行读取请求，每个响应为一行JSON头加 .docx 内容"""
+    store = TemplateStore(template_dir)
+    print(f"模板渲染服务已启动，已加载 {len(store.templates)} 个模板", file=sys.stderr)
+    stdout = sys.stdout.buffer
+
+    for line in sys.stdin.buffer:
+        line = line.strip()
+        if not line:
+            continue
+
+        start = time.perf_counter()
+        header = {'id': None}
+        content = b''
+        try:
+            request = json.loads(line.decode('utf-8'))
+            header['id'] = request.get('id')
+            template = store.get(request['template'])
+            values = request.get('values') or {}
+            errors = template.validate(values)
+            if errors:
+                header['success'] = False
+                header['error'] = '取值校验失败'
+                header['invalid'] = errors
+            else:
+                buffer = io.BytesIO()
+                header['unfilled'] = template.render(values, buffer)
+                content = buffer.getvalue()
+                header['success'] = True
+        except Exception as e:
+            header['success'] = False
+            header['error'] = str(e)
+
+        header['length'] = len(content)
+        header['ms'] = round((time.perf_counter() - start) * 1000, 2)
+        stdout.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n' + content)
+        stdout.flush()
+
+def read_jobs(source):
+    """读取批量任务（JSONL文件或 - 表示stdin），返回 [(序号, 模板, 值, 输出文件名)]"""
+    if source == '-':
+        lines = sys.stdin.buffer.read().decode('utf-8').splitlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        job = json.loads(line)
+        index = len(jobs)
+        output = job.get('output') or f"{index:04d}_{os.path.basename(job['template'])}"
+        # 输出文件名只能是相对路径，不能跳出输出目录
+        output = os.path.normpath(output).replace('\\', '/')
+        if os.path.isabs(output) or output.startswith('../') or output == '..':
+            raise ValueError(f'第 {index + 1} 个任务的输出文件名无效: {job.get("output")}')
+        jobs.append((index, job['template'], job.get('values') or {}, output))
+    return jobs
+
+def run_batch(source, out_dir=None, zip_path=None, jobs=None, summary_path=None):
+    """批量填充：多进程并行渲染，写入目录或zip，最后输出每个任务的摘要"""
+    tasks = read_jobs(source)
+    # Windows 下进程池最多支持 61 个进程
+    jobs = max(1, min(jobs or os.cpu_count() or 1, 61, len(tasks) or 1))
+
+    archive = stream = None
+    if zip_path is not None:
+        stream = sys.stdout.buffer if zip_path == '-' else open(zip_path, 'wb')
+        # docx 本身已经压缩过，放进zip时不再压缩
+        archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED)
+
+    start = time.perf_counter()
+    summaries = []
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(render_job, (index, template, values, output, out_dir))
+                for index, template, values, output in tasks
+            ]
+            for future in as_completed(futures):
+                summary, content = future.result()
+                if content is not None:
+                    archive.writestr(summary['output'], content)
+                summaries.append(summary)
+    finally:
+        if archive is not None:
+            archive.close()
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+    summaries.sort(key=lambda item: item['index'])
+    if summary_path:
+        summary_stream = open(summary_path, 'w', encoding='utf-8')
+    else:
+        summary_stream = sys.stderr if zip_path == '-' else sys.stdout
+    for summary in summaries:
+        summary_stream.write(json.dumps(summary, ensure_ascii=False) + '\n')
+    if summary_path:
+        summary_stream.close()
+
+    failed = sum(1 for item in summaries if not item['success'])
+    incomplete = sum(1 for item in summaries if item.get('unfilled'))
+    print(f"批量填充完成: 共 {len(summaries)} 个文档，失败 {failed} 个，有未填充占位符 {incomplete} 个，"
+          f"耗时 {time.perf_counter() - start:.2f} 秒，并行进程 {jobs} 个", file=sys.stderr)
+    return failed == 0
+
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python replace_template.py <template_path> <data_json>")
+    args = sys.argv[1:]
+    use_python_docx = '--python-docx' in args
+    args = [arg for arg in args if arg != '--python-docx']
+
+    if len(args) == 2 and args[0] == '--compile':
+        template_path = args[1]
+        with open(template_path, 'rb') as f:
+            content = f.read()
+        package = Package(content)
+        index = load_index(template_path, hashlib.sha256(content).hexdigest(),
+                           lambda: compile_placeholders(parse_xml(package.read(DOCUMENT_PART)).find(W_BODY)))
+        print(f"✅ 共 {len(index['placeholders'])} 个占位符，索引: {index_path(template_path)}")
+        return
+
+    if args and args[0] == '--serve':
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'muban')
+        run_service(args[1] if len(args) > 1 else default_dir)
+        return
+
+    if args and args[0] == '--batch':
+        options = {'--out-dir': None, '--zip': None, '--jobs': None, '--summary': None}
+        rest = args[1:]
+        source = None
+        while rest:
+            name = rest.pop(0)
+            if name in options and rest:
+                options[name] = rest.pop(0)
+            elif source is None:
+                source = name
+            else:
+                source = None
+                break
+        if source is None or (options['--out-dir'] is None) == (options['--zip'] is None):
+            print("Usage: python replace_template.py --batch <jobs.jsonl|-> (--out-dir DIR | --zip FILE|-) "
+                  "[--jobs N] [--summary FILE]")
+            sys.exit(1)
+        ok = run_batch(source, options['--out-dir'], options['--zip'],
+                       int(options['--jobs']) if options['--jobs'] else None, options['--summary'])
+        sys.exit(0 if ok else 1)
+
+    if len(args) != 2:
+        print("Usage: python replace_template.py [--python-docx] <template_path> <data_json>")
+        print("       python replace_template.py --compile <template_path>")
+        print("       python replace_template.py --batch <jobs.jsonl|-> (--out-dir DIR | --zip FILE|-) "
+              "[--jobs N] [--summary FILE]")
+        print("       python replace_template.py --serve [template_dir]")
+        sys.exit(1)
+
+    template_path = args[0]
+    data = json.loads(args[1])
+
+    with open(template_path, 'rb') as f:
+        manifest = load_manifest(template_path, hashlib.sha256(f.read()).hexdigest())
+    errors = validate_values(manifest, data) if manifest is not None else []
+    if errors:
+        for error in errors:
+            print(f"取值校验失败: {error}", file=sys.stderr)
         sys.exit(1)
-    
-    template_path = sys.argv[1]
-    data = json.loads(sys.argv[2])
-    
-    doc = replace_stars_in_document(template_path, data)
-    
+
     # 输出到stdout (binary)
-    import io
-    buffer = io.BytesIO()
-    doc.save(buffer)
-    sys.stdout.buffer.write(buffer.getvalue())
+    if use_python_docx:
+        doc = replace_stars_in_document(template_path, data)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        sys.stdout.buffer.write(buffer.getvalue())
+    else:
+        render_template(template_path, data, sys.stdout.buffer)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,353 @@
+"""
+模板占位符清单（manifest）
+用法:
+    python template_manifest.py [模板或目录...]     生成清单，默认处理 ../muban 下生成器使用的模板
+    python template_manifest.py --check [模板或目录...]
+                                                    检查清单是否与模板一致，不一致时退出码为 1
+                                                    （指定目录时，没有清单的模板和无法读取的文件列出后跳过）
+    python template_manifest.py --validate <模板> <data_json>
+                                                    按清单校验一组取值
+
+每个模板旁生成 <模板文件名>.manifest.json，记录模板的SHA-256和每个占位符的：
+编号(id)、写法(syntax)、位置(段落路径、run序号、偏移)、前后文字、标签和取值类型。
+取值类型按占位符后面的文字推断：
+    {N}年 → year，{N}月 → month，{N}日 → day，{N}人/名/件/份/次/个/封 → count，其余为 text
+标签一般取占位符前面的文字；年/月/日按后面的文字推断类型，标签也取后面的文字（如 “{N}月工作报告” 的标签为 “月工作报告”）。
+写法和编号规则与 replace_template.py 相同（共用 PLACEHOLDER）：{N} 的编号为 N，第N个 *** 的编号为 N，
+{名称}/{{名称}} 的编号为名称。
+
+渲染前用 validate_values() 对照清单逐个检查取值（与占位符个数成正比，不需要打开模板），
+缺少的值、类型不符的值和清单中没有的编号都会列出，批量任务取值有误时在渲染前就失败。
+空字符串表示留空，任何类型都接受。取值的查找方式与渲染相同（lookup_value）：
+{N} 和 *** 先按键取值，没有该键时按值的顺序取第N个值；{名称} 只按键取值。
+对象中的键覆盖了清单中的全部编号时，多出的键不会被用到，作为错误列出（多半是写错的编号）。
+
+只有生成器使用的模板（GENERATOR_TEMPLATES）的清单随模板一起提交，其余的草稿、备份模板不生成清单；
+模板修改后重新运行本工具生成清单，清单中的SHA-256与模板不一致时渲染方不使用该清单。
+"""
+from docx.oxml.parser import parse_xml
+from docx_package import Package
+from normalize_template import normalize_part
+import sys
+import os
+import re
+import copy
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+# templateGenerator.js 实际加载的模板（工作日志、月度报告、事项清单）
+GENERATOR_TEMPLATES = [
+    'template_fresh.docx',
+    '派驻检察室月度工作情况报告.docx',
+    '派驻检察工作报告事项清单_with_placeholders.docx',
+]
+DOCUMENT_PART = 'word/document.xml'
+# {{item1_content}}、{名称}、{1}、***
+PLACEHOLDER = re.compile(r'\{\{([^{}]+)\}\}|\{([^{}\s]+)\}|\*\*\*')
+# 标签取占位符前面最近一段不含标点和其他占位符的文字
+LABEL_BOUNDARY = re.compile(r'[，。；：、,;:（）()“”"{}*\s]')
+CONTEXT_LENGTH = 12
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_TBL = W_NS + 'tbl'
+W_TR = W_NS + 'tr'
+W_TC = W_NS + 'tc'
+
+TYPE_NAMES = {
+    'count': '非负整数',
+    'year': '年份',
+    'month': '月份(1-12)',
+    'day': '日期(1-31)',
+    'text': '文字',
+}
+COUNT_UNITS = '人名件份次个封'
+DIGITS = re.compile(r'^\d+$')
+
+def iter_body_paragraphs(body):
+    """按 number_placeholders.py 的顺序返回 (段落路径, 段落元素)：先正文段落，再各表格单元格中的段落"""
+    children = list(body)
+    for i, child in enumerate(children):
+        if child.tag == W_P:
+            yield [i], child
+
+    for i, child in enumerate(children):
+        if child.tag != W_TBL:
+            continue
+        for row_index, row in enumerate(child):
+            if row.tag != W_TR:
+                continue
+            for cell_index, cell in enumerate(row):
+                if cell.tag != W_TC:
+                    continue
+                for p_index, paragraph in enumerate(cell):
+                    if paragraph.tag == W_P:
+                        yield [i, row_index, cell_index, p_index], paragraph
+
+def lookup_value(data, values, key):
+    """按占位符编号取值：先按键，再按顺序；没有时返回 None"""
+    if isinstance(data, dict) and key in data:
+        return data[key]
+    if not key.isdigit():
+        return None
+    position = int(key) - 1
+    if 0 <= position < len(values):
+        return values[position]
+    return None
+
+def infer_type(before, after):
+    """根据占位符前后的文字推断取值类型"""
+    if after.startswith('年'):
+        return 'year'
+    if after.startswith('月'):
+        return 'month'
+    if after.startswith('日'):
+        return 'day'
+    # “第{N}批次”这类序号可能写成中文数字，按文字处理
+    if after[:1] and after[0] in COUNT_UNITS and not before.endswith('第'):
+        return 'count'
+    return 'text'
+
+def make_label(before, after, cell_label, value_type='text'):
+    """
+    占位符的标签：前面最近的一段文字；单元格中只有占位符时取同一行前一个单元格的文字，都没有时取后面的文字。
+    年/月/日的类型由后面的文字决定，标签也取后面的文字，避免 “{N}年{M}月” 中 {M} 的标签成为 “年”
+    """
+    if value_type in ('year', 'month', 'day'):
+        segments = [segment for segment in LABEL_BOUNDARY.split(after) if segment]
+        if segments:
+            return segments[0]
+    segments = [re.sub(r'^\d+[.．、]', '', segment) for segment in LABEL_BOUNDARY.split(before)]
+    segments = [segment for segment in segments if segment and not segment.isdigit()]
+    if segments:
+        return segments[-1]
+    if cell_label:
+        return cell_label
+    segments = [segment for segment in LABEL_BOUNDARY.split(after) if segment and not segment.isdigit()]
+    return segments[0] if segments else ''
+
+def cell_label_text(cell):
+    """单元格中除占位符以外的文字（去掉空白）"""
+    text = ''.join(t.text or '' for t in cell.iter(W_NS + 't'))
+    return re.sub(r'\s', '', PLACEHOLDER.sub('', text))
+
+def scan_placeholders(body):
+    """扫描文档正文，返回清单中的占位符列表（同一编号出现多次时合并为一项，记录所有位置）"""
+    placeholders = {}
+    star_count = 0
+    for path, paragraph in iter_body_paragraphs(body):
+        runs = paragraph.r_lst
+        texts = [run.text for run in runs]
+        paragraph_text = ''.join(texts)
+        if '{' not in paragraph_text and '***' not in paragraph_text:
+            continue
+
+        cell_label = ''
+        if len(path) == 4:
+            row = body[path[0]][path[1]]
+            cells = [child for child in row if child.tag == W_TC]
+            # 同一行中左边最近的、有文字的单元格
+            for cell in reversed(cells[:cells.index(row[path[2]])]):
+                cell_label = cell_label_text(cell)
+                if cell_label:
+                    break
+
+        run_start = 0
+        for run_index, text in enumerate(texts):
+            for match in PLACEHOLDER.finditer(text):
+                if match.group(0) == '***':
+                    star_count += 1
+                    key = str(star_count)
+                else:
+                    key = match.group(1) or match.group(2)
+                start = run_start + match.start()
+                end = run_start + match.end()
+                before = paragraph_text[max(0, start - CONTEXT_LENGTH):start]
+                after = paragraph_text[end:end + CONTEXT_LENGTH]
+                location = {
+                    'part': DOCUMENT_PART,
+                    'paragraph': path,
+                    'run': run_index,
+                    'offset': match.start(),
+                    'length': match.end() - match.start(),
+                }
+                if key in placeholders:
+                    placeholders[key]['locations'].append(location)
+                    continue
+                value_type = infer_type(before, after)
+                placeholders[key] = {
+                    'id': key,
+                    'syntax': match.group(0),
+                    'type': value_type,
+                    'label': make_label(before, after, cell_label, value_type),
+                    'before': before,
+                    'after': after,
+                    'locations': [location],
+                }
+            run_start += len(text)
+    return list(placeholders.values())
+
+def manifest_path(template_path):
+    return template_path + MANIFEST_SUFFIX
+
+def build_manifest(template_path):
+    """扫描模板生成清单（不写文件）；被拆分到多个run中的占位符记录在 split 中"""
+    with open(template_path, 'rb') as f:
+        content = f.read()
+    root = parse_xml(Package(content).read(DOCUMENT_PART))
+    # 在副本上检查有没有被Word拆开的占位符，不改动模板
+    merged, _, failures = normalize_part(copy.deepcopy(root), DOCUMENT_PART)
+    return {
+        'version': MANIFEST_VERSION,
+        'template': os.path.basename(template_path),
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'placeholders': scan_placeholders(root.find(W_BODY)),
+        'split': merged + len(failures),
+    }
+
+def write_manifest(template_path, manifest):
+    path = manifest_path(template_path)
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(temp, path)
+    return path
+
+def load_manifest(template_path, template_hash=None):
+    """读取模板的清单；没有清单时返回 None，清单与模板不一致（template_hash 不同）时同样返回 None"""
+    path = manifest_path(template_path)
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"占位符清单无法读取 {path}: {e}", file=sys.stderr)
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    if template_hash is not None and manifest.get('sha256') != template_hash:
+        print(f"占位符清单已过期，请重新生成: {path}", file=sys.stderr)
+        return None
+    return manifest
+
+def is_count(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return value >= 0
+    return isinstance(value, str) and bool(DIGITS.match(value.strip()))
+
+def in_range(low, high):
+    def check(value):
+        if not is_count(value):
+            return False
+        return low <= int(value) <= high
+    return check
+
+VALUE_CHECKS = {
+    'count': is_count,
+    'year': in_range(1900, 2999),
+    'month': in_range(1, 12),
+    'day': in_range(1, 31),
+    'text': lambda value: isinstance(value, (str, int, float)) and not isinstance(value, bool),
+}
+
+def validate_values(manifest, data):
+    """按清单校验取值，返回错误列表（为空表示通过）"""
+    if not isinstance(data, (dict, list)):
+        return ['取值应为对象或数组']
+    errors = []
+    # 与渲染时的取值方式相同：没有对应键的 {N}/*** 按顺序取第N个值
+    values = list(data.values()) if isinstance(data, dict) else data
+    for item in manifest['placeholders']:
+        value = lookup_value(data, values, item['id'])
+        name = f"{item['syntax']}（{item['label']}）" if item['label'] else item['syntax']
+        if value is None:
+            errors.append(f"{name} 缺少值")
+        elif value != '' and not VALUE_CHECKS[item['type']](value):
+            errors.append(f"{name} 应为{TYPE_NAMES[item['type']]}，实际为 {value!r}")
+
+    if isinstance(data, dict):
+        known = {item['id'] for item in manifest['placeholders']}
+        unknown = [key for key in data if key not in known]
+        # 有编号没有对应的键时，多出的值按顺序补位，不能算作多余
+        if unknown and known.issubset(data):
+            errors.append(f"模板中没有这些占位符: {', '.join(unknown)}")
+    return errors
+
+def template_paths(targets):
+    """展开命令行中的模板和目录"""
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            for name in sorted(os.listdir(target)):
+                if name.endswith('.docx') and not name.startswith('~$'):
+                    paths.append(os.path.join(target, name))
+        else:
+            paths.append(target)
+    return paths
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] == '--validate':
+        if len(args) != 3:
+            print("Usage: python template_manifest.py --validate <template_path> <data_json>")
+            sys.exit(1)
+        manifest = load_manifest(args[1])
+        if manifest is None:
+            print(f"❌ 没有占位符清单: {manifest_path(args[1])}")
+            sys.exit(1)
+        errors = validate_values(manifest, json.loads(args[2]))
+        for error in errors:
+            print(f"❌ {error}")
+        if not errors:
+            print(f"✅ 取值有效，共 {len(manifest['placeholders'])} 个占位符")
+        sys.exit(1 if errors else 0)
+
+    check = bool(args) and args[0] == '--check'
+    if check:
+        args = args[1:]
+    template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'muban')
+    targets = args or [os.path.join(template_dir, name) for name in GENERATOR_TEMPLATES]
+
+    ok = True
+    for template_path in template_paths(targets):
+        name = os.path.basename(template_path)
+        if check and name not in GENERATOR_TEMPLATES and not os.path.exists(manifest_path(template_path)):
+            # 草稿、备份模板不提交清单
+            print(f"⏭️  {name}: 没有清单，跳过")
+            continue
+        try:
+            manifest = build_manifest(template_path)
+        except Exception as e:
+            # 实际为 .doc 的文件、损坏的文件
+            print(f"⚠️  {name}: 无法读取 ({e})")
+            continue
+
+        if manifest['split']:
+            print(f"⚠️  {name}: 有 {manifest['split']} 个占位符被拆分到多个run中，"
+                  f"请先运行 normalize_template.py")
+            ok = False
+
+        if check:
+            current = load_manifest(template_path)
+            if current != manifest:
+                print(f"❌ {name}: 清单与模板不一致")
+                ok = False
+            else:
+                print(f"✅ {name}: {len(manifest['placeholders'])} 个占位符")
+            continue
+
+        path = write_manifest(template_path, manifest)
+        print(f"✅ {name}: {len(manifest['placeholders'])} 个占位符 → {os.path.basename(path)}")
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""
+检查渲染出的文档：每个值是否写进了模板中对应的位置，是否还有没替换的占位符
+用法:
+    python verify_output.py <输出.docx> <模板.docx> [data_json | @取值文件]
+    python verify_output.py --batch <jobs.jsonl> (--out-dir 目录 | --zip 文件) [--jobs N] [--json]
+
+按模板的占位符清单（template_manifest.py 生成的 <模板文件名>.manifest.json）检查：
+  - 清单记录了每个占位符所在的段落路径、run序号和偏移，渲染只改写这个run的文字，
+    按取值依次算出每个值在run中的位置，逐个比对
+  - 全文中残留的 ***、{N}、{名称}、{{名称}} 都列为错误（包括没有取到值、原样保留的占位符）
+不给取值时只检查残留的占位符。
+
+文档只读取一遍：边解压边增量解析 word/document.xml，只记录清单中用到的run的文字，
+处理完的段落随即释放，不构建 python-docx 的对象树。
+批量模式读取 replace_template.py --batch 使用的同一个任务文件，多进程并行检查全部输出，
+每个文档输出一行结果，有任何错误时退出码为 1。
+"""
+from template_manifest import PLACEHOLDER, DOCUMENT_PART, load_manifest, lookup_value
+from replace_template import read_jobs
+import sys
+import os
+import io
+import json
+import time
+import hashlib
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_T = W_NS + 't'
+W_BR = W_NS + 'br'
+W_BR_TYPE = W_NS + 'type'
+
+# run 内需要转换为文本的元素，与 python-docx 的 run.text 相同
+RUN_TEXT = {
+    W_NS + 'tab': '\t',
+    W_NS + 'ptab': '\t',
+    W_NS + 'cr': '\n',
+    W_NS + 'noBreakHyphen': '-',
+}
+
+CHUNK_SIZE = 64 * 1024
+# 每个文档最多列出的残留占位符
+MAX_LEFTOVERS = 20
+
+class Frame:
+    """解析栈中的一层：元素、已见过的子元素个数、在正文中的路径"""
+    __slots__ = ('elem', 'children', 'path', 'runs', 'texts')
+
+    def __init__(self, elem, path):
+        self.elem = elem
+        self.children = 0
+        self.path = path
+        # 段落中直接子run的个数；段落或run的文字
+        self.runs = 0
+        self.texts = []
+
+def read_document(source, wanted_runs):
+    """
+    读取文档一遍，返回 (run文字, 残留占位符)：
+    run文字为 {(段落路径, run序号): 文字}，只包含 wanted_runs 中的run；
+    残留占位符为 [(段落序号, 占位符, 段落文字)]
+    """
+    runs = {}
+    leftovers = []
+    paragraph_count = 0
+
+    with zipfile.ZipFile(source) as zf, zf.open(DOCUMENT_PART) as stream:
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        stack = []
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+
+            for event, elem in parser.read_events():
+                tag = elem.tag
+                if event == 'start':
+                    parent = stack[-1] if stack else None
+                    path = None
+                    if parent is not None:
+                        index = parent.children
+                        parent.children += 1
+                        # 路径从 w:body 的子元素开始编号，与 replace_template.py 的段落路径相同
+                        if parent.path is not None:
+                            path = parent.path + (index,)
+                        elif parent.elem.tag == W_BODY:
+                            path = (index,)
+                    frame = Frame(elem, path)
+                    if tag == W_R and parent is not None and parent.elem.tag == W_P:
+                        frame.runs = parent.runs
+                        parent.runs += 1
+                    stack.append(frame)
+                    continue
+
+                frame = stack.pop()
+                if tag == W_T:
+                    text = elem.text or ''
+                elif tag in RUN_TEXT:
+                    text = RUN_TEXT[tag]
+                elif tag == W_BR and elem.get(W_BR_TYPE, 'textWrapping') == 'textWrapping':
+                    text = '\n'
+                else:
+                    text = None
+
+                if text is not None:
+                    # 文字记到最近的run和最近的段落上
+                    for outer in reversed(stack):
+                        if outer.elem.tag == W_R:
+                            outer.texts.append(text)
+                        elif outer.elem.tag == W_P:
+                            outer.texts.append(text)
+                            break
+                elif tag == W_R and stack and stack[-1].elem.tag == W_P:
+                    key = (stack[-1].path, frame.runs)
+                    if key in wanted_runs:
+                        runs[key] = ''.join(frame.texts)
+                elif tag == W_P:
+                    paragraph_text = ''.join(frame.texts)
+                    if '{' in paragraph_text or '***' in paragraph_text:
+                        for match in PLACEHOLDER.finditer(paragraph_text):
+                            leftovers.append((paragraph_count, match.group(0), paragraph_text))
+                    paragraph_count += 1
+
+                # 处理完的段落和表格随即释放
+                if tag in (W_P, W_NS + 'tbl') and stack:
+                    elem.clear()
+                    stack[-1].elem.remove(elem)
+
+            if not chunk:
+                break
+    return runs, leftovers
+
+def expected_slots(manifest, data):
+    """
+    按取值算出每个值在渲染结果中的位置，返回 (slots, missing)：
+    slots 为 {(段落路径, run序号): [(偏移, 值, 占位符)]}，missing 为没有取到值的占位符
+    """
+    values = list(data.values()) if isinstance(data, dict) else list(data)
+    by_run = {}
+    missing = []
+    for item in manifest['placeholders']:
+        value = lookup_value(data, values, item['id'])
+        if value is None:
+            missing.append(item['syntax'])
+            continue
+        for location in item['locations']:
+            key = (tuple(location['paragraph']), location['run'])
+            by_run.setdefault(key, []).append((location['offset'], location['length'], str(value), item))
+
+    slots = {}
+    for key, items in by_run.items():
+        # 同一个run中前面的值长度变化后，后面的值整体平移
+        shift = 0
+        for offset, length, value, item in sorted(items, key=lambda x: x[0]):
+            slots.setdefault(key, []).append((offset + shift, value, item))
+            shift += len(value) - length
+    return slots, missing
+
+def verify_document(source, manifest, data=None):
+    """检查一个文档，返回错误列表和检查的值个数"""
+    slots, missing = expected_slots(manifest, data) if data is not None else ({}, [])
+    runs, leftovers = read_document(source, set(slots))
+
+    errors = []
+    checked = 0
+    for key, items in slots.items():
+        text = runs.get(key)
+        for offset, value, item in items:
+            checked += 1
+            name = f"{item['syntax']}（{item['label']}）" if item['label'] else item['syntax']
+            if text is None:
+                errors.append(f"{name} 所在的段落或run不存在")
+            elif text[offset:offset + len(value)] != value:
+                actual = text[max(0, offset - 4):offset + len(value) + 4]
+                errors.append(f"{name} 应为 {value!r}，该位置实际为 {actual!r}")
+
+    if missing:
+        errors.append(f"没有取值的占位符: {', '.join(missing)}")
+    for paragraph, placeholder, text in leftovers[:MAX_LEFTOVERS]:
+        errors.append(f"第{paragraph + 1}段残留占位符 {placeholder}: {text[:60]}")
+    if len(leftovers) > MAX_LEFTOVERS:
+        errors.append(f"另有 {len(leftovers) - MAX_LEFTOVERS} 处残留占位符")
+    return errors, checked
+
+# 批量模式下每个进程已读取的清单
+loaded_manifests = {}
+
+def template_manifest(template_path):
+    """读取模板的清单（清单与模板不一致时视为没有清单）"""
+    if template_path not in loaded_manifests:
+        with open(template_path, 'rb') as f:
+            loaded_manifests[template_path] = load_manifest(template_path, hashlib.sha256(f.read()).hexdigest())
+    return loaded_manifests[template_path]
+
+def verify_job(job):
+    """批量模式的单个文档，返回结果"""
+    index, template_path, values, output, out_dir, zip_path = job
+    start = time.perf_counter()
+    result = {'index': index, 'template': template_path, 'output': output}
+    try:
+        manifest = template_manifest(template_path)
+        if manifest is None:
+            raise ValueError('模板没有占位符清单，请先运行 template_manifest.py 生成')
+        if zip_path is not None:
+            with zipfile.ZipFile(zip_path) as archive:
+                source = io.BytesIO(archive.read(output))
+        else:
+            source = os.path.join(out_dir, output)
+        result['errors'], result['checked'] = verify_document(source, manifest, values)
+        result['success'] = not result['errors']
+    except Exception as e:
+        result['success'] = False
+        result['errors'] = [str(e)]
+    result['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+def run_batch(source, out_dir=None, zip_path=None, jobs=None, as_json=False):
+    """并行检查批量渲染的全部输出，返回是否全部通过"""
+    # 任务文件和输出文件名的规则与 replace_template.py --batch 相同
+    tasks = read_jobs(source)
+    # Windows 下进程池最多支持 61 个进程
+    jobs = max(1, min(jobs or os.cpu_count() or 1, 61, len(tasks) or 1))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(
+            verify_job,
+            [(index, template, values, output, out_dir, zip_path) for index, template, values, output in tasks],
+            chunksize=max(1, len(tasks) // (jobs * 4)),
+        ))
+
+    for result in results:
+        if as_json:
+            print(json.dumps(result, ensure_ascii=False))
+        elif not result['success']:
+            print(f"❌ {result['output']}")
+            for error in result['errors']:
+                print(f"    {error}")
+
+    failed = sum(1 for result in results if not result['success'])
+    checked = sum(result.get('checked', 0) for result in results)
+    print(f"检查完成: 共 {len(results)} 个文档，{checked} 个值，失败 {failed} 个，"
+          f"耗时 {time.perf_counter() - start:.2f} 秒，并行进程 {jobs} 个", file=sys.stderr)
+    return failed == 0
+
+def main():
+    args = sys.argv[1:]
+    as_json = '--json' in args
+    args = [arg for arg in args if arg != '--json']
+
+    if args and args[0] == '--batch':
+        options = {'--out-dir': None, '--zip': None, '--jobs': None}
+        rest = args[1:]
+        source = None
+        while rest:
+            name = rest.pop(0)
+            if name in options and rest:
+                options[name] = rest.pop(0)
+            elif source is None:
+                source = name
+            else:
+                source = None
+                break
+        if source is None or (options['--out-dir'] is None) == (options['--zip'] is None):
+            print("Usage: python verify_output.py --batch <jobs.jsonl> (--out-dir DIR | --zip FILE) [--jobs N] [--json]")
+            sys.exit(1)
+        ok = run_batch(source, options['--out-dir'], options['--zip'],
+                       int(options['--jobs']) if options['--jobs'] else None, as_json)
+        sys.exit(0 if ok else 1)
+
+    if len(args) not in (2, 3):
+        print("Usage: python verify_output.py <output.docx> <template.docx> [data_json | @data_file]")
+        print("       python verify_output.py --batch <jobs.jsonl> (--out-dir DIR | --zip FILE) [--jobs N] [--json]")
+        sys.exit(1)
+
+    output_path, template_path = args[0], args[1]
+    manifest = template_manifest(template_path)
+    if manifest is None:
+        print(f"❌ 模板没有占位符清单，请先运行 template_manifest.py: {template_path}")
+        sys.exit(1)
+
+    data = None
+    if len(args) == 3:
+        if args[2].startswith('@'):
+            with open(args[2][1:], encoding='utf-8') as f:
+                data = json.load(f)
+        else:
+            data = json.loads(args[2])
+
+    errors, checked = verify_document(output_path, manifest, data)
+    if as_json:
+        print(json.dumps({'output': output_path, 'success': not errors, 'checked': checked, 'errors': errors},
+                         ensure_ascii=False))
+    else:
+        for error in errors:
+            print(f"❌ {error}")
+        if not errors:
+            print(f"✅ {output_path}: {checked} 个值都在对应位置，没有残留的占位符")
+    sys.exit(1 if errors else 0)
+
+if __name__ == '__main__':
+    main()
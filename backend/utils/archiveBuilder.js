@@ -0,0 +1,513 @@
+/**
+ * 月度归档包增量生成
+ * 每个归档包旁保存一份清单（<归档包>.manifest.json），记录每个条目的来源指纹（key）和压缩后数据的 SHA-256。
+ * 压缩后的数据按内容保存在 uploads/archives/blobs/ 下，再次生成时：
+ *   - 来源指纹没变的条目（日志、事件的数据行没有改动，附件文件没有改动）直接复用压缩好的数据，不重新渲染和压缩
+ *   - 只有指纹变化或新增的条目才调用 load() 重新生成
+ *   - 所有条目都没变且归档包文件完好时不重写文件
+ * 照片、Word 文档等本身已经压缩过的条目直接存储，PDF 等其他类型先探测压缩率再决定（见 chooseMethod()）
+ * 已审批的归档包由调用方通过 isArchiveCurrent() 判断后直接下载，不查询数据也不重新生成。
+ * 指定 output 时各条目并行生成、按顺序边生成边写入响应，不必等整个归档包写完再下载
+ */
+const fs = require('fs')
+const path = require('path')
+const crypto = require('crypto')
+const zlib = require('zlib')
+const { pipeline } = require('stream/promises')
+const { Transform, Writable } = require('stream')
+const { METHOD_STORE, METHOD_DEFLATE, crc32, createZipWriter } = require('./zipWriter')
+
+const MANIFEST_VERSION = 1
+const MANIFEST_SUFFIX = '.manifest.json'
+const BLOB_DIR_NAME = 'blobs'
+// 文本类条目的压缩级别（1-9）
+const COMPRESSION_LEVEL = Math.min(9, Math.max(1, parseInt(process.env.ARCHIVE_ZLIB_LEVEL) || 6))
+// 已经压缩过的格式，直接存储
+const STORED_TYPES = new Set([
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif',
+    '.mp3', '.m4a', '.aac', '.mp4', '.mov', '.avi', '.mkv', '.wmv',
+    '.zip', '.rar', '.7z', '.gz', '.bz2', '.xz',
+    '.docx', '.xlsx', '.pptx', '.wps', '.ofd'
+])
+// 文本和未压缩的格式（旧版 Office、位图），总是压缩
+const TEXT_TYPES = new Set(['.txt', '.xml', '.csv', '.json', '.html', '.htm', '.md', '.log', '.svg', '.doc', '.xls', '.bmp', '.tif', '.tiff'])
+// 压缩率探测的样本大小；样本太小时直接压缩
+const PROBE_SIZE = 64 * 1024
+const MIN_PROBE_SIZE = 1024
+// 样本压缩后仍大于原大小的这个比例时直接存储
+const MIN_SAVING_RATIO = 0.95
+
+// 同时生成的条目数（模板渲染、读取和压缩附件）
+const CONCURRENCY = Math.max(1, parseInt(process.env.ARCHIVE_CONCURRENCY) || 4)
+// 边生成边下载时是否同时写入磁盘上的归档包（设为 off 关闭）
+const STREAM_CACHE = process.env.ARCHIVE_STREAM_CACHE !== 'off'
+
+// 正在生成的归档包：归档包路径 -> { task, writesFile }，同一归档包的并发下载不重复生成
+const building = new Map()
+
+/**
+ * 计算来源指纹
+ * @param {...any} parts - 参与计算的内容（可 JSON 序列化）
+ * @returns {string}
+ */
+function hashKey(...parts) {
+    return crypto.createHash('sha256').update(JSON.stringify(parts)).digest('hex')
+}
+
+/**
+ * 一组文件的指纹（路径、大小、修改时间），用于模板和生成器代码变化后让已生成的文档失效
+ */
+function fileStamp(paths) {
+    return hashKey(paths.map((p) => {
+        try {
+            const stat = fs.statSync(p)
+            return [p, stat.size, stat.mtimeMs]
+        } catch (e) {
+            return [p, null]
+        }
+    }))
+}
+
+function manifestPath(archivePath) {
+    return archivePath + MANIFEST_SUFFIX
+}
+
+function blobDir(archivePath) {
+    return path.join(path.dirname(archivePath), BLOB_DIR_NAME)
+}
+
+function blobPath(archivePath, blob) {
+    return path.join(blobDir(archivePath), blob)
+}
+
+/**
+ * 读取归档包的清单，没有或无法读取时返回 null
+ */
+function readManifest(archivePath) {
+    try {
+        const manifest = JSON.parse(fs.readFileSync(manifestPath(archivePath), 'utf8'))
+        return manifest.version === MANIFEST_VERSION ? manifest : null
+    } catch (e) {
+        return null
+    }
+}
+
+/**
+ * 归档包文件是否与清单一致，并且清单是按这个归档状态（stamp）生成的
+ */
+function isArchiveCurrent(archivePath, stamp) {
+    const manifest = readManifest(archivePath)
+    if (!manifest || manifest.stamp !== stamp) return false
+    try {
+        return fs.statSync(archivePath).size === manifest.size
+    } catch (e) {
+        return false
+    }
+}
+
+/**
+ * 读取数据开头的一段样本
+ */
+function readSample(source) {
+    if (Buffer.isBuffer(source)) {
+        return source.subarray(0, PROBE_SIZE)
+    }
+    const fd = fs.openSync(source.file, 'r')
+    try {
+        const sample = Buffer.alloc(PROBE_SIZE)
+        const length = fs.readSync(fd, sample, 0, PROBE_SIZE, 0)
+        return sample.subarray(0, length)
+    } finally {
+        fs.closeSync(fd)
+    }
+}
+
+/**
+ * 选择条目的压缩方式：
+ * 照片、视频、压缩包和 Office 文档（本身就是 zip）直接存储；文本和未压缩的格式按 ARCHIVE_ZLIB_LEVEL 压缩；
+ * 其他类型（包括 PDF）取开头一段样本快速压缩一次，压缩率不够时直接存储
+ */
+function chooseMethod(name, source) {
+    const ext = path.extname(name).toLowerCase()
+    if (STORED_TYPES.has(ext)) return METHOD_STORE
+    if (TEXT_TYPES.has(ext)) return METHOD_DEFLATE
+
+    const sample = readSample(source)
+    if (sample.length < MIN_PROBE_SIZE) return METHOD_DEFLATE
+    const compressed = zlib.deflateRawSync(sample, { level: 1 })
+    return compressed.length / sample.length > MIN_SAVING_RATIO ? METHOD_STORE : METHOD_DEFLATE
+}
+
+/**
+ * 数据（压缩或原样）保存为按内容命名的文件，返回条目信息（不含 name）
+ * @param {string} name - 条目名称，用于按类型选择压缩方式
+ * @param {Buffer|{file: string}} source - 数据或源文件
+ * @param {number} [method] - 压缩方式，不指定时由 chooseMethod() 选择
+ */
+async function storeBlob(archivePath, name, source, method = chooseMethod(name, source)) {
+    const dir = blobDir(archivePath)
+    fs.mkdirSync(dir, { recursive: true })
+    const temp = path.join(dir, `${process.pid}-${crypto.randomBytes(6).toString('hex')}.tmp`)
+
+    let crc = 0
+    let size = 0
+    let compressedSize = 0
+    const hash = crypto.createHash('sha256')
+
+    const measureRaw = new Transform({
+        transform(chunk, encoding, callback) {
+            crc = crc32(chunk, crc)
+            size += chunk.length
+            callback(null, chunk)
+        }
+    })
+    const measureCompressed = new Transform({
+        transform(chunk, encoding, callback) {
+            hash.update(chunk)
+            compressedSize += chunk.length
+            callback(null, chunk)
+        }
+    })
+
+    const input = Buffer.isBuffer(source)
+        ? [source]
+        : fs.createReadStream(source.file)
+    const stages = method === METHOD_STORE
+        ? [input, measureRaw, measureCompressed]
+        : [input, measureRaw, zlib.createDeflateRaw({ level: COMPRESSION_LEVEL }), measureCompressed]
+    try {
+        await pipeline(...stages, fs.createWriteStream(temp))
+    } catch (e) {
+        fs.rmSync(temp, { force: true })
+        throw e
+    }
+
+    if (method === METHOD_DEFLATE && compressedSize >= size && size > 0) {
+        // 样本没能反映整体情况，压缩后反而变大，改为直接存储
+        fs.rmSync(temp, { force: true })
+        return storeBlob(archivePath, name, source, METHOD_STORE)
+    }
+
+    const blob = hash.digest('hex')
+    const target = blobPath(archivePath, blob)
+    if (fs.existsSync(target)) {
+        // 内容相同的数据已经保存过
+        fs.rmSync(temp, { force: true })
+        const now = new Date()
+        fs.utimesSync(target, now, now)
+    } else {
+        fs.renameSync(temp, target)
+    }
+    return { blob, method, crc32: crc, size, compressedSize }
+}
+
+/**
+ * 删除不再被任何清单引用的压缩数据
+ * @param {number} since - 只删除在此之前写入的数据，避免删掉其他归档包正在生成时新写入的数据
+ */
+function pruneBlobs(archivePath, since) {
+    const dir = path.dirname(archivePath)
+    const referenced = new Set()
+    for (const name of fs.readdirSync(dir)) {
+        if (!name.endsWith(MANIFEST_SUFFIX)) continue
+        const manifest = readManifest(path.join(dir, name.slice(0, -MANIFEST_SUFFIX.length)))
+        if (manifest) {
+            manifest.entries.forEach(entry => referenced.add(entry.blob))
+        }
+    }
+
+    let removed = 0
+    for (const name of fs.readdirSync(blobDir(archivePath))) {
+        const file = path.join(blobDir(archivePath), name)
+        try {
+            if (!referenced.has(name) && fs.statSync(file).mtimeMs < since) {
+                fs.unlinkSync(file)
+                removed++
+            }
+        } catch (e) {
+            // 文件已被其他进程删除
+        }
+    }
+    return removed
+}
+
+/**
+ * 把各条目的压缩数据拼接为归档包（先写临时文件再替换）
+ */
+async function writeArchive(archivePath, entries) {
+    const temp = `${archivePath}.${process.pid}.tmp`
+    const output = fs.createWriteStream(temp)
+    const closed = new Promise((resolve, reject) => {
+        output.once('close', resolve)
+        output.once('error', reject)
+    })
+    try {
+        const writer = createZipWriter(output)
+        for (const entry of entries) {
+            await writer.addEntry(entry, blobPath(archivePath, entry.blob))
+        }
+        const size = await writer.finish()
+        await closed
+        fs.renameSync(temp, archivePath)
+        return size
+    } catch (e) {
+        output.destroy()
+        fs.rmSync(temp, { force: true })
+        throw e
+    }
+}
+
+/**
+ * 限制并发数：返回的函数按调用顺序排队执行任务，同时最多运行 limit 个
+ */
+function createLimiter(limit) {
+    let active = 0
+    const queue = []
+    const next = () => {
+        if (active >= limit || queue.length === 0) return
+        active++
+        const { task, resolve, reject } = queue.shift()
+        task().then(resolve, reject).finally(() => {
+            active--
+            next()
+        })
+    }
+    return (task) => new Promise((resolve, reject) => {
+        queue.push({ task, resolve, reject })
+        next()
+    })
+}
+
+/**
+ * 同时写入 HTTP 响应和磁盘缓存文件：写入速度跟随较慢的一方；
+ * 缓存文件出错时只放弃缓存（cacheFailed 为 true），下载继续
+ */
+function teeStream(primary, cache) {
+    const tee = new Writable({
+        write(chunk, encoding, callback) {
+            const waits = []
+            if (!primary.write(chunk)) {
+                waits.push(new Promise(resolve => primary.once('drain', resolve)))
+            }
+            if (!tee.cacheFailed && !cache.write(chunk)) {
+                waits.push(new Promise(resolve => {
+                    const done = () => {
+                        cache.off('drain', done)
+                        cache.off('close', done)
+                        resolve()
+                    }
+                    cache.on('drain', done)
+                    cache.on('close', done)
+                }))
+            }
+            Promise.all(waits).then(() => callback())
+        },
+        final(callback) {
+            if (!tee.cacheFailed) cache.end()
+            primary.end(() => callback())
+        }
+    })
+    tee.cacheFailed = false
+    cache.on('error', (err) => {
+        if (!tee.cacheFailed) console.error('归档包缓存写入失败:', err.message)
+        tee.cacheFailed = true
+    })
+    return tee
+}
+
+/**
+ * 生成一个条目：来源指纹没变时复用上次的压缩数据，否则调用 load() 生成并保存；
+ * 返回 { entry, rendered }，条目被跳过时返回 null
+ */
+async function produceEntry(archivePath, { name, key, load, time }, reusable) {
+    const cached = reusable.get(key)
+    if (cached) {
+        return { entry: cached, rendered: false }
+    }
+    let source
+    try {
+        source = await load()
+    } catch (e) {
+        console.error(`归档条目生成失败 ${name}:`, e.message)
+        return null
+    }
+    if (!source) return null
+    const options = Buffer.isBuffer(source) ? {} : source
+    const stored = await storeBlob(archivePath, options.name || name,
+        Buffer.isBuffer(source) || source.file ? source : source.buffer)
+    return {
+        entry: {
+            name: options.name || name,
+            // 备用方式生成的内容不复用，下次重新生成
+            key: options.transient ? null : key,
+            ...stored,
+            time: time || Date.now()
+        },
+        rendered: true
+    }
+}
+
+/**
+ * 边生成边输出：每个条目生成后立即写入 output，同时写入临时文件，完成后替换磁盘上的归档包
+ * @returns {Promise<{size, entries, rendered, cached}>} cached 表示磁盘上的归档包已更新
+ */
+async function streamArchive(archivePath, jobs, output) {
+    const temp = `${archivePath}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`
+    const cache = STREAM_CACHE ? fs.createWriteStream(temp) : null
+    const cacheClosed = cache && new Promise(resolve => cache.once('close', resolve))
+    const target = cache ? teeStream(output, cache) : output
+
+    // 客户端中途断开时停止输出
+    const onClose = () => {
+        if (!output.writableFinished) target.destroy(new Error('下载已中断'))
+    }
+    output.once('close', onClose)
+
+    const entries = []
+    let rendered = 0
+    let size
+    try {
+        const writer = createZipWriter(target)
+        for (const job of jobs) {
+            const produced = await job
+            if (!produced) continue
+            await writer.addEntry(produced.entry, blobPath(archivePath, produced.entry.blob))
+            entries.push(produced.entry)
+            if (produced.rendered) rendered++
+        }
+        size = await writer.finish()
+    } catch (e) {
+        if (cache) {
+            target.cacheFailed = true
+            cache.destroy()
+            await cacheClosed
+            fs.rmSync(temp, { force: true })
+        }
+        throw e
+    } finally {
+        output.off('close', onClose)
+    }
+
+    let cached = false
+    if (cache) {
+        await cacheClosed
+        try {
+            if (target.cacheFailed) throw new Error('缓存文件写入失败')
+            fs.renameSync(temp, archivePath)
+            cached = true
+        } catch (e) {
+            // Windows 下旧的归档包正被下载时无法替换，下次再写入
+            console.warn('归档包缓存未更新:', e.message)
+            fs.rmSync(temp, { force: true })
+        }
+    }
+    return { size, entries, rendered, cached }
+}
+
+async function build(archivePath, { stamp, entries, output }) {
+    const started = Date.now()
+    const previous = readManifest(archivePath)
+    const reusable = new Map()
+    if (previous) {
+        for (const entry of previous.entries) {
+            if (fs.existsSync(blobPath(archivePath, entry.blob))) {
+                reusable.set(entry.key, entry)
+            }
+        }
+    }
+
+    // 各条目并行生成（模板渲染、读取和压缩附件），按原顺序写入归档包
+    const limit = createLimiter(CONCURRENCY)
+    const jobs = entries.map(entry => limit(() => produceEntry(archivePath, entry, reusable)))
+    // 中途出错时后面的任务不再有人等待
+    jobs.forEach(job => job.catch(() => {}))
+
+    let result
+    let rendered = 0
+    let size
+    let rewritten = true
+    if (output) {
+        const streamed = await streamArchive(archivePath, jobs, output)
+        result = streamed.entries
+        rendered = streamed.rendered
+        // 没有写入磁盘缓存时，磁盘上的归档包已过期，清单中不记录大小
+        size = streamed.cached ? streamed.size : null
+        rewritten = streamed.cached
+    } else {
+        result = []
+        for (const job of jobs) {
+            const produced = await job
+            if (!produced) continue
+            result.push(produced.entry)
+            if (produced.rendered) rendered++
+        }
+
+        // 条目和数据都没有变化，并且归档包文件完好时不重写
+        const unchanged = previous &&
+            previous.entries.length === result.length &&
+            previous.entries.every((entry, i) => entry.name === result[i].name && entry.blob === result[i].blob)
+        if (unchanged && isArchiveCurrent(archivePath, previous.stamp)) {
+            size = previous.size
+            rewritten = false
+        } else {
+            size = await writeArchive(archivePath, result)
+        }
+    }
+
+    const manifest = { version: MANIFEST_VERSION, stamp, size, entries: result }
+    const temp = `${manifestPath(archivePath)}.${process.pid}.tmp`
+    fs.writeFileSync(temp, JSON.stringify(manifest))
+    fs.renameSync(temp, manifestPath(archivePath))
+
+    if (rendered > 0) {
+        pruneBlobs(archivePath, started)
+    }
+    return { size, rendered, reused: result.length - rendered, rewritten }
+}
+
+/**
+ * 生成或更新归档包
+ * @param {string} archivePath - 归档包路径
+ * @param {Object} options
+ * @param {string} options.stamp - 归档记录的指纹，isArchiveCurrent() 用它判断归档包是否可以直接下载
+ * @param {Array} options.entries - 条目 [{ name, key, load, time? }]，按顺序写入；
+ *   key 为来源指纹（应包含条目名称），load() 返回 Buffer、{ file } 或 { buffer, name, transient }，
+ *   name 为实际使用的条目名称，transient 表示备用方式生成、不复用；返回 null 时跳过该条目
+ * @param {Writable} [options.output] - 指定时边生成边写入（如 HTTP 响应），
+ *   ARCHIVE_STREAM_CACHE 未关闭时同时更新磁盘上的归档包；不指定时只生成磁盘上的归档包
+ * @returns {Promise<{size, rendered, reused, rewritten}>}
+ */
+async function buildArchive(archivePath, options) {
+    for (;;) {
+        const current = building.get(archivePath)
+        if (!current) break
+        // 只生成文件的请求可以共用同一次生成的结果（前提是那次生成写入了磁盘上的归档包）
+        if (!options.output && current.writesFile) return current.task
+        // 否则等它完成，之后的条目都可以直接复用
+        await current.task.catch(() => {})
+    }
+
+    const task = build(archivePath, options).finally(() => building.delete(archivePath))
+    building.set(archivePath, { task, writesFile: !options.output || STREAM_CACHE })
+    return task
+}
+
+/**
+ * 删除归档包和它的清单（压缩数据在下次生成时清理）
+ */
+function removeArchive(archivePath) {
+    for (const file of [archivePath, manifestPath(archivePath)]) {
+        if (fs.existsSync(file)) {
+            fs.unlinkSync(file)
+        }
+    }
+}
+
+module.exports = {
+    hashKey,
+    fileStamp,
+    readManifest,
+    isArchiveCurrent,
+    buildArchive,
+    removeArchive
+}
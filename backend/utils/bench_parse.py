@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+犯情动态解析基准测试
+生成合成的犯情动态文档（随机数字、全角空格、千位分隔符、统计数写在正文或表格中），
+用 parse_criminal_report 逐个解析，输出吞吐量（文档/秒）、p50/p99 延迟和解析进程峰值内存，
+并核对解析结果与生成时写入的数值是否一致，避免优化悄悄改变解析结果。
+用法:
+    python bench_parse.py [--docs N] [--filler N] [--table-ratio R] [--jobs N] [--seed S] [--keep 目录] [--json]
+    --docs         生成的文档数量（默认200）
+    --filler       每份文档中与统计无关的叙述段落数，用于调节文档大小（默认40）
+    --table-ratio  罪犯构成写在表格中的文档比例（默认0.3）
+    --jobs         并行解析进程数（默认1，延迟按单个文档在解析进程内的耗时统计）
+    --keep         生成的文档保存到该目录，默认使用临时目录并在结束后删除
+    --json         以JSON输出结果
+结果不一致时退出码为1。
+"""
+
+import sys
+import os
+import json
+import math
+import time
+import random
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+from parse_criminal_report import parse_criminal_report
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不统计峰值内存
+    resource = None
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+DOCUMENT_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+DOCUMENT_TAIL = '</w:body></w:document>'
+
+SECURITY_PHRASES = [
+    ('hasEscape', '无罪犯脱逃'),
+    ('hasMajorCase', '无在全国全省有重大影响的狱内案件'),
+    ('hasSafetyAccident', '无重大安全生产事故'),
+    ('hasHealthEvent', '无重大公共卫生安全事件'),
+]
+
+# 罪犯构成：(字段名, 正文中的写法, 单位, 表格中可能使用的标签)
+PRISONER_FIELDS = [
+    ('total', '监狱在押罪犯', '人', ['在押罪犯', '在押罪犯总数', '押犯总数']),
+    ('majorCriminal', '其中重大刑事犯', '名', ['重大刑事犯']),
+    ('deathSuspended', '死缓犯', '名', ['死缓犯', '死缓犯（名）']),
+    ('lifeSentence', '无期犯', '名', ['无期犯', '无期犯（名）']),
+    ('multipleConvictions', '二次以上判刑罪犯', '名', ['二次以上判刑罪犯', '二次以上判刑']),
+    ('foreign', '外籍犯', '名', ['外籍犯']),
+    ('hongKongMacaoTaiwan', '含港澳台', '名', ['港澳台', '含港澳台']),
+    ('mentalIllness', '判决书认定的精神病犯', '名', ['精神病犯']),
+    ('formerProvincial', '原地厅以上罪犯', '名', ['原地厅以上罪犯', '原地厅级以上罪犯']),
+    ('formerCounty', '原县团级以上罪犯', '名', ['原县团级以上罪犯']),
+    ('falunGong', '"法轮功"', '名', ['法轮功', '"法轮功"罪犯']),
+    ('drugHistory', '有吸毒史罪犯', '名', ['有吸毒史罪犯']),
+    ('drugRelated', '涉毒犯', '名', ['涉毒犯']),
+    ('newlyAdmitted', '新收押罪犯', '名', ['新收押罪犯', '新收押']),
+    ('juvenileFemale', '未成年女犯', '名', ['未成年女犯']),
+    ('gangRelated', '涉黑罪犯', '名', ['涉黑罪犯']),
+    ('evilRelated', '涉恶罪犯', '名', ['涉恶罪犯']),
+    ('dangerousSecurity', '危安罪犯', '名', ['危安罪犯']),
+]
+
+FILLER_SENTENCES = [
+    '三监区罪犯张某某（35岁，故意伤害罪，原判8年6个月），因琐事与同犯发生矛盾导致情绪波动，被管教犯及时制止。',
+    '春节期间，罪犯思家念亲情绪较浓，新犯产生思想波动，个别老病残犯对改造前途缺乏信心。',
+    '冬春交替，气温变化引起病情新特征，感冒罪犯稍有所增加，监区及时调整作息并加强巡查。',
+    '各监区重点围绕罪犯自杀、袭警、行凶、劫持人质等突发事件，开展实战演练，提升应急处置能力。',
+    '加强减刑、假释新规定的宣讲，引导罪犯树立正确的改造目标，营造公平公正的执法环境。',
+    '严格落实清监搜身制度，本月共组织清监检查4次，查获违禁品若干，均已登记处理。',
+]
+
+SPACES = ['', '', ' ', '　', '　　']
+
+def format_number(rng, value, separators=True):
+    """随机加千位分隔符，数字前后随机加半角/全角空格"""
+    text = f'{value:,}' if separators and value >= 1000 and rng.random() < 0.5 else str(value)
+    return rng.choice(SPACES) + text + rng.choice(SPACES)
+
+def random_values(rng):
+    """生成一份文档的期望解析结果"""
+    total = rng.randint(300, 12000)
+    prisoners = {'total': total}
+    for key, _, _, _ in PRISONER_FIELDS[1:]:
+        prisoners[key] = rng.randint(0, min(total, 3000) if key == 'majorCriminal' else 400)
+    prisoners['hongKongMacaoTaiwan'] = rng.randint(0, prisoners['foreign'])
+
+    security = {key: rng.random() < 0.1 for key, _ in SECURITY_PHRASES}
+    security['hasInternalCase'] = rng.random() < 0.1
+
+    discipline = {
+        'violationCount': rng.randint(0, 60),
+        'confinementCount': rng.randint(0, 30),
+        'warningCount': rng.randint(0, 30),
+    }
+    return {'security': security, 'discipline': discipline, 'prisoners': prisoners}
+
+def prisoner_sentence(rng, prisoners):
+    """罪犯构成段落：截至X月X日，监狱在押罪犯N人，其中……"""
+    parts = []
+    for key, phrase, unit, _ in PRISONER_FIELDS:
+        text = f'{phrase}{format_number(rng, prisoners[key])}{unit}'
+        if key == 'hongKongMacaoTaiwan':
+            parts[-1] += f'（{text}）'
+        else:
+            parts.append(text)
+    return f'（五）罪犯构成情况。截至{rng.randint(1, 12)}月{rng.randint(1, 28)}日，' + '，'.join(parts) + '。'
+
+def prisoner_table(rng, prisoners):
+    """罪犯构成表格，随机使用三种排布：标签行+数字行、标签|数字两列、单元格内"标签：N人" """
+    cells = []
+    for key, _, unit, labels in PRISONER_FIELDS:
+        cells.append((rng.choice(labels), format_number(rng, prisoners[key]).strip(), unit))
+
+    layout = rng.choice(['rows', 'columns', 'pairs'])
+    if layout == 'columns':
+        return [[label, number + rng.choice(['', unit])] for label, number, unit in cells]
+    if layout == 'pairs':
+        # 同一单元格内数字后已有单位，标签不再带"（名）"
+        return [[f"{label.split('（')[0]}：{number}{unit}" for label, number, unit in cells[i:i + 3]]
+                for i in range(0, len(cells), 3)]
+
+    rows = []
+    for i in range(0, len(cells), 6):
+        group = cells[i:i + 6]
+        rows.append([label for label, _, _ in group])
+        rows.append([number for _, number, _ in group])
+    return rows
+
+def generate_report(rng, filler, in_table):
+    """
+    生成一份犯情动态文档内容和期望结果
+    返回 (blocks, expected)，blocks 为 ('p', 文本) 或 ('tbl', 行列表)
+    """
+    expected = random_values(rng)
+    security = expected['security']
+    discipline = expected['discipline']
+
+    month = rng.randint(1, 12)
+    blocks = [
+        ('p', '内部资料'),
+        ('p', '犯  情  动  态'),
+        ('p', f'第{month}期'),
+        ('p', f'{month}月，我监认真贯彻落实上级的通知要求，现将我监本月犯情报告如下：'),
+    ]
+    blocks += [('p', rng.choice(FILLER_SENTENCES)) for _ in range(filler // 2)]
+
+    present = [phrase for key, phrase in SECURITY_PHRASES if not security[key]]
+    blocks.append(('p', '一、监管安全情况'))
+    if present:
+        blocks.append(('p', '（一）监管安全基本情况。本月，我监' + '、'.join(present) + '，监狱持续安全稳定。'))
+    else:
+        blocks.append(('p', '（一）监管安全基本情况。本月，我监发生多起安全事件，正在调查处理。'))
+    if security['hasInternalCase']:
+        blocks.append(('p', '（二）狱内发案情况。本月，我监发生狱内案件1起。'))
+    else:
+        blocks.append(('p', '（二）狱内发案情况。本月，我监无狱内发案。'))
+    blocks.append(('p', '（四）罪犯违纪数据统计。本月，{}名罪犯在担任劳动岗位期间违规使用手机，'
+                        '已给予行政处罚（禁闭{}人、警告{}人）。'.format(
+                            discipline['violationCount'],
+                            format_number(rng, discipline['confinementCount']),
+                            format_number(rng, discipline['warningCount']))))
+
+    if in_table:
+        blocks.append(('p', '（五）罪犯构成情况。截至本月底，罪犯构成如下表：'))
+        blocks.append(('tbl', prisoner_table(rng, expected['prisoners'])))
+    else:
+        blocks.append(('p', prisoner_sentence(rng, expected['prisoners'])))
+
+    blocks.append(('p', '二、主要犯情及特点'))
+    blocks += [('p', rng.choice(FILLER_SENTENCES)) for _ in range(filler - filler // 2)]
+    return blocks, expected
+
+def paragraph_xml(rng, text):
+    """段落XML，文本随机拆成多个run，模拟Word编辑后的分段"""
+    runs = []
+    while text:
+        size = rng.randint(1, max(1, len(text)))
+        runs.append(f'<w:r><w:t xml:space="preserve">{escape(text[:size])}</w:t></w:r>')
+        text = text[size:]
+    return '<w:p>' + ''.join(runs) + '</w:p>'
+
+def write_docx(path, rng, blocks):
+    """用最少的部件写出 .docx 文件"""
+    body = []
+    for kind, content in blocks:
+        if kind == 'p':
+            body.append(paragraph_xml(rng, content))
+        else:
+            rows = ''.join(
+                '<w:tr>' + ''.join(f'<w:tc>{paragraph_xml(rng, cell)}</w:tc>' for cell in row) + '</w:tr>'
+                for row in content
+            )
+            body.append(f'<w:tbl>{rows}</w:tbl>')
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES)
+        zf.writestr('_rels/.rels', PACKAGE_RELS)
+        zf.writestr('word/document.xml', DOCUMENT_HEAD + ''.join(body) + DOCUMENT_TAIL)
+
+def generate_corpus(directory, docs, filler, table_ratio, seed):
+    """生成合成语料，返回 [(路径, 期望结果)]"""
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(docs):
+        in_table = rng.random() < table_ratio
+        blocks, expected = generate_report(rng, filler, in_table)
+        path = os.path.join(directory, f'synthetic_{index:05d}.docx')
+        write_docx(path, rng, blocks)
+        corpus.append((path, expected))
+    return corpus
+
+def timed_parse(path):
+    """在解析进程内计时，返回 (耗时秒, 解析结果)"""
+    start = time.perf_counter()
+    result = parse_criminal_report(path)
+    return time.perf_counter() - start, result
+
+def percentile(sorted_values, p):
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def peak_rss_mb():
+    """已结束的解析子进程中的最大峰值内存（MB），不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def compare(expected, actual, path):
+    """逐字段比较，返回不一致的字段列表"""
+    if not actual.get('success'):
+        return [{'path': path, 'field': None, 'expected': None, 'actual': actual.get('error')}]
+
+    mismatches = []
+    for section, fields in expected.items():
+        for key, value in fields.items():
+            got = actual['data'][section][key]
+            if got != value:
+                mismatches.append({'path': path, 'field': f'{section}.{key}', 'expected': value, 'actual': got})
+    return mismatches
+
+def run_benchmark(corpus, jobs):
+    """解析语料，返回统计结果"""
+    latencies = []
+    mismatches = []
+
+    start = time.perf_counter()
+    # 解析放在子进程中进行，峰值内存只反映解析本身，不含生成语料的开销
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(timed_parse, [path for path, _ in corpus], chunksize=8)
+        for (path, expected), (elapsed, result) in zip(corpus, results):
+            latencies.append(elapsed)
+            mismatches.extend(compare(expected, result, path))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'documents': len(corpus),
+        'jobs': jobs,
+        'seconds': round(wall, 3),
+        'docsPerSecond': round(len(corpus) / wall, 1) if wall else None,
+        'p50Ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99Ms': round(percentile(latencies, 99) * 1000, 2),
+        'maxMs': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        'peakRssMb': peak_rss_mb(),
+        'mismatches': mismatches,
+    }
+
+def parse_args(argv):
+    options = {'docs': 200, 'filler': 40, 'table-ratio': 0.3, 'jobs': 1, 'seed': 1, 'keep': None, 'json': False}
+    args = list(argv)
+    while args:
+        name = args.pop(0)
+        if name == '--json':
+            options['json'] = True
+            continue
+        if not name.startswith('--') or name[2:] not in options or not args:
+            raise ValueError(f'无效的参数: {name}')
+        value = args.pop(0)
+        key = name[2:]
+        if key == 'keep':
+            options[key] = value
+        elif key == 'table-ratio':
+            options[key] = float(value)
+        else:
+            options[key] = int(value)
+    return options
+
+def main():
+    try:
+        options = parse_args(sys.argv[1:])
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        print(__doc__, file=sys.stderr)
+        sys.exit(2)
+
+    directory = options['keep'] or tempfile.mkdtemp(prefix='criminal_report_bench_')
+    os.makedirs(directory, exist_ok=True)
+    try:
+        start = time.perf_counter()
+        corpus = generate_corpus(directory, options['docs'], options['filler'],
+                                 options['table-ratio'], options['seed'])
+        generated = time.perf_counter() - start
+        report = run_benchmark(corpus, max(1, options['jobs']))
+        corpus_bytes = sum(os.path.getsize(path) for path, _ in corpus)
+    finally:
+        if not options['keep']:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report['corpusBytes'] = corpus_bytes
+    report['generateSeconds'] = round(generated, 3)
+
+    if options['json']:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"文档数: {report['documents']}（合计 {corpus_bytes / 1024:.0f} KB，生成耗时 {generated:.2f} 秒）")
+        print(f"并行进程: {report['jobs']}，总耗时: {report['seconds']} 秒，吞吐量: {report['docsPerSecond']} 文档/秒")
+        print(f"延迟: p50 {report['p50Ms']} ms，p99 {report['p99Ms']} ms，最大 {report['maxMs']} ms")
+        peak = report['peakRssMb']
+        print(f"解析进程峰值内存: {peak} MB" if peak is not None else '解析进程峰值内存: 当前平台不支持统计')
+        if report['mismatches']:
+            print(f"❌ 解析结果不一致: {len(report['mismatches'])} 处", file=sys.stderr)
+            for item in report['mismatches'][:20]:
+                print(f"  {os.path.basename(item['path'])} {item['field']}: "
+                      f"期望 {item['expected']}，实际 {item['actual']}", file=sys.stderr)
+        else:
+            print('✅ 解析结果与生成的数值全部一致')
+
+    sys.exit(1 if report['mismatches'] else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+/**
+ * 犯情动态Python解析器进程池
+ * 常驻若干个 parse_criminal_report.py --worker 进程，复用已启动的解释器和已编译的解析规则，
+ * 避免每次上传都重新启动 Python
+ * 结果按帧传输（--framed）：帧头 "<字节数> <耗时毫秒>\n" 后跟该字节数的UTF-8 JSON，
+ * 收齐后整体解码一次，不会在数据块边界切断中文字符
+ */
+const { spawn } = require('child_process')
+const path = require('path')
+const { createFrameDecoder } = require('./frameDecoder')
+
+const PYTHON_CMD = process.env.PYTHON_CMD || 'python'
+const PARSER_SCRIPT = path.join(__dirname, 'parse_criminal_report.py')
+const POOL_SIZE = parseInt(process.env.PARSER_WORKERS) || 2
+const REQUEST_TIMEOUT = parseInt(process.env.PARSER_TIMEOUT) || 60000
+// 解析结果按文件内容缓存，PARSER_CACHE=off 时关闭
+const PARSER_ARGS = ['--worker', '--framed'].concat(process.env.PARSER_CACHE === 'off' ? ['--no-cache'] : [])
+// PARSER_STATS=on 时每次解析都附带统计（各阶段耗时、文档规模、字段命中的模式），不使用缓存
+const DEFAULT_STATS = process.env.PARSER_STATS === 'on'
+
+const workers = []
+const queue = []
+let nextRequestId = 1
+
+/**
+ * 启动一个常驻解析进程
+ */
+function createWorker() {
+    const child = spawn(PYTHON_CMD, [PARSER_SCRIPT, ...PARSER_ARGS], {
+        env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
+    })
+
+    const worker = { child, current: null, stderr: '' }
+
+    const decode = createFrameDecoder(parseFrameHeader, (header, payload) => {
+        const task = worker.current
+        if (!task) return
+
+        let response
+        try {
+            response = JSON.parse(payload.toString('utf8'))
+        } catch (e) {
+            finishTask(worker, new Error(`Python解析器输出无效: ${payload.toString('utf8', 0, 200)}`))
+            return
+        }
+
+        if (response.id !== task.id) {
+            // 请求与结果已经对不上，该进程后续的输出都不可信：当前请求按失败处理并结束进程
+            // （removeWorker 先把进程移出进程池再结束请求，不会把排队的请求再分给它）
+            removeWorker(worker, new Error(`Python解析器返回的请求编号不符: 期望 ${task.id}，实际 ${response.id}`))
+            child.kill()
+            return
+        }
+        delete response.id
+        response.parseTimeMs = header.elapsedMs
+        finishTask(worker, null, response)
+    })
+
+    child.stdout.on('data', (chunk) => {
+        try {
+            decode(chunk)
+        } catch (err) {
+            // 帧头错乱后无法再对齐后续输出，结束该进程
+            removeWorker(worker, err)
+            child.kill()
+        }
+    })
+
+    child.stderr.on('data', (data) => {
+        // 只保留最近的错误输出，用于进程异常退出时报错
+        worker.stderr = (worker.stderr + data.toString()).slice(-2000)
+    })
+
+    // 进程意外退出时写入会报 EPIPE，统一由 exit 事件处理
+    child.stdin.on('error', () => {})
+
+    child.on('error', (err) => {
+        console.error('❌ Python解析进程启动失败:', err.message)
+        removeWorker(worker, err)
+    })
+
+    child.on('exit', (code) => {
+        removeWorker(worker, new Error(`Python解析进程退出 (code=${code}): ${worker.stderr}`))
+    })
+
+    workers.push(worker)
+    return worker
+}
+
+/**
+ * 解析结果帧头: "<字节数> <耗时毫秒>"
+ */
+function parseFrameHeader(line) {
+    const [length, elapsedMs] = line.split(' ').map(Number)
+    return { length, elapsedMs }
+}
+
+/**
+ * 移除已退出的进程，未完成的请求按失败处理
+ */
+function removeWorker(worker, err) {
+    const index = workers.indexOf(worker)
+    if (index === -1) return
+    workers.splice(index, 1)
+
+    if (worker.current) {
+        finishTask(worker, err)
+    }
+    dispatch()
+}
+
+/**
+ * 完成当前请求并继续处理队列
+ */
+function finishTask(worker, err, result) {
+    const task = worker.current
+    if (!task) return
+    worker.current = null
+    clearTimeout(task.timer)
+
+    if (err) {
+        task.reject(err)
+    } else {
+        task.resolve(result)
+    }
+    dispatch()
+}
+
+/**
+ * 把排队的请求分配给空闲进程，进程不足时按需启动
+ */
+function dispatch() {
+    while (queue.length > 0) {
+        let worker = workers.find(w => !w.current)
+        if (!worker) {
+            if (workers.length >= POOL_SIZE) return
+            worker = createWorker()
+        }
+
+        const task = queue.shift()
+        worker.current = task
+        task.timer = setTimeout(() => {
+            // 超时的进程不再复用，直接结束
+            removeWorker(worker, new Error('Python解析超时'))
+            worker.child.kill()
+        }, REQUEST_TIMEOUT)
+
+        const request = { id: task.id, path: task.filePath }
+        if (task.stats) request.stats = true
+        worker.child.stdin.write(JSON.stringify(request) + '\n')
+    }
+}
+
+/**
+ * 解析犯情动态Word文档
+ * @param {string} filePath - 文档路径
+ * @param {object} [options]
+ * @param {boolean} [options.stats] - 是否附带解析统计，默认取 PARSER_STATS
+ * @returns {Promise<object>} 解析结果 { success, data, cached, stats, parseTimeMs } 或 { success: false, error }
+ */
+function parseCriminalReportFile(filePath, options = {}) {
+    const stats = options.stats !== undefined ? options.stats : DEFAULT_STATS
+    return new Promise((resolve, reject) => {
+        queue.push({ id: nextRequestId++, filePath, stats, resolve, reject })
+        dispatch()
+    })
+}
+
+/**
+ * 预先启动常驻进程，首个上传请求无需等待解释器启动
+ */
+function warmUp() {
+    while (workers.length < POOL_SIZE) {
+        createWorker()
+    }
+}
+
+/**
+ * 结束所有常驻进程
+ */
+function shutdown() {
+    for (const worker of workers.slice()) {
+        worker.child.kill()
+    }
+}
+
+process.on('exit', shutdown)
+
+module.exports = {
+    parseCriminalReportFile,
+    warmUp,
+    shutdown
+}
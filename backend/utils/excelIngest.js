@@ -0,0 +1,167 @@
+/**
+ * 业务模板Excel解析入口
+ * 较大的 .xlsx 文件交给 utils/excel_ingest.py 按列批量解析（pandas），
+ * 小文件、.xls、Python 不可用或解析失败时使用 templateParser.js 逐行解析。
+ * excel_ingest.py 按 templateParser.js 的取值规则解析，同一个文件走哪条路径存入的记录都相同
+ * （按 create_date 匹配的重复导入依赖这一点）；JS 的 Date 才能解析的日期字符串由这里调用 formatDate 补齐
+ */
+const { spawn } = require('child_process')
+const path = require('path')
+const XLSX = require('xlsx')
+const {
+    parseStrictEducation,
+    parseConfinement,
+    parseRestraintUsage,
+    parseMailRecord,
+    parseBlacklist,
+    formatDate
+} = require('./templateParser')
+
+const PYTHON_CMD = process.env.PYTHON_CMD || 'python'
+const INGEST_SCRIPT = path.join(__dirname, 'excel_ingest.py')
+// EXCEL_INGEST=python 总是使用 Python，js 总是逐行解析，auto 按文件大小选择
+const MODE = process.env.EXCEL_INGEST || 'auto'
+const MIN_BYTES = parseInt(process.env.EXCEL_INGEST_MIN_BYTES) || 1024 * 1024
+const INGEST_TIMEOUT = parseInt(process.env.EXCEL_INGEST_TIMEOUT) || 120000
+
+const JS_PARSERS = {
+    strict_education: parseStrictEducation,
+    confinement: parseConfinement,
+    restraint: parseRestraintUsage,
+    mail: parseMailRecord,
+    blacklist: parseBlacklist
+}
+
+/**
+ * 读取Excel文件并返回原始数据
+ */
+function readExcelFile(filePath) {
+    const workbook = XLSX.readFile(filePath)
+    const sheetName = workbook.SheetNames[0]
+    const worksheet = workbook.Sheets[sheetName]
+    return XLSX.utils.sheet_to_json(worksheet, { header: 1 })
+}
+
+/**
+ * 列式数据转为逐行的对象数组
+ */
+function columnsToRows(columns) {
+    const names = Object.keys(columns)
+    const count = names.length > 0 ? columns[names[0]].length : 0
+    const rows = new Array(count)
+    for (let i = 0; i < count; i++) {
+        const row = {}
+        for (const name of names) {
+            row[name] = columns[name][i]
+        }
+        rows[i] = row
+    }
+    return rows
+}
+
+/**
+ * excel_ingest.py 留给 JS 解析的日期：列中为单元格原值，按行号换成 formatDate 的结果
+ */
+function formatDeferredDates(columns, deferred) {
+    for (const [name, positions] of Object.entries(deferred || {})) {
+        for (const i of positions) {
+            columns[name][i] = formatDate(columns[name][i])
+        }
+    }
+}
+
+/**
+ * 调用 excel_ingest.py 解析
+ * @returns {Promise<Object>} 列式结果
+ */
+function runIngestScript(filePath, type) {
+    return new Promise((resolve, reject) => {
+        const child = spawn(PYTHON_CMD, [INGEST_SCRIPT, filePath, '--type', type], {
+            env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
+        })
+
+        const chunks = []
+        let stderr = ''
+        const timer = setTimeout(() => {
+            child.kill()
+            reject(new Error('Excel解析超时'))
+        }, INGEST_TIMEOUT)
+
+        child.stdout.on('data', (chunk) => chunks.push(chunk))
+        child.stderr.on('data', (data) => {
+            stderr = (stderr + data.toString()).slice(-2000)
+        })
+        child.on('error', (err) => {
+            clearTimeout(timer)
+            reject(err)
+        })
+        child.on('close', () => {
+            clearTimeout(timer)
+            try {
+                const result = JSON.parse(Buffer.concat(chunks).toString('utf8'))
+                if (!result.success) {
+                    return reject(new Error(result.error || 'Excel解析失败'))
+                }
+                resolve(result)
+            } catch (err) {
+                reject(new Error(`Excel解析输出无效: ${stderr || err.message}`))
+            }
+        })
+    })
+}
+
+/**
+ * 用 excel_ingest.py 按列解析
+ * @returns {Promise<Object|null>} { type, prisoners, records }，没有数据行时返回 null
+ */
+async function parseWithPython(filePath, type) {
+    const result = await runIngestScript(filePath, type)
+    if (result.empty) return null
+
+    const deferred = result.deferred || {}
+    formatDeferredDates(result.records, deferred.records)
+    const parsed = { type: result.type, records: columnsToRows(result.records) }
+    if (result.prisoners) {
+        formatDeferredDates(result.prisoners, deferred.prisoners)
+        parsed.prisoners = columnsToRows(result.prisoners)
+    }
+    console.log(`📊 Excel批量解析: ${result.rows} 行，耗时 ${result.ms}ms`)
+    return parsed
+}
+
+/**
+ * 用 templateParser.js 逐行解析
+ * @returns {Object|null} { type, prisoners, records }，没有数据行时返回 null
+ */
+function parseWithJs(filePath, type) {
+    const data = readExcelFile(filePath)
+    if (data.length <= 1) return null
+    return JS_PARSERS[type](data)
+}
+
+/**
+ * 解析上传的业务Excel
+ * @param {string} filePath - 文件路径
+ * @param {string} type - strict_education/confinement/restraint/mail/blacklist
+ * @param {number} [size] - 文件大小（字节），auto 模式下据此选择解析方式
+ * @returns {Promise<Object|null>} 与 templateParser.js 相同的 { type, prisoners, records }，没有数据行时返回 null
+ */
+async function parseExcelUpload(filePath, type, size = 0) {
+    // .xls 需要 xlrd（可选依赖，没有列入 requirements.txt），直接逐行解析
+    const xlsx = path.extname(filePath).toLowerCase() === '.xlsx'
+    if (xlsx && (MODE === 'python' || (MODE === 'auto' && size >= MIN_BYTES))) {
+        try {
+            return await parseWithPython(filePath, type)
+        } catch (err) {
+            console.warn('⚠️ Excel批量解析失败，改为逐行解析:', err.message)
+        }
+    }
+    return parseWithJs(filePath, type)
+}
+
+module.exports = {
+    readExcelFile,
+    parseWithPython,
+    parseWithJs,
+    parseExcelUpload
+}
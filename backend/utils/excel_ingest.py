@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+业务模板Excel批量解析
+用法:
+    python excel_ingest.py <文件.xlsx> [--type 类型] [--format json|arrow] [--out 路径]
+
+解析 严管教育审批/禁闭审批/戒具使用审批/信件汇总/涉黑恶名单 导出的Excel，
+字段、跳过规则和取值与 templateParser.js 逐行解析得到的完全相同（两边解析同一个文件存入的记录一致），
+但按列整体处理：整列一次完成筛选和取值，日期按不重复的值换算，全省导出的几万行数据也能很快解析完。
+
+类型: strict_education、confinement、restraint、mail、blacklist，不指定时按文件名和标题行识别。
+取值与 templateParser.js 相同：
+    文字字段保留单元格原值（不去空白，数值单元格仍为数值），刑期原样保留；
+    天数和序号按 JS 的 parseInt 取开头的整数，0 和无法识别的为 null；
+    日期按 formatDate：Excel 序列号和 1982.05.10 取服务器本地时区当天零点再换算成 UTC 日期，
+    2025-01-15 按 UTC 解析。其他写法的日期字符串由 JS 的 Date 解析，这里不做换算，
+    原样放在列中并在 deferred 中列出行号，由 excelIngest.js 调用 formatDate 补齐。
+
+默认输出一行列式JSON到stdout：
+    {"success": true, "type": "...", "rows": 记录数, "records": {"列名": [...]}, "prisoners": {"列名": [...]},
+     "deferred": {"records": {"列名": [行号, ...]}}, "ms": 耗时}
+信件汇总和涉黑恶名单没有 prisoners。除标题行外没有数据行时输出 {"success": true, "empty": true, ...}，
+与 templateParser.js 中 data.length <= 1 的情况对应。
+--format arrow 时把各表写成 Arrow IPC 文件（--out 目录下的 records.arrow、prisoners.arrow，需要 pyarrow）。
+出错时输出 {"success": false, "error": "..."}，退出码为 1。
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import datetime
+from decimal import Decimal
+
+import openpyxl
+import pandas as pd
+
+DEFAULT_STATUS = '待审核'
+# XLSX.SSF.parse_date_code 接受的最大序列号（9999-12-31）
+SERIAL_MAX = 2958465
+SERIAL_EPOCH = datetime.datetime(1899, 12, 30)
+SECONDS_PER_DAY = 86400
+# JS 的 String.prototype.trim 和 parseInt 跳过的空白字符
+JS_WHITESPACE = '\t\n\v\f\r \xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a' \
+                '\u2028\u2029\u202f\u205f\u3000\ufeff'
+# formatDate 中自行解析的写法（JS 的 \d 只匹配 ASCII 数字，$ 只匹配字符串结尾）
+DOT_DATE = re.compile(r'([0-9]{4})\.([0-9]{1,2})\.([0-9]{1,2})', re.ASCII)
+ISO_DATE = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})', re.ASCII)
+PARSE_INT = re.compile(f'[{JS_WHITESPACE}]*([+-]?)(?:0[xX]([0-9a-fA-F]+)|([0-9]+))')
+# 无法在这里换算、交给 JS 的 formatDate 的日期
+DEFER = object()
+
+# 每个字段：(输出列名, 标题匹配, 类型)；标题匹配与 templateParser.js 的 colMap 相同，取第一个匹配的列
+PRISONER_FIELDS = [
+    ('name', '罪犯姓名', 'text'),
+    ('gender', '性别', 'text'),
+    ('birth_date', '出生日期', 'date'),
+    ('ethnicity', '民族', 'text'),
+    ('education', '文化程度', 'text'),
+    ('sentence_type', '刑种', 'text'),
+    ('crime', '罪名', 'text'),
+    ('original_term', '原判刑期', 'text'),
+    ('term_start', '刑期起日', 'date'),
+    ('term_end', '现刑期止日', 'date'),
+    ('prison_unit', '所属单位', 'text'),
+    ('prison_area', '所属监区', 'text'),
+]
+
+TEMPLATES = {
+    'strict_education': {
+        'key': '罪犯编号',
+        'prisoners': [('name', lambda h: '罪犯姓名' in h or h == '姓名', 'text')] + PRISONER_FIELDS[1:],
+        'records': [
+            ('create_date', '制单时间', 'date'),
+            ('applicable_clause', '适用条款', 'text'),
+            ('reason', '严管教育原因', 'text'),
+            ('days', '严管天数', 'int'),
+            ('start_date', '严管起日', 'date'),
+            ('end_date', '严管止日', 'date'),
+            ('status', '业务状态', 'status'),
+        ],
+    },
+    'confinement': {
+        'key': '罪犯编号',
+        'prisoners': [field if field[0] != 'term_start' else ('term_start', '现刑期起日', 'date')
+                      for field in PRISONER_FIELDS],
+        'records': [
+            ('create_date', '制单时间', 'date'),
+            ('start_date', '禁闭起日', 'date'),
+            ('end_date', '禁闭止日', 'date'),
+            ('applicable_clause', '适用条款', 'text'),
+            ('violation_fact', '违规事实', 'text'),
+            ('status', '业务状态', 'status'),
+        ],
+    },
+    'restraint': {
+        'key': '罪犯编号',
+        'prisoners': [
+            ('name', '姓名', 'text'),
+            ('prison_unit', '所属单位', 'text'),
+            ('prison_area', '所属监区', 'text'),
+        ],
+        'records': [
+            ('create_date', '制单时间', 'date'),
+            ('restraint_name', lambda h: '戒具名称' in h or '警戒具' in h, 'text'),
+            ('applicable_clause', '使用条款', 'text'),
+            ('days', '天数', 'int'),
+            ('start_date', '使用起日', 'date'),
+            ('end_date', '使用止日', 'date'),
+            ('status', '业务状态', 'status'),
+        ],
+    },
+    'mail': {
+        # 信件可能没有罪犯编号，有名字或序号的行都保留
+        'key': None,
+        'records': [
+            ('sequence_no', '序号', 'sequence'),
+            ('open_date', '开箱日期', 'date'),
+            ('prison_area', '监区', 'text'),
+            ('prisoner_name', lambda h: '罪犯' in h or '姓名' in h or '名字' in h, 'text'),
+            ('reason', '事由', 'text'),
+            ('category', '类别', 'text'),
+            ('remarks', '备注', 'text'),
+        ],
+    },
+    'blacklist': {
+        'key': '罪犯编号',
+        'records': [
+            ('name', '姓名', 'text'),
+            ('gender', '性别', 'text'),
+            ('ethnicity', '民族', 'text'),
+            ('birth_date', '出生日期', 'date'),
+            ('native_place', lambda h: '籍贯' in h or '国籍' in h, 'text'),
+            ('political_status', '捕前面貌', 'text'),
+            ('crime', '原判罪名', 'text'),
+            ('original_term', lambda h: '原判刑期' in h and '起日' not in h and '止日' not in h, 'text'),
+            ('term_start', '刑期起日', 'date'),
+            ('term_end', '刑期止日', 'date'),
+            ('admission_date', '入监日期', 'date'),
+            ('involvement_type', '三涉', 'text'),
+            ('custody_status', '在押现状', 'text'),
+            ('sentence_change', '刑罚变动', 'text'),
+        ],
+    },
+}
+
+def detect_template_type(filename, headers):
+    """按文件名和标题行识别模板类型，与 templateParser.js 的 detectTemplateType 相同"""
+    name = filename.lower()
+    for keyword, template_type in (('严管教育', 'strict_education'), ('禁闭', 'confinement'),
+                                   ('戒具', 'restraint'), ('信件', 'mail')):
+        if keyword in name:
+            return template_type
+    if '涉黑' in name or '涉恶' in name:
+        return 'blacklist'
+
+    header = ','.join(headers)
+    if '严管教育原因' in header:
+        return 'strict_education'
+    if '禁闭起日' in header:
+        return 'confinement'
+    if '戒具' in header or '警戒具' in header:
+        return 'restraint'
+    if '开箱日期' in header:
+        return 'mail'
+    if '三涉情况' in header:
+        return 'blacklist'
+    return None
+
+def find_column(headers, match):
+    """第一个匹配的列号，没有时返回 None"""
+    for index, header in enumerate(headers):
+        if (match(header) if callable(match) else match in header):
+            return index
+    return None
+
+def to_serial(value):
+    """
+    日期、时间单元格还原为 Excel 序列号：XLSX 读取时不转换日期（没有 cellDates），JS 拿到的是数值。
+    1900-03-01 之前按 Excel 把 1900 年当作闰年的规则少算一天
+    """
+    if isinstance(value, datetime.time):
+        return (value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6) / SECONDS_PER_DAY
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    days = (value - SERIAL_EPOCH) / datetime.timedelta(days=1)
+    return days if days >= 61 else days - 1
+
+def cell_value(value):
+    """单元格转为 JS 中 sheet_to_json 得到的值：空白为 None，日期为序列号，其余不变"""
+    if isinstance(value, str) and value == '':
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        value = to_serial(value)
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2 ** 53:
+        return int(value)
+    return value
+
+def js_number_string(value):
+    """数值按 JS 的 Number.prototype.toString 转为文字（1e21 以上和 1e-6 以下用指数形式）"""
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return 'Infinity' if value > 0 else '-Infinity'
+    if value == 0:
+        return '0'
+    sign = '-' if value < 0 else ''
+    # repr 给出能还原该数值的最短数字串，与 JS 相同
+    _, digits, exponent = Decimal(repr(abs(float(value))) if isinstance(value, float) else abs(value)).normalize().as_tuple()
+    digits = ''.join(map(str, digits))
+    k = len(digits)
+    n = exponent + k
+    if k <= n <= 21:
+        return sign + digits + '0' * (n - k)
+    if 0 < n <= 21:
+        return sign + digits[:n] + '.' + digits[n:]
+    if -6 < n <= 0:
+        return sign + '0.' + '0' * -n + digits
+    mantissa = digits[0] + ('.' + digits[1:] if k > 1 else '')
+    return f"{sign}{mantissa}e{'+' if n - 1 >= 0 else '-'}{abs(n - 1)}"
+
+def js_string(value):
+    """按 JS 的 String(value) 转为文字，value 为 cell_value 的结果"""
+    if value is None:
+        return 'undefined'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return js_number_string(value)
+    return value
+
+def is_truthy(value):
+    """JS 中为真的值：非空，且不是 ''、0、false"""
+    return value is not None and value != '' and not (not isinstance(value, str) and value == 0)
+
+def js_truthy(column):
+    return pd.Series([is_truthy(value) for value in column], index=column.index, dtype=bool)
+
+def js_parse_int(value):
+    """JS 的 parseInt(value) || null"""
+    if value is None or isinstance(value, bool):
+        return None
+    text = js_number_string(value) if isinstance(value, (int, float)) else value
+    match = PARSE_INT.match(text)
+    if not match:
+        return None
+    sign, hex_digits, digits = match.groups()
+    number = int(hex_digits, 16) if hex_digits else int(digits)
+    if number == 0:
+        return None
+    if number > 2 ** 53:
+        # JS 的 parseInt 结果是双精度浮点数
+        number = float(number)
+    return -number if sign == '-' else number
+
+def utc_date(year, month, day):
+    """new Date(year, month - 1, day).toISOString() 的日期部分：本地时区当天零点换算成 UTC 后的日期"""
+    if not 1 <= year <= 9999:
+        return DEFER
+    try:
+        utc = time.gmtime(time.mktime((year, month, day, 0, 0, 0, 0, 0, -1)))
+    except (OverflowError, ValueError):
+        return DEFER
+    return f'{utc.tm_year:04d}-{utc.tm_mon:02d}-{utc.tm_mday:02d}' if 0 <= utc.tm_year <= 9999 else DEFER
+
+def shift_date(year, month, day):
+    """按 JS 的 Date 规则处理超出范围的月和日（2025-02-30 为 3 月 2 日），返回 (年, 月, 日)"""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    if not 1 <= year <= 9999:
+        return None
+    try:
+        date = datetime.date(year, month, 1) + datetime.timedelta(days=day - 1)
+    except OverflowError:
+        return None
+    return date.year, date.month, date.day
+
+def serial_date(serial):
+    """XLSX.SSF.parse_date_code 的日期部分，返回 (年, 月, 日)；0 为 1899-12-31，60 为 1900-03-01"""
+    days = int(serial)
+    seconds = SECONDS_PER_DAY * (serial - days)
+    # 不足一天的部分距下一天不到 0.0001 秒时进到下一天
+    if seconds - int(seconds) > 0.9999 and int(seconds) + 1 == SECONDS_PER_DAY:
+        days += 1
+    offset = days if days <= 60 else days - 1
+    return shift_date(1899, 12, 31 + offset)
+
+def format_date(value):
+    """templateParser.js 的 formatDate，value 为 cell_value 的结果；JS 的 Date 字符串解析返回 DEFER"""
+    if not is_truthy(value) or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        if not 0 <= value <= SERIAL_MAX:
+            return None
+        parts = serial_date(value)
+        return utc_date(*parts) if parts else DEFER
+
+    match = DOT_DATE.fullmatch(value)
+    if match:
+        year, month, day = map(int, match.groups())
+        # new Date(年, 月, 日) 中 0-99 年为 1900-1999 年
+        parts = shift_date(year + 1900 if year <= 99 else year, month, day)
+        return utc_date(*parts) if parts else DEFER
+
+    # new Date('2025-01-15') 按 UTC 零点解析，日超出当月天数时顺延到下个月
+    match = ISO_DATE.fullmatch(value)
+    if match:
+        year, month, day = map(int, match.groups())
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            return None
+        parts = shift_date(year, month, day) if year >= 1 else None
+        return f'{parts[0]:04d}-{parts[1]:02d}-{parts[2]:02d}' if parts else DEFER
+    return DEFER
+
+def object_series(values, index):
+    """逐个值的结果组成 object 列，整数列中有空值时不转为浮点数"""
+    return pd.Series(list(values), index=index, dtype=object)
+
+def normalize_dates(column):
+    """日期列：每个不重复的值换算一次，返回 (日期列, 需要由 JS 换算的行位置)"""
+    # 按 (类型, 值) 区分，true 和 1 不合并
+    keys = [(type(value), value) for value in column]
+    cache = {key: format_date(key[1]) for key in set(keys)}
+    results = [cache[key] for key in keys]
+    deferred = [position for position, result in enumerate(results) if result is DEFER]
+    # 需要由 JS 换算的日期先保留原值
+    for position in deferred:
+        results[position] = column.iloc[position]
+    return object_series(results, column.index), deferred
+
+def normalize_column(column, kind, row_numbers):
+    if kind == 'date':
+        return normalize_dates(column)
+    if kind == 'int':
+        return object_series(map(js_parse_int, column), column.index), []
+    if kind == 'status':
+        return column.where(js_truthy(column), DEFAULT_STATUS), []
+    if kind == 'sequence':
+        # 没有序号时用行号
+        numbers = map(js_parse_int, column)
+        return object_series((number or int(row) for number, row in zip(numbers, row_numbers)), column.index), []
+    return column, []
+
+def read_sheet(path):
+    """
+    读取第一个工作表的全部单元格（不把第一行当标题），各单元格转为 JS 中读到的值。
+    直接用 openpyxl 取值：pd.read_excel 会把同一列中的 True 和 1 合并为同一个值，
+    还会把 'NA'、'null' 等文字当作空白；错误单元格（#N/A 等）与 JS 中一样为空
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = [[None if cell.data_type == 'e' else cell_value(cell.value) for cell in row]
+                for row in workbook.worksheets[0].iter_rows()]
+    finally:
+        workbook.close()
+    width = max((len(row) for row in rows), default=0)
+    return pd.DataFrame([row + [None] * (width - len(row)) for row in rows], dtype=object)
+
+def header_row(frame):
+    """涉黑恶名单第一行是合并标题，真正的列名在第二行（与 parseBlacklist 的判断相同）"""
+    if js_truthy(frame.iloc[0]).sum() <= 1 and '涉黑恶' in js_string(frame.iloc[0, 0]):
+        return 1
+    return 0
+
+def header_values(frame, start):
+    return [js_string(value) for value in frame.iloc[start]]
+
+def build_table(data, headers, fields, row_numbers, deferred):
+    """按字段定义取出各列并取值，返回 {列名: Series}，需要由 JS 换算的日期行记入 deferred"""
+    table = {}
+    for name, match, kind in fields:
+        index = find_column(headers, match)
+        if index is None:
+            # 模板中没有这一列，与 JS 中 row[-1] 得到 undefined 相同
+            column = pd.Series([None] * len(data), index=data.index, dtype=object)
+        else:
+            column = data[index]
+        table[name], rows = normalize_column(column, kind, row_numbers)
+        if rows:
+            deferred[name] = rows
+    return table
+
+def ingest(path, template_type=None):
+    """
+    解析一个Excel文件，返回 (类型, 记录数, {表名: {列名: Series}}, {表名: {列名: [行位置]}})；
+    除标题行外没有数据行时记录数为 None
+    """
+    frame = read_sheet(path)
+    if len(frame) <= 1:
+        return template_type, None, {}, {}
+
+    start = header_row(frame)
+    headers = header_values(frame, start)
+    if template_type is None:
+        template_type = detect_template_type(os.path.basename(path), headers)
+    if template_type not in TEMPLATES:
+        raise ValueError('无法识别模板类型')
+    if template_type != 'blacklist' and start:
+        # 只有涉黑恶名单有合并标题行
+        start = 0
+        headers = header_values(frame, start)
+    spec = TEMPLATES[template_type]
+
+    data = frame.iloc[start + 1:]
+    # 与 JS 中的行号 i 相同（第一行为 0）
+    row_numbers = data.index.to_numpy()
+
+    if spec['key'] is not None:
+        index = find_column(headers, spec['key'])
+        key = data[index] if index is not None else pd.Series([None] * len(data), index=data.index, dtype=object)
+        keep = js_truthy(key).to_numpy()
+    else:
+        keep = pd.Series(False, index=data.index)
+        for match in (TEMPLATES['mail']['records'][3][1], '序号'):
+            index = find_column(headers, match)
+            if index is not None:
+                keep |= js_truthy(data[index])
+        keep = keep.to_numpy()
+
+    data = data[keep]
+    row_numbers = row_numbers[keep]
+
+    tables, deferred = {}, {}
+    for name in ('records', 'prisoners'):
+        if name in spec:
+            deferred[name] = {}
+            tables[name] = build_table(data, headers, spec[name], row_numbers, deferred[name])
+    if spec['key'] is not None:
+        prisoner_id = key[keep].map(lambda value: js_string(value).strip(JS_WHITESPACE))
+        for name in tables:
+            tables[name] = {'prisoner_id': prisoner_id, **tables[name]}
+    return template_type, len(data), tables, {name: rows for name, rows in deferred.items() if rows}
+
+def column_values(column):
+    """Series 转为 JSON 可用的列表，缺失值为 None"""
+    return column.astype(object).where(column.notna(), None).tolist()
+
+def write_arrow(tables, directory):
+    """各表写成 Arrow IPC 文件"""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        raise ValueError('输出 Arrow 需要安装 pyarrow')
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, table in tables.items():
+        columns = {}
+        for column, values in table.items():
+            values = column_values(values)
+            # 文字字段中数值和文字混在一起时按 JS 的 String() 统一为文字
+            if len({type(value) for value in values if value is not None}) > 1:
+                values = [None if value is None else js_string(value) for value in values]
+            columns[column] = pa.array(values)
+        arrow_table = pa.table(columns)
+        paths[name] = os.path.join(directory, f'{name}.arrow')
+        feather.write_feather(arrow_table, paths[name], compression='uncompressed')
+    return paths
+
+def main():
+    args = sys.argv[1:]
+    options = {'--type': None, '--format': 'json', '--out': None}
+    paths = []
+    while args:
+        name = args.pop(0)
+        if name in options and args:
+            options[name] = args.pop(0)
+        else:
+            paths.append(name)
+
+    if len(paths) != 1 or options['--format'] not in ('json', 'arrow') or \
+            (options['--format'] == 'arrow' and not options['--out']):
+        print("用法: python excel_ingest.py <文件.xlsx> [--type 类型] [--format json|arrow] [--out 路径]",
+              file=sys.stderr)
+        sys.exit(2)
+
+    start = time.perf_counter()
+    try:
+        template_type, rows, tables, deferred = ingest(paths[0], options['--type'])
+        result = {'success': True, 'type': template_type}
+        if rows is None:
+            result['empty'] = True
+            rows = 0
+        result['rows'] = rows
+        if options['--format'] == 'arrow':
+            result['files'] = write_arrow(tables, options['--out'])
+        else:
+            for name, table in tables.items():
+                result[name] = {column: column_values(values) for column, values in table.items()}
+        if deferred:
+            result['deferred'] = deferred
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    result['ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    output = json.dumps(result, ensure_ascii=False, separators=(',', ':'))
+    if options['--out'] and options['--format'] == 'json':
+        with open(options['--out'], 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.buffer.write(output.encode('utf-8') + b'\n')
+    sys.exit(0 if result['success'] else 1)
+
+if __name__ == '__main__':
+    main()
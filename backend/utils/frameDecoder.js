@@ -0,0 +1,52 @@
+/**
+ * 子进程分帧输出的解码器
+ * 每帧为一行帧头（以 \n 结束）加上帧头中给出字节数的帧体，
+ * 数据块只以 Buffer 形式暂存，整帧到齐时拼接一次，不会在数据块边界切断多字节字符
+ */
+
+/**
+ * 创建帧解码器
+ * @param {Function} parseHeader - 解析帧头文本，返回至少包含 length（帧体字节数）的对象，无效时抛出异常
+ * @param {Function} onFrame - 凑齐一帧后回调 (帧头对象, 帧体Buffer)
+ * @returns {Function} 接收数据块的函数，帧头无效时抛出异常
+ */
+function createFrameDecoder(parseHeader, onFrame) {
+    let chunks = []
+    let buffered = 0
+    let header = null
+
+    return (chunk) => {
+        chunks.push(chunk)
+        buffered += chunk.length
+
+        while (true) {
+            if (!header) {
+                const data = chunks.length === 1 ? chunks[0] : Buffer.concat(chunks, buffered)
+                const newline = data.indexOf(0x0a)
+                if (newline === -1) {
+                    chunks = [data]
+                    return
+                }
+
+                header = parseHeader(data.toString('utf8', 0, newline))
+                if (!Number.isInteger(header.length) || header.length < 0) {
+                    header = null
+                    throw new Error(`帧头无效: ${data.toString('utf8', 0, Math.min(newline, 200))}`)
+                }
+                chunks = [data.subarray(newline + 1)]
+                buffered = data.length - newline - 1
+            }
+
+            if (buffered < header.length) return
+
+            const data = chunks.length === 1 ? chunks[0] : Buffer.concat(chunks, buffered)
+            const frame = header
+            header = null
+            chunks = [data.subarray(frame.length)]
+            buffered = data.length - frame.length
+            onFrame(frame, data.subarray(0, frame.length))
+        }
+    }
+}
+
+module.exports = { createFrameDecoder }
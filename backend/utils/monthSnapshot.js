@@ -0,0 +1,207 @@
+/**
+ * 月度数据快照
+ * 用固定的几条集合查询读取某派驻单位某月的全部数据（日志、周/月检察记录、及时检察事件、全部附件、
+ * 基本信息、犯情动态、事项清单），在内存中按日志、事件和日期建立索引。
+ * 归档包、月度报告和事项清单都从快照取数据，不再在循环中逐条查询附件
+ */
+const { Op } = require('sequelize')
+const {
+    User, DailyLog, WeeklyRecord, MonthlyRecord, ImmediateEvent, Attachment,
+    MonthlyBasicInfo, CriminalReport, ReportChecklistItem
+} = require('../models')
+
+/**
+ * 格式化为 YYYY-MM-DD（与归档包中的文件名一致）
+ */
+function dateKey(value) {
+    return value ? new Date(value).toISOString().split('T')[0] : 'unknown'
+}
+
+function groupBy(rows, keyOf) {
+    const groups = new Map()
+    for (const row of rows) {
+        const key = keyOf(row)
+        if (!groups.has(key)) groups.set(key, [])
+        groups.get(key).push(row)
+    }
+    return groups
+}
+
+/**
+ * 读取月度数据快照
+ * @param {string} prisonName - 派驻单位
+ * @param {number|string} year - 年
+ * @param {number|string} month - 月
+ * @param {Object} [options]
+ * @param {boolean} [options.records=true] - 为 false 时只读取基本信息、犯情动态和事项清单（单独下载报告、清单时使用）
+ * @returns {Promise<Object>} 快照
+ */
+async function loadMonthSnapshot(prisonName, year, month, options = {}) {
+    year = parseInt(year)
+    month = parseInt(month)
+    const targetMonth = `${year}-${String(month).padStart(2, '0')}`
+    const monthStart = new Date(year, month - 1, 1)
+    const monthEnd = new Date(year, month, 1)
+    let queries = 0
+    const count = (promise) => {
+        queries++
+        return promise
+    }
+
+    // 报告和清单用到的按月数据，与下面的记录查询并行
+    const monthly = Promise.all([
+        count(MonthlyBasicInfo.findOne({
+            where: { prison_name: prisonName, report_month: targetMonth }
+        })),
+        count(CriminalReport.findOne({
+            where: { prison_name: prisonName, report_month: targetMonth }
+        })),
+        count(ReportChecklistItem.findAll({
+            where: { prison_name: prisonName, year, month },
+            order: [['item_id', 'ASC']]
+        }))
+    ])
+    // 记录查询先失败时避免出现未处理的拒绝，错误仍在最后 await 时抛出
+    monthly.catch(() => {})
+
+    const snapshot = {
+        prisonName,
+        year,
+        month,
+        targetMonth,
+        userIds: [],
+        dailyLogs: [],
+        weeklyRecords: [],
+        monthlyRecords: [],
+        immediateEvents: [],
+        attachments: [],
+        monthAttachments: [],
+        otherAttachments: [],
+        reportAttachments: [],
+        logsByDate: new Map()
+    }
+
+    if (options.records !== false) {
+        // 同一派驻单位的所有用户
+        const users = await count(User.findAll({
+            where: { prison_name: prisonName },
+            attributes: ['id']
+        }))
+        const userIds = users.map(u => u.id)
+        snapshot.userIds = userIds
+
+        const nextMonth = month === 12 ? `${year + 1}-01-01` : `${year}-${String(month + 1).padStart(2, '0')}-01`
+        const [dailyLogs, weeklyRecords, monthlyRecords, immediateEvents] = await Promise.all([
+            count(DailyLog.findAll({
+                where: {
+                    user_id: { [Op.in]: userIds },
+                    log_date: { [Op.gte]: `${targetMonth}-01`, [Op.lt]: nextMonth }
+                },
+                order: [['log_date', 'ASC']]
+            })),
+            count(WeeklyRecord.findAll({
+                where: {
+                    user_id: { [Op.in]: userIds },
+                    record_date: { [Op.gte]: monthStart, [Op.lt]: monthEnd }
+                },
+                order: [['record_date', 'ASC']]
+            })),
+            count(MonthlyRecord.findAll({
+                where: {
+                    user_id: { [Op.in]: userIds },
+                    record_month: targetMonth
+                }
+            })),
+            count(ImmediateEvent.findAll({
+                where: {
+                    user_id: { [Op.in]: userIds },
+                    event_date: { [Op.gte]: monthStart, [Op.lt]: monthEnd }
+                },
+                order: [['event_date', 'ASC']]
+            }))
+        ])
+
+        const eventAttachmentIds = new Set()
+        for (const event of immediateEvents) {
+            if (Array.isArray(event.attachment_ids)) {
+                event.attachment_ids.forEach(id => eventAttachmentIds.add(id))
+            }
+        }
+
+        // 全部附件一次读出：各记录关联的附件、事件引用的附件，以及当月上传的其他材料
+        const attachments = await count(Attachment.findAll({
+            where: {
+                [Op.or]: [
+                    { related_log_type: 'daily', related_log_id: { [Op.in]: dailyLogs.map(l => l.id) } },
+                    { related_log_type: 'weekly', related_log_id: { [Op.in]: weeklyRecords.map(r => r.id) } },
+                    { related_log_type: 'monthly', related_log_id: { [Op.in]: monthlyRecords.map(r => r.id) } },
+                    { id: { [Op.in]: [...eventAttachmentIds] } },
+                    {
+                        user_id: { [Op.in]: userIds },
+                        [Op.or]: [
+                            { upload_month: targetMonth },
+                            {
+                                upload_month: { [Op.or]: [null, ''] },
+                                createdAt: { [Op.gte]: monthStart, [Op.lt]: monthEnd }
+                            }
+                        ]
+                    }
+                ]
+            },
+            order: [['id', 'ASC']]
+        }))
+
+        Object.assign(snapshot, { dailyLogs, weeklyRecords, monthlyRecords, immediateEvents, attachments })
+
+        // 索引：记录类型:记录ID -> 附件，附件ID -> 附件，日期 -> 日志
+        const byRecord = groupBy(attachments.filter(att => att.related_log_type && att.related_log_id),
+            att => `${att.related_log_type}:${att.related_log_id}`)
+        const byId = new Map(attachments.map(att => [att.id, att]))
+        snapshot.logsByDate = groupBy(dailyLogs, log => dateKey(log.log_date))
+
+        const recordIds = {
+            daily: new Set(dailyLogs.map(l => l.id)),
+            weekly: new Set(weeklyRecords.map(r => r.id)),
+            monthly: new Set(monthlyRecords.map(r => r.id))
+        }
+        const userIdSet = new Set(userIds)
+
+        // 已关联到当月日志、周/月检察记录或及时检察事件的附件
+        const related = new Set(eventAttachmentIds)
+        for (const att of attachments) {
+            if (recordIds[att.related_log_type]?.has(att.related_log_id)) {
+                related.add(att.id)
+            }
+        }
+        snapshot.relatedAttachmentIds = related
+
+        // 当月上传的附件（upload_month 为空时按上传时间），其中没有关联到具体记录的是其他材料
+        snapshot.monthAttachments = attachments.filter(att => {
+            if (!userIdSet.has(att.user_id)) return false
+            if (att.upload_month === targetMonth) return true
+            return !att.upload_month && att.createdAt >= monthStart && att.createdAt < monthEnd
+        })
+        snapshot.otherAttachments = snapshot.monthAttachments.filter(att => !related.has(att.id))
+
+        // 报告统计用的附件：日志、周/月检察记录的附件和其他材料
+        const reportIds = new Set(snapshot.otherAttachments.map(att => att.id))
+        snapshot.reportAttachments = attachments.filter(att =>
+            reportIds.has(att.id) || recordIds[att.related_log_type]?.has(att.related_log_id))
+
+        snapshot.recordAttachments = (type, id) => byRecord.get(`${type}:${id}`) || []
+        snapshot.eventAttachments = (event) => (Array.isArray(event.attachment_ids) ? event.attachment_ids : [])
+            .map(id => byId.get(id))
+            .filter(Boolean)
+            .sort((a, b) => a.id - b.id)
+    }
+
+    const [basicInfo, criminalReport, checklistItems] = await monthly
+    Object.assign(snapshot, { basicInfo, criminalReport, checklistItems })
+    snapshot.queries = queries
+    return snapshot
+}
+
+module.exports = {
+    dateKey,
+    loadMonthSnapshot
+}
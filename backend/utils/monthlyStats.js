@@ -0,0 +1,631 @@
+/**
+ * 月度统计汇总
+ * 每条日/周/月检察记录对所属用户、月份的各项次数贡献固定的增量，记录新增、修改、删除（包括平板导入和批量清理）时
+ * 通过模型钩子把增量累加到 monthly_stats 表（每个用户每月一行）。批量修改、删除不逐条读取记录，
+ * 先按用户和日期分组查出受影响的用户、月份，执行后按剩余记录重新计算这些行。个人统计直接读取一行，
+ * 派驻单位的统计取该单位现有用户的各行相加，用户调整派驻单位后不需要重建；不再逐条解析记录中的 JSON。
+ * 汇总与记录不一致时运行 scripts/rebuild-monthly-stats.js 重新计算
+ */
+const { Op } = require('sequelize')
+
+const COUNTERS = [
+    'daily_log_count', 'weekly_record_count', 'monthly_record_count',
+    'three_scene_checks', 'monitor_checks',
+    'key_location_checks', 'total_talks', 'new_admission_talks', 'evil_talks', 'injury_talks',
+    'confinement_talks', 'mailbox_opens', 'letters_received',
+    'visit_checks'
+]
+
+// 谈话类型 -> 统计字段
+const TALK_FIELDS = {
+    newPrisoner: 'new_admission_talks',
+    evil: 'evil_talks',
+    injury: 'injury_talks',
+    confinement: 'confinement_talks'
+}
+
+function toInt(value) {
+    return parseInt(value) || 0
+}
+
+/**
+ * 日期 YYYY-MM-DD（DATEONLY 为字符串时直接截取，Date 按本地时间）
+ */
+function dayOf(value) {
+    if (!value) return null
+    if (typeof value === 'string') return value.slice(0, 10)
+    const date = new Date(value)
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`
+}
+
+/**
+ * 日期所在月份 YYYY-MM
+ */
+function monthOf(value) {
+    const day = dayOf(value)
+    return day ? day.slice(0, 7) : null
+}
+
+/**
+ * 一篇日检察日志的统计增量
+ */
+function dailyLogStats(log) {
+    const stats = { daily_log_count: 1, three_scene_checks: 0, monitor_checks: 0 }
+    const scenes = log.three_scenes
+    if (scenes) {
+        if (scenes.labor?.checked) stats.three_scene_checks++
+        if (scenes.living?.checked) stats.three_scene_checks++
+        if (scenes.study?.checked) stats.three_scene_checks++
+    }
+    if (log.monitor_check?.checked) {
+        stats.monitor_checks += toInt(log.monitor_check.count) || 1
+    }
+    return stats
+}
+
+/**
+ * 一条周检察记录的统计增量
+ */
+function weeklyRecordStats(record) {
+    const stats = {
+        weekly_record_count: 1,
+        key_location_checks: 0,
+        total_talks: 0,
+        new_admission_talks: 0,
+        evil_talks: 0,
+        injury_talks: 0,
+        confinement_talks: 0,
+        mailbox_opens: 0,
+        letters_received: 0
+    }
+    if (record.hospital_check) {
+        if (record.hospital_check.hospitalChecked) stats.key_location_checks++
+        if (record.hospital_check.confinementChecked) stats.key_location_checks++
+    }
+    if (Array.isArray(record.talk_records)) {
+        stats.total_talks += record.talk_records.length
+        for (const talk of record.talk_records) {
+            const field = TALK_FIELDS[talk?.type]
+            if (field) stats[field]++
+        }
+    }
+    if (record.mailbox) {
+        stats.mailbox_opens += toInt(record.mailbox.openCount)
+        stats.letters_received += toInt(record.mailbox.receivedCount)
+    }
+    return stats
+}
+
+/**
+ * 一条月检察记录的统计增量
+ */
+function monthlyRecordStats(record) {
+    const stats = { monthly_record_count: 1, visit_checks: 0 }
+    if (record.visit_check?.checked) {
+        stats.visit_checks += toInt(record.visit_check.visitCount) || 1
+    }
+    return stats
+}
+
+/**
+ * 月份的日期范围 [start, end)，与归档取数的范围一致
+ */
+function monthRange(reportMonth) {
+    const [year, month] = reportMonth.split('-').map(Number)
+    const end = month === 12 ? `${year + 1}-01-01` : `${year}-${String(month + 1).padStart(2, '0')}-01`
+    return [`${reportMonth}-01`, end]
+}
+
+/**
+ * 按日期字段取若干月份（YYYY-MM，已排序）的条件：从第一个月月初到最后一个月月末
+ */
+function dateRangeWhere(field) {
+    return (months) => ({
+        [field]: { [Op.gte]: monthRange(months[0])[0], [Op.lt]: monthRange(months[months.length - 1])[1] }
+    })
+}
+
+// 各类记录的统计方式：日期字段、所属月份、月份条件、统计增量，以及影响统计的字段和对应的汇总列
+const SOURCES = {
+    DailyLog: {
+        daily: true,
+        field: 'log_date',
+        month: row => monthOf(row.log_date),
+        monthWhere: dateRangeWhere('log_date'),
+        stats: dailyLogStats,
+        inputs: ['three_scenes', 'monitor_check', 'strict_control', 'gang_prisoners'],
+        counters: ['daily_log_count', 'three_scene_checks', 'monitor_checks']
+    },
+    WeeklyRecord: {
+        field: 'record_date',
+        month: row => monthOf(row.record_date),
+        monthWhere: dateRangeWhere('record_date'),
+        stats: weeklyRecordStats,
+        inputs: ['hospital_check', 'talk_records', 'mailbox'],
+        counters: ['weekly_record_count', 'key_location_checks', 'total_talks', 'new_admission_talks', 'evil_talks',
+            'injury_talks', 'confinement_talks', 'mailbox_opens', 'letters_received']
+    },
+    MonthlyRecord: {
+        field: 'record_month',
+        month: row => row.record_month,
+        monthWhere: (months) => ({ record_month: { [Op.in]: months } }),
+        stats: monthlyRecordStats,
+        inputs: ['visit_check'],
+        counters: ['monthly_record_count', 'visit_checks']
+    }
+}
+
+/**
+ * 日志是否晚于汇总中记下的最后一篇（同一天取ID大的）
+ */
+function isLater(date, id, latestDate, latestId) {
+    if (!date) return false
+    if (!latestDate) return true
+    return date > latestDate || (date === latestDate && id > (latestId || 0))
+}
+
+/**
+ * 汇总行记下的最后一篇日志
+ */
+function latestFields(log) {
+    return {
+        latest_log_id: log ? log.id : null,
+        latest_log_date: log ? dayOf(log.log_date) : null,
+        strict_control_total: toInt(log?.strict_control?.totalCount),
+        gang_prisoners_total: toInt(log?.gang_prisoners?.totalCount)
+    }
+}
+
+/**
+ * 重新取该用户当月最后一篇日志
+ */
+async function refreshLatest(stats, transaction) {
+    const { DailyLog } = require('../models')
+    const [start, end] = monthRange(stats.report_month)
+    const latest = await DailyLog.findOne({
+        where: {
+            user_id: stats.user_id,
+            log_date: { [Op.gte]: start, [Op.lt]: end }
+        },
+        attributes: ['id', 'log_date', 'strict_control', 'gang_prisoners'],
+        order: [['log_date', 'DESC'], ['id', 'DESC']],
+        transaction
+    })
+    await stats.update(latestFields(latest), { transaction })
+}
+
+/**
+ * 日志变化后更新“最后一篇日志”：删除或改动的正是记下的那篇时重新查询，
+ * 否则只在新增、改动的日志更晚时替换，不用查询
+ */
+async function updateLatest(stats, added, removed, transaction) {
+    if (removed.some(log => log.id === stats.latest_log_id)) {
+        return refreshLatest(stats, transaction)
+    }
+    let latest = null
+    for (const log of added) {
+        const date = dayOf(log.log_date)
+        if (isLater(date, log.id, latest ? dayOf(latest.log_date) : null, latest?.id)) latest = log
+    }
+    if (latest && isLater(dayOf(latest.log_date), latest.id, dayOf(stats.latest_log_date), stats.latest_log_id)) {
+        await stats.update(latestFields(latest), { transaction })
+    }
+}
+
+/**
+ * 把一批记录的增量累加到汇总表
+ * @param {string} modelName - DailyLog/WeeklyRecord/MonthlyRecord
+ * @param {Array<{row: Object, sign: number}>} changes - 记录（当前值或修改前的值）及方向（+1 新增，-1 删除）
+ * @param {Object} [options] - { transaction }
+ */
+async function applyChanges(modelName, changes, options = {}) {
+    const source = SOURCES[modelName]
+    const { transaction } = options
+
+    // 按 用户+月份 合并增量，同一请求中多条记录只更新一次
+    const groups = new Map()
+    for (const { row, sign } of changes) {
+        const reportMonth = source.month(row)
+        if (!row.user_id || !reportMonth) continue
+        const key = groupKey(row.user_id, reportMonth)
+        if (!groups.has(key)) {
+            groups.set(key, { userId: row.user_id, reportMonth, delta: {}, added: [], removed: [] })
+        }
+        const group = groups.get(key)
+        for (const [field, value] of Object.entries(source.stats(row))) {
+            group.delta[field] = (group.delta[field] || 0) + sign * value
+        }
+        if (source.daily) {
+            (sign > 0 ? group.added : group.removed).push(row)
+        }
+    }
+
+    const { MonthlyStats } = require('../models')
+    for (const { userId, reportMonth, delta, added, removed } of groups.values()) {
+        const amounts = Object.fromEntries(Object.entries(delta).filter(([, value]) => value !== 0))
+        if (Object.keys(amounts).length === 0 && !source.daily) continue
+
+        const [stats] = await MonthlyStats.findOrCreate({
+            where: { user_id: userId, report_month: reportMonth },
+            transaction
+        })
+        if (Object.keys(amounts).length > 0) {
+            // 原子累加，并发写入互不覆盖
+            await MonthlyStats.increment(amounts, { where: { id: stats.id }, transaction })
+        }
+        if (source.daily) {
+            await updateLatest(stats, added, removed, transaction)
+        }
+    }
+}
+
+const REBUILD_BATCH = 1000
+
+function groupKey(userId, reportMonth) {
+    return `${userId}\u0000${reportMonth}`
+}
+
+/**
+ * 批量操作是否针对整张表（清空全部数据）
+ */
+function isWholeTable(options) {
+    const where = options.where || {}
+    return Boolean(options.truncate) ||
+        (Object.keys(where).length === 0 && Object.getOwnPropertySymbols(where).length === 0)
+}
+
+/**
+ * 批量操作涉及的 用户+月份：只按用户和日期分组查询，不读取记录内容
+ */
+async function affectedGroups(modelName, where, transaction) {
+    const source = SOURCES[modelName]
+    const Model = require('../models')[modelName]
+    const rows = await Model.findAll({
+        where,
+        attributes: ['user_id', source.field],
+        group: ['user_id', source.field],
+        raw: true,
+        transaction
+    })
+    const groups = new Map()
+    for (const row of rows) {
+        const reportMonth = source.month(row)
+        if (row.user_id && reportMonth) {
+            groups.set(groupKey(row.user_id, reportMonth), { userId: row.user_id, reportMonth })
+        }
+    }
+    return groups
+}
+
+/**
+ * 某类记录对应的汇总列全部清零时的取值
+ */
+function emptyValues(source) {
+    const values = Object.fromEntries(source.counters.map(field => [field, 0]))
+    return source.daily ? { ...values, ...latestFields(null) } : values
+}
+
+/**
+ * 按剩余记录重新计算若干 用户+月份 中某类记录对应的汇总列（批量修改、删除之后）
+ * 受影响的用户和月份范围内的记录分批读取一次，没有剩余记录的行一次清零，其余逐行写入
+ */
+async function recomputeGroups(modelName, groups, transaction) {
+    if (groups.size === 0) return
+    const source = SOURCES[modelName]
+    const models = require('../models')
+    const Model = models[modelName]
+    const { MonthlyStats } = models
+
+    const totals = new Map()
+    for (const [key, group] of groups) {
+        totals.set(key, { ...group, values: emptyValues(source), found: false })
+    }
+    const userIds = [...new Set([...groups.values()].map(g => g.userId))]
+    const months = [...new Set([...groups.values()].map(g => g.reportMonth))].sort()
+
+    let lastId = 0
+    for (;;) {
+        const rows = await Model.findAll({
+            where: { ...source.monthWhere(months), user_id: { [Op.in]: userIds }, id: { [Op.gt]: lastId } },
+            order: [['id', 'ASC']],
+            limit: REBUILD_BATCH,
+            transaction
+        })
+        if (rows.length === 0) break
+        lastId = rows[rows.length - 1].id
+
+        for (const row of rows) {
+            const total = totals.get(groupKey(row.user_id, source.month(row)))
+            if (!total) continue
+            total.found = true
+            for (const [field, value] of Object.entries(source.stats(row))) {
+                total.values[field] += value
+            }
+            const { values } = total
+            if (source.daily && isLater(dayOf(row.log_date), row.id, values.latest_log_date, values.latest_log_id)) {
+                Object.assign(values, latestFields(row))
+            }
+        }
+    }
+
+    const all = [...totals.values()]
+    const empty = all.filter(total => !total.found)
+    const filled = all.filter(total => total.found)
+    const whereGroups = (list) => ({
+        [Op.or]: list.map(({ userId, reportMonth }) => ({ user_id: userId, report_month: reportMonth }))
+    })
+
+    for (let i = 0; i < empty.length; i += REBUILD_BATCH) {
+        await MonthlyStats.update(emptyValues(source), { where: whereGroups(empty.slice(i, i + REBUILD_BATCH)), transaction })
+    }
+    for (let i = 0; i < filled.length; i += REBUILD_BATCH) {
+        const batch = filled.slice(i, i + REBUILD_BATCH)
+        const existing = new Map((await MonthlyStats.findAll({
+            where: whereGroups(batch),
+            attributes: ['id', 'user_id', 'report_month'],
+            transaction
+        })).map(row => [groupKey(row.user_id, row.report_month), row.id]))
+
+        const missing = []
+        for (const { userId, reportMonth, values } of batch) {
+            const id = existing.get(groupKey(userId, reportMonth))
+            if (id) {
+                await MonthlyStats.update(values, { where: { id }, transaction })
+            } else {
+                missing.push({ user_id: userId, report_month: reportMonth, ...values })
+            }
+        }
+        if (missing.length > 0) {
+            await MonthlyStats.bulkCreate(missing, { transaction })
+        }
+    }
+}
+
+/**
+ * 在日/周/月检察记录模型上注册增量更新的钩子
+ * 统计失败只记录日志不影响记录本身的保存，可用重建脚本修正
+ */
+function registerStatsHooks(models) {
+    for (const modelName of Object.keys(SOURCES)) {
+        const Model = models[modelName]
+        const source = SOURCES[modelName]
+        const guard = async (fn) => {
+            try {
+                await fn()
+            } catch (err) {
+                console.error(`⚠️ 月度统计更新失败（${modelName}），可运行 npm run stats:rebuild 重建:`, err.message)
+            }
+        }
+        const apply = (changes, options) => guard(() => applyChanges(modelName, changes, options))
+
+        Model.addHook('afterCreate', 'monthlyStats', (instance, options) =>
+            apply([{ row: instance, sign: 1 }], options))
+
+        // 修改前的值：未改动的字段取当前值，改动的字段取原值
+        Model.addHook('beforeUpdate', 'monthlyStats', (instance) => {
+            instance._statsPrevious = { ...instance.dataValues, ...instance.previous() }
+        })
+        Model.addHook('afterUpdate', 'monthlyStats', (instance, options) => {
+            const previous = instance._statsPrevious
+            delete instance._statsPrevious
+            if (!previous) return
+            return apply([{ row: previous, sign: -1 }, { row: instance, sign: 1 }], options)
+        })
+
+        Model.addHook('afterDestroy', 'monthlyStats', (instance, options) =>
+            apply([{ row: instance, sign: -1 }], options))
+
+        Model.addHook('afterBulkCreate', 'monthlyStats', (instances, options) => {
+            if (options.individualHooks) return
+            return apply(instances.map(row => ({ row, sign: 1 })), options)
+        })
+
+        // 批量修改、删除：执行前查出涉及的 用户+月份，执行后按剩余记录重新计算这些行；
+        // 调用方要求逐条执行钩子（individualHooks）时由上面的逐条钩子处理
+        const before = (options) => guard(async () => {
+            if (options.individualHooks) return
+            options._statsGroups = await affectedGroups(modelName, options.where, options.transaction)
+        })
+        const after = (options, moved) => guard(async () => {
+            const groups = options._statsGroups
+            delete options._statsGroups
+            if (!groups) return
+            if (moved) {
+                // 改动了用户或日期时，记录移入的 用户+月份 也要重新计算
+                for (const { userId, reportMonth } of [...groups.values()]) {
+                    const target = { userId: moved.user_id || userId, reportMonth: source.month(moved) || reportMonth }
+                    groups.set(groupKey(target.userId, target.reportMonth), target)
+                }
+            }
+            await recomputeGroups(modelName, groups, options.transaction)
+        })
+
+        // 只改动与统计无关的字段（如状态）时不需要处理
+        const affectsStats = (values) => Object.keys(values || {})
+            .some(field => field === 'user_id' || field === source.field || source.inputs.includes(field))
+
+        Model.addHook('beforeBulkUpdate', 'monthlyStats', (options) => {
+            if (!affectsStats(options.attributes)) return
+            options._statsUpdate = true
+            return before(options)
+        })
+        Model.addHook('afterBulkUpdate', 'monthlyStats', (options) => {
+            if (!options._statsUpdate) return
+            delete options._statsUpdate
+            return after(options, options.attributes)
+        })
+
+        Model.addHook('beforeBulkDestroy', 'monthlyStats', (options) => {
+            // 清空整张表时不需要查出涉及哪些行，删除后把该类记录对应的汇总列一次清零
+            if (isWholeTable(options)) return
+            return before(options)
+        })
+        Model.addHook('afterBulkDestroy', 'monthlyStats', (options) => {
+            if (!options.individualHooks && isWholeTable(options)) {
+                return guard(() => require('../models').MonthlyStats.update(emptyValues(source), {
+                    where: {},
+                    transaction: options.transaction
+                }))
+            }
+            return after(options)
+        })
+    }
+}
+
+/**
+ * 汇总行转为统计对象（没有汇总行时各项为 0）
+ */
+function toStats(row) {
+    const value = (field) => (row ? toInt(row[field]) : 0)
+    return {
+        dailyLogCount: value('daily_log_count'),
+        weeklyRecordCount: value('weekly_record_count'),
+        monthlyRecordCount: value('monthly_record_count'),
+        threeSceneChecks: value('three_scene_checks'),
+        monitorChecks: value('monitor_checks'),
+        keyLocationChecks: value('key_location_checks'),
+        totalTalks: value('total_talks'),
+        newAdmissionTalks: value('new_admission_talks'),
+        evilTalks: value('evil_talks'),
+        injuryTalks: value('injury_talks'),
+        confinementTalks: value('confinement_talks'),
+        mailboxOpens: value('mailbox_opens'),
+        lettersReceived: value('letters_received'),
+        visitChecks: value('visit_checks'),
+        strictControlTotal: value('strict_control_total'),
+        gangPrisonersTotal: value('gang_prisoners_total')
+    }
+}
+
+/**
+ * 多个用户的汇总行合并：各项次数相加，在册人数取其中最后一篇日志
+ */
+function combineRows(rows) {
+    if (rows.length <= 1) return rows[0] || null
+    const total = {}
+    COUNTERS.forEach(field => {
+        total[field] = rows.reduce((sum, row) => sum + toInt(row[field]), 0)
+    })
+    let latest = null
+    for (const row of rows) {
+        if (isLater(dayOf(row.latest_log_date), row.latest_log_id,
+            latest ? dayOf(latest.latest_log_date) : null, latest?.latest_log_id)) {
+            latest = row
+        }
+    }
+    total.strict_control_total = latest ? latest.strict_control_total : 0
+    total.gang_prisoners_total = latest ? latest.gang_prisoners_total : 0
+    return total
+}
+
+/**
+ * 读取某用户某月的统计
+ * @param {number} userId - 用户ID
+ * @param {string} reportMonth - YYYY-MM
+ */
+async function getUserMonthlyStats(userId, reportMonth) {
+    const { MonthlyStats } = require('../models')
+    const row = await MonthlyStats.findOne({
+        where: { user_id: userId, report_month: reportMonth }
+    })
+    return toStats(row)
+}
+
+/**
+ * 读取某派驻单位某月的统计（该单位现有用户的统计之和）
+ * @param {string} prisonName - 派驻单位
+ * @param {string} reportMonth - YYYY-MM
+ */
+async function getMonthlyStats(prisonName, reportMonth) {
+    if (!prisonName) return toStats(null)
+    const { User, MonthlyStats } = require('../models')
+    const users = await User.findAll({
+        where: { prison_name: prisonName },
+        attributes: ['id']
+    })
+    if (users.length === 0) return toStats(null)
+    const rows = await MonthlyStats.findAll({
+        where: { user_id: { [Op.in]: users.map(u => u.id) }, report_month: reportMonth }
+    })
+    return toStats(combineRows(rows))
+}
+
+/**
+ * 按记录重新计算汇总（补历史数据或修正偏差）
+ * @param {Object} [scope] - { prisonName, reportMonth }，按派驻单位时重建该单位现有用户的汇总，不指定时重建全部
+ * @returns {Promise<number>} 写入的汇总行数
+ */
+async function rebuildMonthlyStats(scope = {}) {
+    const models = require('../models')
+    const { sequelize, User, MonthlyStats } = models
+
+    let userWhere = {}
+    if (scope.prisonName) {
+        const users = await User.findAll({ where: { prison_name: scope.prisonName }, attributes: ['id'] })
+        userWhere = { user_id: { [Op.in]: users.map(u => u.id) } }
+    }
+
+    const groups = new Map()
+    const groupOf = (userId, reportMonth) => {
+        const key = groupKey(userId, reportMonth)
+        if (!groups.has(key)) {
+            const row = { user_id: userId, report_month: reportMonth, ...latestFields(null) }
+            COUNTERS.forEach(field => { row[field] = 0 })
+            groups.set(key, row)
+        }
+        return groups.get(key)
+    }
+
+    for (const [modelName, source] of Object.entries(SOURCES)) {
+        const Model = models[modelName]
+        let lastId = 0
+        // 按主键分批读取，避免一次载入全部记录
+        for (;;) {
+            const rows = await Model.findAll({
+                where: {
+                    ...(scope.reportMonth ? source.monthWhere([scope.reportMonth]) : {}),
+                    ...userWhere,
+                    id: { [Op.gt]: lastId }
+                },
+                order: [['id', 'ASC']],
+                limit: REBUILD_BATCH
+            })
+            if (rows.length === 0) break
+            lastId = rows[rows.length - 1].id
+
+            for (const row of rows) {
+                const reportMonth = source.month(row)
+                if (!row.user_id || !reportMonth) continue
+                const group = groupOf(row.user_id, reportMonth)
+                for (const [field, value] of Object.entries(source.stats(row))) {
+                    group[field] += value
+                }
+                if (source.daily && isLater(dayOf(row.log_date), row.id, group.latest_log_date, group.latest_log_id)) {
+                    Object.assign(group, latestFields(row))
+                }
+            }
+        }
+    }
+
+    const rows = [...groups.values()]
+    await sequelize.transaction(async (transaction) => {
+        const where = { ...userWhere }
+        if (scope.reportMonth) where.report_month = scope.reportMonth
+        await MonthlyStats.destroy({ where, transaction })
+        for (let i = 0; i < rows.length; i += REBUILD_BATCH) {
+            await MonthlyStats.bulkCreate(rows.slice(i, i + REBUILD_BATCH), { transaction })
+        }
+    })
+    return rows.length
+}
+
+module.exports = {
+    dailyLogStats,
+    weeklyRecordStats,
+    monthlyRecordStats,
+    registerStatsHooks,
+    toStats,
+    getUserMonthlyStats,
+    getMonthlyStats,
+    rebuildMonthlyStats
+}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析结果磁盘缓存
+以 SHA-256(解析器版本 + 文件内容) 为键，每个结果存为一个JSON文件。
+同一份文档重复上传时直接返回上次的解析结果；解析规则变化后版本号改变，旧缓存自然失效。
+缓存总大小超过上限时按最近使用时间(文件修改时间)淘汰最久未用的条目。
+"""
+
+import os
+import json
+import hashlib
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def file_digest(path):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_version(paths):
+    """根据解析器源文件内容生成版本号，任何规则改动都会得到新版本"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+class ParseCache:
+    """按文件内容寻址、大小有上限的LRU缓存"""
+
+    def __init__(self, directory, version, max_bytes):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+
+    def key(self, path):
+        """缓存键：解析器版本和文件内容共同决定"""
+        return hashlib.sha256(f'{self.version}:{file_digest(path)}'.encode('ascii')).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """读取缓存，命中时刷新修改时间作为最近使用时间；未命中或文件损坏返回 None"""
+        entry = self.entry_path(key)
+        try:
+            with open(entry, 'rb') as f:
+                value = json.loads(f.read().decode('utf-8'))
+            os.utime(entry)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        """写入缓存（先写临时文件再替换，并行写入同一键也不会读到半个文件），然后按需淘汰"""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = self.entry_path(key)
+        temp = f'{entry}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        os.replace(temp, entry)
+        self.evict()
+
+    def entries(self):
+        """列出缓存条目 (修改时间, 大小, 路径)"""
+        result = []
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if not item.name.endswith('.json'):
+                        continue
+                    try:
+                        stat = item.stat()
+                    except OSError:
+                        # 可能刚被其他进程淘汰
+                        continue
+                    result.append((stat.st_mtime, stat.st_size, item.path))
+        except FileNotFoundError:
+            pass
+        return result
+
+    def evict(self):
+        """总大小超过上限时，从最久未使用的条目开始删除"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def purge(self):
+        """清空缓存，返回删除的条目数"""
+        removed = 0
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
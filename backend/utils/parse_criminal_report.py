@@ -1,146 +1,834 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-犯情动态Word文档解析器
+犯情动态Word文档解析器（支持 .docx 和 Word 97-2003 .doc）
 作为Node.js的工具脚本使用，不是独立服务
-用法: python parse_criminal_report.py <docx文件路径>
-输出: JSON格式的解析结果
+用法:
+    python parse_criminal_report.py <docx文件路径>     单次解析，输出紧凑JSON（加 --pretty 输出缩进格式）
+    python parse_criminal_report.py --worker           常驻模式，从stdin逐行读取请求
+    python parse_criminal_report.py --batch <目录|通配符|@清单文件|-> ... [--jobs N]
+                                                       批量解析，多进程并行，每完成一个文档输出一行JSON
+    python parse_criminal_report.py --purge-cache      清空解析结果缓存
+    以上解析命令都可以加 --no-cache，跳过缓存直接解析；
+    加 --stats 时结果中附带 stats（各阶段耗时、文档规模、各字段命中的模式），批量模式另在stderr输出汇总，
+    统计模式总是重新解析，不读写缓存
+常驻模式协议（每行一个JSON，UTF-8）:
+    请求: {"id": 1, "path": "xxx.docx"}
+    响应: {"id": 1, "success": true, "data": {...}}
+    请求中加 "noCache": true 可跳过缓存，加 "stats": true 附带解析统计
+加 --framed 时（单次和常驻模式）每个结果按帧输出，Node.js 端按字节数一次性解码，不必按行切分字符串:
+    帧头: "<JSON字节数> <解析耗时毫秒>\n"（ASCII）
+    帧体: 恰好为帧头所写字节数的紧凑UTF-8 JSON
+解析结果按文件内容缓存在 PARSER_CACHE_DIR（默认 uploads/parse_cache），
+总大小上限 PARSER_CACHE_SIZE_MB（默认64MB），解析器源码变化后旧缓存自动失效。
 """
 
 import sys
+import os
 import json
 import re
-from docx import Document
-
-def extract_number(text, pattern):
-    """提取数字，支持空格和千位分隔符（逗号）"""
-    match = re.search(pattern, text)
-    if match:
-        # 移除空格、全角空格、逗号
-        num_str = match.group(1).replace(' ', '').replace('\u3000', '').replace(',', '')
-        try:
-            return int(num_str)
-        except:
-            return None
-    return None
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from docx_stream import iter_paragraphs
+from word_doc import is_ole_file, iter_paragraphs as iter_doc_paragraphs
+from parse_cache import ParseCache, source_version
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 参与解析的源文件，内容变化即视为新版本解析器
+PARSER_SOURCES = [
+    os.path.join(SCRIPT_DIR, name)
+    for name in ('parse_criminal_report.py', 'docx_stream.py', 'word_doc.py')
+]
+CACHE_DIR = os.environ.get('PARSER_CACHE_DIR') or os.path.join(SCRIPT_DIR, '..', 'uploads', 'parse_cache')
+CACHE_MAX_BYTES = int(os.environ.get('PARSER_CACHE_SIZE_MB') or 64) * 1024 * 1024
+
+# 字段规则表：(分组, 字段名, 按优先级排列的模式, 取值类型)
+# - 'absent': 文中找不到该短语即为 True（监管安全情况反向判断）
+# - 'int':    取第一个得到非零数字的模式；都没有时取最后一个模式的结果
+# 支持多种格式和千位分隔符，如 "在押罪犯1258人"、"在押罪犯 1,258 人"、"截至X月X日，监狱在押罪犯1258人"
+FIELD_SPECS = [
+    # 1. 监管安全情况
+    ('security', 'hasEscape', ['无罪犯脱逃'], 'absent'),
+    ('security', 'hasMajorCase', ['无在全国全省有重大影响的狱内案件'], 'absent'),
+    ('security', 'hasSafetyAccident', ['无重大安全生产事故'], 'absent'),
+    ('security', 'hasHealthEvent', ['无重大公共卫生安全事件'], 'absent'),
+    ('security', 'hasInternalCase', ['无狱内发案'], 'absent'),
+
+    # 2. 违纪统计
+    ('discipline', 'violationCount', [r'(\d+)\s*名罪犯在担任'], 'int'),
+    ('discipline', 'confinementCount', [r'禁闭\s*([\d,]+)\s*人'], 'int'),
+    ('discipline', 'warningCount', [r'警告\s*([\d,]+)\s*人'], 'int'),
+
+    # 3. 罪犯构成（核心数据）
+    ('prisoners', 'total', [r'在押罪犯\s*([\d,]+)\s*人', r'监狱.*?在押.*?([\d,]+)\s*人'], 'int'),
+    ('prisoners', 'majorCriminal', [r'重大刑事犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'deathSuspended', [r'死缓犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'lifeSentence', [r'无期犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'multipleConvictions', [r'二次以上判刑罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'foreign', [r'外籍犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'hongKongMacaoTaiwan', [r'含港澳台\s*([\d,]+)\s*名', r'港澳台\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'mentalIllness', [r'精神病犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'formerProvincial', [r'原地厅[级以上]*罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'formerCounty', [r'原县团级以上罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'falunGong', [r'"法轮功"[^0-9]*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'drugHistory', [r'有吸毒史罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'drugRelated', [r'涉毒犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'newlyAdmitted', [r'新收押罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'juvenileFemale', [r'未成年女犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'gangRelated', [r'涉黑罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'evilRelated', [r'涉恶罪犯\s*([\d,]+)\s*名'], 'int'),
+    ('prisoners', 'dangerousSecurity', [r'危安罪犯\s*([\d,]+)\s*名'], 'int'),
+]
+
+# 以数字开头的模式（如 "5名罪犯在担任"）会让组合正则失去首字符快速跳过的优化，
+# 这类模式改为用后面的关键词定位，再向前找回数字
+NUMBER_PREFIX = r'(\d+)\s*'
+
+def compile_field_specs(specs):
+    """
+    把字段规则表编译为一个组合正则（用于单次扫描定位）和每个模式各自的正则（用于在命中位置取值）
+    patterns[i][j] = (完整模式, 关键词模式或 None)
+    """
+    patterns = []
+    locators = []
+    for spec in specs:
+        sources = spec[2]
+        if spec[3] == 'absent':
+            sources = [re.escape(src) for src in sources]
+
+        spec_patterns = []
+        for src in sources:
+            if src.startswith(NUMBER_PREFIX):
+                keyword = re.compile(src[len(NUMBER_PREFIX):])
+                spec_patterns.append((re.compile(src), keyword))
+                locators.append(keyword.pattern)
+            else:
+                spec_patterns.append((re.compile(src), None))
+                locators.append(src)
+        patterns.append(spec_patterns)
 
-def parse_criminal_report(docx_path):
-    """解析犯情动态Word文档"""
+    combined = re.compile('|'.join(f'(?:{src})' for src in locators))
+    return {'specs': specs, 'patterns': patterns, 'combined': combined}
+
+def match_at(text, pos, pattern, keyword):
+    """在组合正则命中的位置尝试匹配单个模式"""
+    if keyword is None:
+        return pattern.match(text, pos)
+
+    if not keyword.match(text, pos):
+        return None
+    # 从关键词向前跳过空白和数字，找到数字的起点，再用完整模式确认
+    start = pos
+    while start > 0 and text[start - 1].isspace():
+        start -= 1
+    digits_end = start
+    while start > 0 and text[start - 1].isdecimal():
+        start -= 1
+    if start == digits_end:
+        return None
+    return pattern.match(text, start)
+
+COMPILED_SPECS = compile_field_specs(FIELD_SPECS)
+
+def to_number(num_str):
+    """转换数字，支持空格和千位分隔符（逗号）"""
+    # 移除空格、全角空格、逗号
+    num_str = num_str.replace(' ', '').replace('\u3000', '').replace(',', '')
     try:
-        doc = Document(docx_path)
-        
-        # 提取所有文本
-        full_text = '\n'.join([para.text for para in doc.paragraphs])
-        
-        result = {
+        return int(num_str)
+    except ValueError:
+        return None
+
+def resolve_field(spec, found):
+    """
+    根据各模式的首次命中结果确定字段值
+    found[i]: 未命中为 None，命中为 (值,)
+    返回 (是否已确定, 值)；继续扫描也不会改变已确定的字段
+    """
+    if spec[3] == 'absent':
+        return found[0] is not None, found[0] is None
+
+    value = None
+    for hit in found:
+        if hit is None:
+            # 更优先的模式可能在后文命中，暂不能确定
+            return False, None
+        value = hit[0]
+        if value:
+            return True, value
+    return True, value
+
+# 逐段扫描时保留在缓冲区中的已扫描文本长度，供"数字在关键词之前"的模式向前查找数字
+TEXT_LOOKBACK = 1024
+# 命中位置之后至少读入这么多文本才处理该位置：'"法轮功"[^0-9]*' 这类模式可以跨过多个段落，
+# 在这个范围内结束的匹配与对全文搜索的结果相同
+MATCH_SPAN = 4096
+
+def field_value(spec, found):
+    """字段的最终取值，未命中的模式视为没有结果"""
+    if spec[3] == 'absent':
+        return found[0] is None
+    return resolve_field(spec, [hit or (None,) for hit in found])[1]
+
+def field_hit(spec, found):
+    """字段的最终取值来自哪个模式（序号），与 field_value 的取值规则对应；没有模式提供取值时为 None"""
+    if spec[3] == 'absent':
+        return 0 if found[0] is not None else None
+    for index, hit in enumerate(found):
+        if hit is not None and hit[0]:
+            return index
+    last = found[-1]
+    return len(found) - 1 if last is not None and last[0] is not None else None
+
+class FieldScanner:
+    """
+    增量字段扫描器：逐段输入文本，单次扫描提取所有字段，所有字段确定后即可停止读取文档。
+    结果与对全文（各段以换行连接）的每个模式分别 re.search 相同：组合正则找到的每个位置上，
+    用尚未命中的模式逐个尝试 match，因此每个模式都会在它第一次出现的位置被记录。
+    逐段输入时，命中位置要等到其后已读入 MATCH_SPAN 个字符（或全文结束）才处理，
+    跨越若干段落的匹配（如关键词和数字之间隔着空段落或其他段落）也与全文搜索一致；
+    只有从命中位置起超过 MATCH_SPAN 个字符的匹配才可能与全文搜索不同。
+    """
+
+    def __init__(self, compiled=COMPILED_SPECS):
+        self.specs = compiled['specs']
+        self.patterns = compiled['patterns']
+        self.combined = compiled['combined']
+
+        self.found = [[None] * len(spec_patterns) for spec_patterns in self.patterns]
+        self.pending = set(range(len(self.specs)))
+
+        self.buffer = ''
+        self.pos = 0
+        self.has_text = False
+
+    @property
+    def done(self):
+        """是否所有字段都已确定"""
+        return not self.pending
+
+    @property
+    def complete(self):
+        """是否所有字段都已确定且都有值（有值的字段不会再被表格中的数据替换）"""
+        return self.done and all(
+            field_value(spec, spec_found) is not None
+            for spec, spec_found in zip(self.specs, self.found)
+        )
+
+    def feed(self, paragraph):
+        """输入一个段落，返回是否所有字段都已确定"""
+        if self.has_text:
+            self.buffer += '\n'
+        self.has_text = True
+
+        self.buffer += paragraph
+        # 其后已有 MATCH_SPAN 个字符的命中位置可以处理
+        limit = len(self.buffer) - MATCH_SPAN
+        if limit > self.pos:
+            self.scan(limit)
+        return self.done
+
+    def finish(self):
+        """处理剩余文本并返回字段结果"""
+        self.scan(len(self.buffer) + 1)
+
+        data = {}
+        for spec, spec_found in zip(self.specs, self.found):
+            data.setdefault(spec[0], {})[spec[1]] = field_value(spec, spec_found)
+        return data
+
+    def matched_patterns(self):
+        """各字段命中的模式原文，结构与 finish() 的结果相同，没有模式提供取值时为 None"""
+        result = {}
+        for spec, spec_found in zip(self.specs, self.found):
+            index = field_hit(spec, spec_found)
+            result.setdefault(spec[0], {})[spec[1]] = None if index is None else spec[2][index]
+        return result
+
+    def scan(self, limit):
+        """处理缓冲区中起点在 limit 之前的命中位置"""
+        text = self.buffer
+        pos = self.pos
+        while self.pending:
+            match = self.combined.search(text, pos)
+            if not match or match.start() >= limit:
+                pos = max(pos, min(limit, len(text)))
+                break
+            start = match.start()
+
+            for spec_index in list(self.pending):
+                spec = self.specs[spec_index]
+                spec_found = self.found[spec_index]
+                for pattern_index, (pattern, keyword) in enumerate(self.patterns[spec_index]):
+                    if spec_found[pattern_index] is not None:
+                        continue
+                    hit = match_at(text, start, pattern, keyword)
+                    if hit:
+                        value = to_number(hit.group(1)) if spec[3] == 'int' else True
+                        spec_found[pattern_index] = (value,)
+                if resolve_field(spec, spec_found)[0]:
+                    self.pending.discard(spec_index)
+
+            # 下一个位置继续扫描，不跳过本次匹配覆盖的文本，保证重叠的模式也能命中
+            pos = start + 1
+
+        # 丢弃已扫描的文本，只保留少量供向前查找
+        cut = max(0, pos - TEXT_LOOKBACK)
+        if cut:
+            self.buffer = text[cut:]
+            pos -= cut
+        self.pos = pos
+
+def extract_fields(text, compiled=COMPILED_SPECS):
+    """单次扫描全文提取所有字段"""
+    scanner = FieldScanner(compiled)
+    scanner.feed(text)
+    return scanner.finish()
+
+# 表格中各字段的标签，比较前去掉空白、引号、冒号和"（人）"之类的单位
+TABLE_LABELS = {
+    'violationCount': ['违规人数', '违纪人数', '违规罪犯'],
+    'confinementCount': ['禁闭', '禁闭人数'],
+    'warningCount': ['警告', '警告人数'],
+    'total': ['在押罪犯', '在押罪犯总数', '押犯总数', '在押人数'],
+    'majorCriminal': ['重大刑事犯'],
+    'deathSuspended': ['死缓犯'],
+    'lifeSentence': ['无期犯'],
+    'multipleConvictions': ['二次以上判刑罪犯', '二次以上判刑'],
+    'foreign': ['外籍犯'],
+    'hongKongMacaoTaiwan': ['港澳台', '含港澳台', '港澳台罪犯'],
+    'mentalIllness': ['精神病犯'],
+    'formerProvincial': ['原地厅以上罪犯', '原地厅级以上罪犯', '原地厅级罪犯'],
+    'formerCounty': ['原县团级以上罪犯'],
+    'falunGong': ['法轮功', '法轮功罪犯'],
+    'drugHistory': ['有吸毒史罪犯'],
+    'drugRelated': ['涉毒犯'],
+    'newlyAdmitted': ['新收押罪犯', '新收押'],
+    'juvenileFemale': ['未成年女犯'],
+    'gangRelated': ['涉黑罪犯'],
+    'evilRelated': ['涉恶罪犯'],
+    'dangerousSecurity': ['危安罪犯'],
+}
+
+def normalize_label(text):
+    """单元格标签归一化"""
+    text = re.sub(r'[\s"“”：:]', '', text)
+    return re.sub(r'[（(][人名][）)]$', '', text)
+
+TABLE_LABEL_INDEX = {
+    normalize_label(label): key for key, labels in TABLE_LABELS.items() for label in labels
+}
+CELL_NUMBER = re.compile(r'^\s*([\d,]+)\s*[人名]?\s*$')
+CELL_PAIR = re.compile(r'([\u4e00-\u9fa5"“”]+)\s*[：:]\s*([\d,]+)\s*[人名]')
+
+class TableFieldCollector:
+    """
+    收集表格单元格文本，提取按表格排列的统计数：
+    - 单元格内 "名称：N人"
+    - 左侧单元格是标签，右侧相邻单元格是数字
+    - 上方单元格是标签，下方同列单元格是数字
+    同一字段取文档中最先出现的值
+    """
+
+    def __init__(self):
+        self.cells = {}
+        # 字段名 -> 取到值时所用的标签原文
+        self.labels = {}
+
+    def feed(self, text, location):
+        """输入一个单元格段落，location 为 (表格序号, 行号, 列号)"""
+        if location in self.cells:
+            self.cells[location] += '\n' + text
+        else:
+            self.cells[location] = text
+
+    def finish(self):
+        """返回 {字段名: 值}"""
+        rows = {}
+        for (table, row, col), text in self.cells.items():
+            rows.setdefault((table, row), []).append((col, text))
+
+        values = {}
+        for (table, row, col), text in self.cells.items():
+            pairs = CELL_PAIR.findall(text)
+            for label, num in pairs:
+                self.put(values, label, num)
+            if pairs or CELL_NUMBER.match(text):
+                continue
+
+            candidates = [cell_text for cell_col, cell_text in rows[(table, row)] if cell_col > col][:1]
+            if (table, row + 1, col) in self.cells:
+                candidates.append(self.cells[(table, row + 1, col)])
+            for candidate in candidates:
+                number = CELL_NUMBER.match(candidate)
+                if number and self.put(values, text, number.group(1)):
+                    break
+        return values
+
+    def put(self, values, label, num):
+        """记录标签对应字段的值，返回是否记录成功"""
+        key = TABLE_LABEL_INDEX.get(normalize_label(label))
+        if not key or key in values:
+            return False
+        value = to_number(num)
+        if value is None:
+            return False
+        values[key] = value
+        self.labels[key] = label
+        return True
+
+def merge_sources(paragraph_data, table_data, table_cells, specs=FIELD_SPECS):
+    """
+    合并正文和表格的结果，正文优先，表格补充正文中缺失的字段
+    返回 (data, sources)，sources 与 data 结构相同，值为 'paragraph' / 'table' / None：
+    统计数表示取值来源，监管安全情况表示"无……"的表述出现在哪里
+    """
+    data = {}
+    sources = {}
+    for section, key, _, kind in specs:
+        if kind == 'absent':
+            if not paragraph_data[section][key]:
+                value, source = False, 'paragraph'
+            elif not table_data[section][key]:
+                value, source = False, 'table'
+            else:
+                value, source = True, None
+        else:
+            value, source = paragraph_data[section][key], 'paragraph'
+            if value is None:
+                value, source = table_data[section][key], 'table'
+            if value is None:
+                value = table_cells.get(key)
+            if value is None:
+                source = None
+        data.setdefault(section, {})[key] = value
+        sources.setdefault(section, {})[key] = source
+    return data, sources
+
+def iter_document(path, stats=None):
+    """
+    按文件内容选择读取方式：OLE2复合文档按 .doc 读取，其余按 .docx 读取（不看扩展名）
+    传入 stats 字典时记录文档格式，.docx 还记录解压和XML解析耗时
+    """
+    if is_ole_file(path):
+        if stats is not None:
+            stats['format'] = 'doc'
+        return iter_doc_paragraphs(path)
+    if stats is not None:
+        stats['format'] = 'docx'
+    return iter_paragraphs(path, stats)
+
+def measure_reading(items, stats):
+    """包装文档读取迭代器：累计读取耗时 read（秒），统计段落、表格和字符数"""
+    timer = time.perf_counter
+    stats.update(read=0.0, paragraphs=0, tableParagraphs=0, tables=0, characters=0)
+    iterator = iter(items)
+    try:
+        while True:
+            tick = timer()
+            try:
+                item = next(iterator)
+            finally:
+                stats['read'] += timer() - tick
+
+            source, text, location = item
+            stats['characters'] += len(text)
+            if source == 'paragraph':
+                stats['paragraphs'] += 1
+            else:
+                stats['tableParagraphs'] += 1
+                stats['tables'] = max(stats['tables'], location[0] + 1)
+            yield item
+    except StopIteration:
+        return
+    finally:
+        iterator.close()
+
+def to_ms(seconds):
+    return round(seconds * 1000, 2)
+
+def build_stats(docx_path, reader, times, scanners, table_cells, sources, specs=FIELD_SPECS):
+    """
+    汇总一次解析的统计信息：
+    - timings: 各阶段耗时（毫秒）。read 为读取文档的总耗时，其中 .docx 细分为 inflate（解压）、
+      xml（XML解析）和 walk（遍历XML拼接段落文本）；extract 为逐段正则扫描和表格收集；finish 为收尾扫描与合并
+    - document: 文档规模，stoppedEarly 表示正文字段已齐全、没有读完文档
+    - fields: 各字段的取值来源和命中的模式（表格单元格取值时为 "cell:标签"），都没命中为 None
+    """
+    started, walked, finished = times
+    scanner, table_scanner = scanners
+    timings = {
+        'total': to_ms(finished - started),
+        'read': to_ms(reader['read']),
+    }
+    if 'inflate' in reader:
+        timings['inflate'] = to_ms(reader['inflate'])
+        timings['xml'] = to_ms(reader['xml'])
+        timings['walk'] = to_ms(reader['read'] - reader['inflate'] - reader['xml'])
+    timings['extract'] = to_ms(walked - started - reader['read'])
+    timings['finish'] = to_ms(finished - walked)
+
+    document = {
+        'fileBytes': os.path.getsize(docx_path),
+        'paragraphs': reader['paragraphs'],
+        'tableParagraphs': reader['tableParagraphs'],
+        'tables': reader['tables'],
+        'characters': reader['characters'],
+        'stoppedEarly': scanner.complete,
+    }
+    if 'xmlBytes' in reader:
+        document['xmlBytes'] = reader['xmlBytes']
+
+    paragraph_patterns = scanner.matched_patterns()
+    table_patterns = table_scanner.matched_patterns()
+    fields = {}
+    for section, key, _, _ in specs:
+        source = sources[section][key]
+        pattern = None
+        if source == 'paragraph':
+            pattern = paragraph_patterns[section][key]
+        elif source == 'table':
+            pattern = table_patterns[section][key]
+            if pattern is None and key in table_cells.labels:
+                pattern = 'cell:' + table_cells.labels[key]
+        fields.setdefault(section, {})[key] = {'source': source, 'pattern': pattern}
+
+    return {
+        'format': reader['format'],
+        'timings': timings,
+        'document': document,
+        'fields': fields,
+    }
+
+def parse_criminal_report(docx_path, stats=None):
+    """
+    解析犯情动态Word文档
+    传入 stats 字典时填入解析统计（各阶段耗时、文档规模、各字段命中的模式，见 build_stats）
+    """
+    try:
+        started = time.perf_counter()
+        scanner = FieldScanner()
+        table_scanner = FieldScanner()
+        table_cells = TableFieldCollector()
+
+        # 单次流式读取正文和表格；正文中所有字段都有值后不再读取文档剩余部分
+        reader = {} if stats is not None else None
+        paragraphs = iter_document(docx_path, reader)
+        if stats is not None:
+            paragraphs = measure_reading(paragraphs, reader)
+        try:
+            for source, text, location in paragraphs:
+                if source == 'paragraph':
+                    scanner.feed(text)
+                    if scanner.complete:
+                        break
+                else:
+                    table_scanner.feed(text)
+                    table_cells.feed(text, location)
+        finally:
+            paragraphs.close()
+
+        walked = time.perf_counter()
+        data, sources = merge_sources(scanner.finish(), table_scanner.finish(), table_cells.finish())
+        if stats is not None:
+            stats.update(build_stats(docx_path, reader, (started, walked, time.perf_counter()),
+                                     (scanner, table_scanner), table_cells, sources))
+        return {
             'success': True,
-            'data': {
-                # 监管安全
-                'security': {
-                    'hasEscape': False,
-                    'hasMajorCase': False,
-                    'hasSafetyAccident': False,
-                    'hasHealthEvent': False,
-                    'hasInternalCase': False,
-                },
-                
-                # 违纪统计
-                'discipline': {
-                    'violationCount': None,
-                    'confinementCount': None,
-                    'warningCount': None,
-                },
-                
-                # 罪犯构成（核心数据）
-                'prisoners': {
-                    'total': None,
-                    'majorCriminal': None,
-                    'deathSuspended': None,
-                    'lifeSentence': None,
-                    'multipleConvictions': None,
-                    'foreign': None,
-                    'hongKongMacaoTaiwan': None,
-                    'mentalIllness': None,
-                    'formerProvincial': None,
-                    'formerCounty': None,
-                    'falunGong': None,
-                    'drugHistory': None,
-                    'drugRelated': None,
-                    'newlyAdmitted': None,
-                    'juvenileFemale': None,
-                    'gangRelated': None,
-                    'evilRelated': None,
-                    'dangerousSecurity': None,
-                }
-            }
+            'data': data,
+            'sources': sources
         }
         
-        data = result['data']
-        
-        # 1. 监管安全情况（反向判断）
-        data['security']['hasEscape'] = '无罪犯脱逃' not in full_text
-        data['security']['hasMajorCase'] = '无在全国全省有重大影响的狱内案件' not in full_text
-        data['security']['hasSafetyAccident'] = '无重大安全生产事故' not in full_text
-        data['security']['hasHealthEvent'] = '无重大公共卫生安全事件' not in full_text
-        data['security']['hasInternalCase'] = '无狱内发案' not in full_text
-        
-        # 2. 违纪统计
-        data['discipline']['violationCount'] = extract_number(full_text, r'(\d+)\s*名罪犯在担任')
-        data['discipline']['confinementCount'] = extract_number(full_text, r'禁闭\s*([\d,]+)\s*人')
-        data['discipline']['warningCount'] = extract_number(full_text, r'警告\s*([\d,]+)\s*人')
-        
-        # 3. 罪犯构成（核心数据）
-        # 支持多种格式和千位分隔符：
-        # - "在押罪犯1258人" 
-        # - "在押罪犯 1258 人"
-        # - "在押罪犯 1,258 人"
-        # - "监狱在押罪犯1258人"
-        # - "截至X月X日，监狱在押罪犯1258人"
-        p = data['prisoners']
-        p['total'] = extract_number(full_text, r'在押罪犯\s*([\d,]+)\s*人')
-        if not p['total']:
-            # 尝试其他格式
-            p['total'] = extract_number(full_text, r'监狱.*?在押.*?([\d,]+)\s*人')
-        
-        p['majorCriminal'] = extract_number(full_text, r'重大刑事犯\s*([\d,]+)\s*名')
-        p['deathSuspended'] = extract_number(full_text, r'死缓犯\s*([\d,]+)\s*名')
-        p['lifeSentence'] = extract_number(full_text, r'无期犯\s*([\d,]+)\s*名')
-        p['multipleConvictions'] = extract_number(full_text, r'二次以上判刑罪犯\s*([\d,]+)\s*名')
-        p['foreign'] = extract_number(full_text, r'外籍犯\s*([\d,]+)\s*名')
-        p['hongKongMacaoTaiwan'] = extract_number(full_text, r'含港澳台\s*([\d,]+)\s*名')
-        if not p['hongKongMacaoTaiwan']:
-            p['hongKongMacaoTaiwan'] = extract_number(full_text, r'港澳台\s*([\d,]+)\s*名')
-        
-        p['mentalIllness'] = extract_number(full_text, r'精神病犯\s*([\d,]+)\s*名')
-        p['formerProvincial'] = extract_number(full_text, r'原地厅[级以上]*罪犯\s*([\d,]+)\s*名')
-        p['formerCounty'] = extract_number(full_text, r'原县团级以上罪犯\s*([\d,]+)\s*名')
-        p['falunGong'] = extract_number(full_text, r'"法轮功"[^0-9]*([\d,]+)\s*名')
-        p['drugHistory'] = extract_number(full_text, r'有吸毒史罪犯\s*([\d,]+)\s*名')
-        p['drugRelated'] = extract_number(full_text, r'涉毒犯\s*([\d,]+)\s*名')
-        p['newlyAdmitted'] = extract_number(full_text, r'新收押罪犯\s*([\d,]+)\s*名')
-        p['juvenileFemale'] = extract_number(full_text, r'未成年女犯\s*([\d,]+)\s*名')
-        p['gangRelated'] = extract_number(full_text, r'涉黑罪犯\s*([\d,]+)\s*名')
-        p['evilRelated'] = extract_number(full_text, r'涉恶罪犯\s*([\d,]+)\s*名')
-        p['dangerousSecurity'] = extract_number(full_text, r'危安罪犯\s*([\d,]+)\s*名')
-        
-        return result
-        
     except Exception as e:
         return {
             'success': False,
             'error': str(e)
         }
 
+def open_cache():
+    """打开解析结果缓存，版本号取自当前解析器源码"""
+    return ParseCache(CACHE_DIR, source_version(PARSER_SOURCES), CACHE_MAX_BYTES)
+
+def parse_with_cache(docx_path, cache=None, with_stats=False):
+    """
+    带缓存的解析：同样内容的文件直接返回上次的结果（附 cached: true）。
+    只缓存解析成功的结果；缓存读写出错不影响解析本身。
+    with_stats 为 True 时重新解析并在结果中附带 stats，不读写缓存。
+    """
+    if with_stats:
+        stats = {}
+        result = parse_criminal_report(docx_path, stats)
+        if result.get('success'):
+            result['stats'] = stats
+        return result
+
+    if cache is None:
+        return parse_criminal_report(docx_path)
+
+    try:
+        key = cache.key(docx_path)
+    except OSError:
+        # 文件读取失败，交给解析器给出错误信息
+        return parse_criminal_report(docx_path)
+
+    cached = cache.get(key)
+    if cached is not None:
+        cached['cached'] = True
+        return cached
+
+    result = parse_criminal_report(docx_path)
+    if result.get('success'):
+        try:
+            cache.put(key, result)
+        except OSError as e:
+            print(f'写入解析缓存失败: {e}', file=sys.stderr)
+    return result
+
+def run_worker(cache=None, framed=False):
+    """常驻模式：逐行读取JSON请求并逐个输出结果，避免每次上传都重新启动解释器"""
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        start = time.perf_counter()
+        try:
+            request = json.loads(line.decode('utf-8'))
+            request_id = request.get('id')
+            docx_path = request.get('path')
+            if not docx_path:
+                result = {'success': False, 'error': '请提供Word文档路径'}
+            else:
+                result = parse_with_cache(docx_path, None if request.get('noCache') else cache,
+                                          bool(request.get('stats')))
+        except Exception as e:
+            result = {'success': False, 'error': f'无效的请求: {e}'}
+
+        response = {'id': request_id}
+        response.update(result)
+        if framed:
+            write_frame(stdout, response, time.perf_counter() - start)
+        else:
+            write_json_line(stdout, response)
+
+def compact_json(obj):
+    """紧凑的UTF-8 JSON字节串"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def write_json_line(stream, obj):
+    """以UTF-8写出一行紧凑JSON并立即刷新"""
+    stream.write(compact_json(obj) + b'\n')
+    stream.flush()
+
+def write_frame(stream, obj, elapsed):
+    """按帧写出结果：帧头为 "<字节数> <耗时毫秒>\n"，随后是该字节数的紧凑JSON"""
+    payload = compact_json(obj)
+    stream.write(f'{len(payload)} {elapsed * 1000:.1f}\n'.encode('ascii') + payload)
+    stream.flush()
+
+def collect_batch_paths(sources):
+    """
+    展开批量解析的输入：
+    - 目录：递归查找其中的 .docx 和 .doc 文件
+    - 通配符：如 backfill/**/*.docx
+    - @清单文件：每行一个路径，# 开头为注释
+    - -：从stdin读取清单
+    """
+    paths = []
+    for source in sources:
+        if source == '-' or source.startswith('@'):
+            if source == '-':
+                lines = sys.stdin.buffer.read().decode('utf-8').splitlines()
+            else:
+                with open(source[1:], encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            paths.extend(line.strip() for line in lines
+                         if line.strip() and not line.strip().startswith('#'))
+        elif os.path.isdir(source):
+            paths.extend(sorted(
+                glob.glob(os.path.join(source, '**', '*.docx'), recursive=True)
+                + glob.glob(os.path.join(source, '**', '*.doc'), recursive=True)
+            ))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source, recursive=True)))
+        else:
+            paths.append(source)
+
+    # 跳过Word打开文档时产生的 ~$ 临时文件，并去重保持顺序
+    seen = set()
+    result = []
+    for path in paths:
+        if os.path.basename(path).startswith('~$') or path in seen:
+            continue
+        seen.add(path)
+        result.append(path)
+    return result
+
+class StatsSummary:
+    """汇总批量解析的统计：各阶段耗时、文档格式、各字段命中模式的分布和最慢的文档"""
+
+    SLOWEST = 10
+
+    def __init__(self):
+        self.documents = 0
+        self.formats = {}
+        self.timings = {}
+        self.fields = {}
+        self.slowest = []
+
+    def add(self, path, stats):
+        self.documents += 1
+        self.formats[stats['format']] = self.formats.get(stats['format'], 0) + 1
+
+        for phase, ms in stats['timings'].items():
+            total, maximum = self.timings.get(phase, (0.0, 0.0))
+            self.timings[phase] = (total + ms, max(maximum, ms))
+
+        for section, section_fields in stats['fields'].items():
+            for key, hit in section_fields.items():
+                counts = self.fields.setdefault(f'{section}.{key}', {})
+                pattern = hit['pattern'] or 'none'
+                counts[pattern] = counts.get(pattern, 0) + 1
+
+        self.slowest.append((stats['timings']['total'], path))
+        self.slowest = sorted(self.slowest, reverse=True)[:self.SLOWEST]
+
+    def result(self):
+        return {
+            'documents': self.documents,
+            'formats': self.formats,
+            'timings': {
+                phase: {'total': round(total, 2), 'avg': round(total / self.documents, 2), 'max': maximum}
+                for phase, (total, maximum) in self.timings.items()
+            },
+            'fields': self.fields,
+            'slowest': [{'path': path, 'total': ms} for ms, path in self.slowest],
+        }
+
+# 同一文档所在的进程池崩溃达到此次数后，改为单独一个进程解析该文档，以确定是哪个文档导致崩溃
+ISOLATE_AFTER_CRASHES = 2
+
+def run_pool(paths, jobs, cache, with_stats):
+    """
+    用一个进程池解析一组文档，逐个产出 (路径, 结果)；
+    进程池崩溃（某个子进程异常退出）时，尚未完成的文档产出 (路径, None)
+    """
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as executor:
+        futures = {executor.submit(parse_with_cache, path, cache, with_stats): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result()
+            except BrokenProcessPool:
+                yield path, None
+            except Exception as e:
+                yield path, {'success': False, 'error': str(e)}
+
+def run_batch(sources, jobs=None, cache=None, with_stats=False):
+    """
+    批量解析：用进程池并行解析，每完成一个文档立即输出一行JSON
+    子进程崩溃会使整个进程池失效，此时新建进程池重新提交未完成的文档；
+    多次随进程池崩溃的文档单独解析，仍然崩溃时只记该文档失败
+    """
+    paths = collect_batch_paths(sources)
+    stdout = sys.stdout.buffer
+    # Windows 下进程池最多支持 61 个进程
+    jobs = max(1, min(jobs or os.cpu_count() or 1, 61, len(paths) or 1))
+
+    start = time.perf_counter()
+    failed = 0
+    restarts = 0
+    summary = StatsSummary() if with_stats else None
+    crashes = dict.fromkeys(paths, 0)
+    pending = list(paths)
+    while pending:
+        shared = [path for path in pending if crashes[path] < ISOLATE_AFTER_CRASHES]
+        pools = [(shared, jobs)] if shared else []
+        pools += [([path], 1) for path in pending if crashes[path] >= ISOLATE_AFTER_CRASHES]
+
+        pending = []
+        for pool_paths, pool_jobs in pools:
+            for path, result in run_pool(pool_paths, pool_jobs, cache, with_stats):
+                if result is None:
+                    crashes[path] += 1
+                    if len(pool_paths) > 1:
+                        pending.append(path)
+                        continue
+                    result = {'success': False, 'error': '解析进程异常退出'}
+                if not result.get('success'):
+                    failed += 1
+                elif summary is not None:
+                    summary.add(path, result['stats'])
+
+                line = {'path': path}
+                line.update(result)
+                write_json_line(stdout, line)
+        if pending:
+            restarts += 1
+            print(f'解析进程异常退出，重新提交未完成的 {len(pending)} 个文档', file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f'批量解析完成: 共 {len(paths)} 个文档，失败 {failed} 个，'
+          f'耗时 {elapsed:.2f} 秒，并行进程 {jobs} 个'
+          + (f'，进程池重建 {restarts} 次' if restarts else ''), file=sys.stderr)
+    if summary is not None:
+        print('解析统计汇总:', file=sys.stderr)
+        print(json.dumps(summary.result(), ensure_ascii=False, indent=2), file=sys.stderr)
+
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
+    argv = sys.argv[1:]
+    use_cache = '--no-cache' not in argv
+    framed = '--framed' in argv
+    pretty = '--pretty' in argv
+    with_stats = '--stats' in argv
+    argv = [arg for arg in argv if arg not in ('--no-cache', '--framed', '--pretty', '--stats')]
+
+    if argv == ['--purge-cache']:
+        removed = open_cache().purge()
+        print(f'已清空解析缓存: {removed} 个条目', file=sys.stderr)
+        sys.exit(0)
+
+    cache = open_cache() if use_cache else None
+
+    if len(argv) >= 1 and argv[0] == '--worker':
+        run_worker(cache, framed)
+        sys.exit(0)
+
+    if len(argv) >= 1 and argv[0] == '--batch':
+        args = argv[1:]
+        jobs = None
+        if '--jobs' in args:
+            index = args.index('--jobs')
+            jobs = int(args[index + 1])
+            del args[index:index + 2]
+        if not args:
+            print('用法: python parse_criminal_report.py --batch <目录|通配符|@清单文件|-> ... [--jobs N] [--no-cache] [--stats]',
+                  file=sys.stderr)
+            sys.exit(1)
+        run_batch(args, jobs, cache, with_stats)
+        sys.exit(0)
+
+    if len(argv) < 1:
         print(json.dumps({
             'success': False,
             'error': '请提供Word文档路径'
         }, ensure_ascii=False))
         sys.exit(1)
     
-    docx_path = sys.argv[1]
-    result = parse_criminal_report(docx_path)
+    docx_path = argv[0]
+    start = time.perf_counter()
+    result = parse_with_cache(docx_path, cache, with_stats)
     
-    # 输出JSON到stdout，Node.js会读取
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    # 输出JSON到stdout，Node.js会读取；--pretty 为便于人工查看的缩进格式
+    if framed:
+        write_frame(sys.stdout.buffer, result, time.perf_counter() - start)
+    elif pretty:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        write_json_line(sys.stdout.buffer, result)
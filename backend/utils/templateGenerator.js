@@ -6,6 +6,7 @@ const fs = require('fs')
 const path = require('path')
 const PizZip = require('pizzip')
 const Docxtemplater = require('docxtemplater')
+const { renderTemplate } = require('./templateRenderService')
 
 // 模板文件路径
 const TEMPLATE_DIR = path.join(__dirname, '../muban')
@@ -13,6 +14,25 @@ const LOG_TEMPLATE = path.join(TEMPLATE_DIR, 'template_fresh.docx')
 const REPORT_TEMPLATE = path.join(TEMPLATE_DIR, '派驻检察室月度工作情况报告.docx')
 const CHECKLIST_TEMPLATE = path.join(TEMPLATE_DIR, '派驻检察工作报告事项清单_with_placeholders.docx')
 
+// 模板内容缓存：模板路径 -> { mtimeMs, size, content }
+const templateCache = new Map()
+
+/**
+ * 读取模板内容，缓存在内存中；模板文件的修改时间或大小变化后重新读取
+ * @param {string} templatePath - 模板路径
+ * @returns {string} - 模板内容（binary 字符串，供 PizZip 使用）
+ */
+function readTemplate(templatePath) {
+    const stat = fs.statSync(templatePath)
+    const cached = templateCache.get(templatePath)
+    if (cached && cached.mtimeMs === stat.mtimeMs && cached.size === stat.size) {
+        return cached.content
+    }
+    const content = fs.readFileSync(templatePath, 'binary')
+    templateCache.set(templatePath, { mtimeMs: stat.mtimeMs, size: stat.size, content })
+    return content
+}
+
 /**
  * 使用模板生成日志文档
  * @param {Object} log - 日志数据
@@ -23,7 +43,7 @@ async function generateLogFromTemplate(log, weeklyRecords = [], monthlyRecords =
         console.log('📝 开始生成Word文档...')
         console.log('日志数据:', JSON.stringify(log, null, 2))
         
-        const templateContent = fs.readFileSync(LOG_TEMPLATE, 'binary')
+        const templateContent = readTemplate(LOG_TEMPLATE)
         const zip = new PizZip(templateContent)
         const doc = new Docxtemplater(zip, {
             paragraphLoop: true,
@@ -153,22 +173,18 @@ async function generateReportFromTemplate(data) {
     try {
         const { archive, dailyLogs, weeklyRecords, monthlyRecords, immediateEvents, attachments, basicInfo } = data
 
-        // 读取模板
-        const templateContent = fs.readFileSync(REPORT_TEMPLATE, 'binary')
-        const zip = new PizZip(templateContent)
-
-        // 计算统计数据
-        const stats = calculateStats(dailyLogs, weeklyRecords, monthlyRecords)
-
-        // 获取犯情动态数据（作为备用数据源）
-        const { CriminalReport } = require('../models')
-        const reportMonth = `${archive.year}-${String(archive.month).padStart(2, '0')}`
-        const criminalData = await CriminalReport.findOne({
-            where: {
-                prison_name: archive.prison_name,
-                report_month: reportMonth
-            }
-        })
+        // 获取犯情动态数据（作为备用数据源），月度快照已读取时直接使用
+        let criminalData = data.criminalData
+        if (criminalData === undefined) {
+            const { CriminalReport } = require('../models')
+            const reportMonth = `${archive.year}-${String(archive.month).padStart(2, '0')}`
+            criminalData = await CriminalReport.findOne({
+                where: {
+                    prison_name: archive.prison_name,
+                    report_month: reportMonth
+                }
+            })
+        }
 
         // 数据优先级：basicInfo（手动编辑） > criminalData（犯情动态） > 0（默认值）
         const getFieldValue = (basicInfoField, criminalDataField, defaultValue = 0) => {
@@ -267,14 +283,35 @@ async function generateReportFromTemplate(data) {
             59: new Date().getDate()
         }
 
-        // 读取 document.xml
+        const textValues = {}
+        for (const key of Object.keys(values)) {
+            textValues[key] = String(values[key] || '')
+        }
+
+        // 优先使用常驻的模板渲染服务（模板已在内存中解析好，只重写 document.xml）
+        try {
+            const { buffer, unfilled, ms } = await renderTemplate(path.basename(REPORT_TEMPLATE), textValues)
+            if (unfilled.length > 0) {
+                console.warn('⚠️ 月度报告有未填充的占位符:', unfilled.join(', '))
+            }
+            console.log(`✅ 月度报告由模板渲染服务生成，耗时 ${ms}ms`)
+            return buffer
+        } catch (err) {
+            if (err.invalid) {
+                // 清单中的类型是按占位符前后文字推断的，取值不符时只记录，报告照常用内置替换生成
+                console.warn('⚠️ 月度报告取值与占位符清单不符，改用内置替换:', err.invalid.join('；'))
+            } else {
+                console.warn('⚠️ 模板渲染服务不可用，改用内置替换:', err.message)
+            }
+        }
+
+        // 读取模板和 document.xml
+        const zip = new PizZip(readTemplate(REPORT_TEMPLATE))
         let documentXml = zip.files['word/document.xml'].asText()
 
         // 替换所有{数字}占位符
-        for (let i = 1; i <= 59; i++) {
-            const placeholder = `{${i}}`
-            const value = String(values[i] || '')
-            documentXml = documentXml.split(placeholder).join(value)
+        for (const key of Object.keys(textValues)) {
+            documentXml = documentXml.split(`{${key}}`).join(textValues[key])
         }
 
         // 更新zip
@@ -304,7 +341,7 @@ async function generateChecklistFromTemplate(data) {
             throw new Error(`模板文件不存在: ${CHECKLIST_TEMPLATE}`)
         }
         
-        const templateContent = fs.readFileSync(CHECKLIST_TEMPLATE, 'binary')
+        const templateContent = readTemplate(CHECKLIST_TEMPLATE)
         const zip = new PizZip(templateContent)
         const doc = new Docxtemplater(zip, {
             paragraphLoop: true,
@@ -312,16 +349,19 @@ async function generateChecklistFromTemplate(data) {
             nullGetter: () => '' // 空值返回空字符串
         })
         
-        // 🔥 从数据库读取清单数据
-        const { ReportChecklistItem } = require('../models')
-        const dbChecklistItems = await ReportChecklistItem.findAll({
-            where: {
-                prison_name: archive.prison_name,
-                year: archive.year,
-                month: archive.month
-            },
-            order: [['item_id', 'ASC']]
-        })
+        // 🔥 从数据库读取清单数据（月度快照已读取时直接使用）
+        let dbChecklistItems = data.checklistItems
+        if (!dbChecklistItems) {
+            const { ReportChecklistItem } = require('../models')
+            dbChecklistItems = await ReportChecklistItem.findAll({
+                where: {
+                    prison_name: archive.prison_name,
+                    year: archive.year,
+                    month: archive.month
+                },
+                order: [['item_id', 'ASC']]
+            })
+        }
         
         console.log(`从数据库查询到 ${dbChecklistItems.length} 条清单数据`)
         
@@ -376,69 +416,6 @@ async function generateChecklistFromTemplate(data) {
     }
 }
 
-/**
- * 计算统计数据
- */
-function calculateStats(dailyLogs, weeklyRecords, monthlyRecords) {
-    const stats = {
-        threeSceneChecks: 0,
-        monitorChecks: 0,
-        keyLocationChecks: 0,
-        totalTalks: 0,
-        newAdmissionTalks: 0,
-        evilTalks: 0,
-        injuryTalks: 0,
-        confinementTalks: 0,
-        mailboxOpens: 0,
-        lettersReceived: 0,
-        visitChecks: 0
-    }
-
-    // 从日检察统计
-    for (const log of dailyLogs) {
-        if (log.three_scenes) {
-            const scenes = log.three_scenes
-            if (scenes.labor?.checked) stats.threeSceneChecks++
-            if (scenes.living?.checked) stats.threeSceneChecks++
-            if (scenes.study?.checked) stats.threeSceneChecks++
-        }
-        if (log.monitor_check?.checked) {
-            stats.monitorChecks += log.monitor_check.count || 1
-        }
-    }
-
-    // 从周检察统计
-    for (const record of weeklyRecords) {
-        if (record.hospital_check) {
-            if (record.hospital_check.hospitalChecked) stats.keyLocationChecks++
-            if (record.hospital_check.confinementChecked) stats.keyLocationChecks++
-        }
-        if (record.talk_records && Array.isArray(record.talk_records)) {
-            stats.totalTalks += record.talk_records.length
-            // 按类型统计谈话
-            for (const talk of record.talk_records) {
-                if (talk.type === 'newPrisoner') stats.newAdmissionTalks++
-                else if (talk.type === 'evil') stats.evilTalks++
-                else if (talk.type === 'injury') stats.injuryTalks++
-                else if (talk.type === 'confinement') stats.confinementTalks++
-            }
-        }
-        if (record.mailbox) {
-            stats.mailboxOpens += record.mailbox.openCount || 0
-            stats.lettersReceived += record.mailbox.receivedCount || 0
-        }
-    }
-
-    // 从月检察统计
-    for (const record of monthlyRecords) {
-        if (record.visit_check?.checked) {
-            stats.visitChecks += record.visit_check.visitCount || 1
-        }
-    }
-
-    return stats
-}
-
 /**
  * 使用前端传来的清单数据生成事项清单
  * @param {Object} data - 包含 archive 和 checklistData
@@ -456,7 +433,7 @@ async function generateChecklistFromFrontendData(data) {
             throw new Error(`模板文件不存在: ${CHECKLIST_TEMPLATE}`)
         }
         
-        const templateContent = fs.readFileSync(CHECKLIST_TEMPLATE, 'binary')
+        const templateContent = readTemplate(CHECKLIST_TEMPLATE)
         const zip = new PizZip(templateContent)
         const doc = new Docxtemplater(zip, {
             paragraphLoop: true,
@@ -0,0 +1,141 @@
+/**
+ * 模板渲染服务
+ * 常驻一个 scripts/replace_template.py --serve 进程，muban/ 下的模板在启动时加载一次，
+ * 解析结果和占位符索引常驻内存，模板文件修改后由服务自动重新加载。
+ * 响应为一行JSON头（含 length）加上 length 字节的 .docx 内容
+ */
+const { spawn } = require('child_process')
+const path = require('path')
+const { createFrameDecoder } = require('./frameDecoder')
+
+const PYTHON_CMD = process.env.PYTHON_CMD || 'python'
+const RENDER_SCRIPT = path.join(__dirname, '../scripts/replace_template.py')
+const TEMPLATE_DIR = path.join(__dirname, '../muban')
+const REQUEST_TIMEOUT = parseInt(process.env.RENDER_TIMEOUT) || 30000
+// TEMPLATE_RENDER_SERVICE=off 时不启动服务，调用方使用内置的替换方式
+const ENABLED = process.env.TEMPLATE_RENDER_SERVICE !== 'off'
+
+let service = null
+let nextRequestId = 1
+
+/**
+ * 启动渲染服务进程
+ */
+function startService() {
+    const child = spawn(PYTHON_CMD, [RENDER_SCRIPT, '--serve', TEMPLATE_DIR], {
+        env: { ...process.env, PYTHONIOENCODING: 'utf-8' }
+    })
+
+    const current = { child, pending: new Map(), stderr: '' }
+
+    const decode = createFrameDecoder(JSON.parse, (header, payload) => {
+        const task = current.pending.get(header.id)
+        if (!task) return
+        current.pending.delete(header.id)
+        clearTimeout(task.timer)
+
+        if (header.success) {
+            // 帧体是从数据块中切出的视图，复制一份交给调用方
+            task.resolve({ buffer: Buffer.from(payload), unfilled: header.unfilled || [], ms: header.ms })
+        } else {
+            const err = new Error(header.error || '模板渲染失败')
+            // 取值不符合模板的占位符清单时带上各项错误
+            if (header.invalid) err.invalid = header.invalid
+            task.reject(err)
+        }
+    })
+
+    child.stdout.on('data', (chunk) => {
+        try {
+            decode(chunk)
+        } catch (err) {
+            // 帧头错乱后无法再对齐后续输出，重启服务
+            stopService(current, err)
+        }
+    })
+
+    child.stderr.on('data', (data) => {
+        current.stderr = (current.stderr + data.toString()).slice(-2000)
+    })
+
+    child.stdin.on('error', () => {})
+
+    child.on('error', (err) => {
+        console.error('❌ 模板渲染服务启动失败:', err.message)
+        stopService(current, err)
+    })
+
+    child.on('exit', (code) => {
+        stopService(current, new Error(`模板渲染服务退出 (code=${code}): ${current.stderr}`))
+    })
+
+    service = current
+    return current
+}
+
+/**
+ * 结束服务进程，未完成的请求按失败处理；下次请求时重新启动
+ */
+function stopService(current, err) {
+    if (service === current) service = null
+    for (const task of current.pending.values()) {
+        clearTimeout(task.timer)
+        task.reject(err)
+    }
+    current.pending.clear()
+    current.child.kill()
+}
+
+/**
+ * 渲染模板
+ * @param {string} templateName - muban/ 下的模板文件名
+ * @param {Object|Array} values - 占位符的值，{N} 和第N个 *** 取 values[N]
+ * @returns {Promise<{buffer: Buffer, unfilled: string[], ms: number}>}
+ * 取值校验失败时 reject 的错误带有 invalid（错误列表）
+ */
+function renderTemplate(templateName, values) {
+    if (!ENABLED) {
+        return Promise.reject(new Error('模板渲染服务未启用'))
+    }
+
+    const current = service || startService()
+    const id = nextRequestId++
+
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            current.pending.delete(id)
+            reject(new Error('模板渲染超时'))
+            // 服务按顺序处理请求，超时说明进程已卡住
+            stopService(current, new Error('模板渲染超时'))
+        }, REQUEST_TIMEOUT)
+
+        current.pending.set(id, { resolve, reject, timer })
+        current.child.stdin.write(JSON.stringify({ id, template: templateName, values }) + '\n')
+    })
+}
+
+/**
+ * 预先启动服务，首个请求无需等待模板加载
+ */
+function warmUp() {
+    if (ENABLED && !service) {
+        startService()
+    }
+}
+
+/**
+ * 结束服务进程
+ */
+function shutdown() {
+    if (service) {
+        service.child.kill()
+    }
+}
+
+process.on('exit', shutdown)
+
+module.exports = {
+    renderTemplate,
+    warmUp,
+    shutdown
+}
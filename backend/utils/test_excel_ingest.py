@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回归测试：excel_ingest.py 的取值与 templateParser.js 逐行解析存入的记录相同。
+期望值取自 templateParser.js 对同样单元格的解析结果，按东八区（TZ=Asia/Shanghai）运行，
+Excel 序列号和 1982.05.10 这类日期与逐行解析一样换算成 UTC 日期（提前一天）
+用法: python -m unittest test_excel_ingest（在 utils 目录下运行）
+"""
+
+import os
+import time
+import datetime
+import tempfile
+import unittest
+
+import openpyxl
+
+import excel_ingest
+from excel_ingest import ingest, format_date, js_parse_int, js_number_string, DEFER
+
+STRICT_HEADERS = ['制单时间', '所属单位', '所属监区', '罪犯姓名', '罪犯编号', '性别', '出生日期', '民族', '文化程度',
+                  '刑种', '罪名', '原判刑期', '刑期起日', '现刑期止日', '适用条款', '严管教育原因', '严管天数',
+                  '严管起日', '严管止日', '业务状态']
+
+def setUpModule():
+    global saved_tz
+    saved_tz = os.environ.get('TZ')
+    os.environ['TZ'] = 'Asia/Shanghai'
+    time.tzset()
+
+def tearDownModule():
+    if saved_tz is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = saved_tz
+    time.tzset()
+
+def column_lists(tables):
+    return {name: {column: excel_ingest.column_values(values) for column, values in table.items()}
+            for name, table in tables.items()}
+
+class ValueRulesTest(unittest.TestCase):
+    def test_format_date(self):
+        cases = [
+            (45672, '2025-01-14'),          # 序列号按本地零点换算成 UTC
+            (45672.75, '2025-01-14'),
+            (60, '1900-02-28'),
+            (0, None),
+            (-1, None),
+            (2958466, None),
+            ('1982.05.10', '1982-05-09'),
+            ('2025.2.30', '2025-03-01'),    # new Date(2025, 1, 30)
+            ('0025.01.01', '1924-12-31'),   # 0-99 年为 1900-1999 年
+            ('2025-01-16', '2025-01-16'),   # ISO 日期按 UTC 解析
+            ('2025-02-30', '2025-03-02'),
+            ('2025-13-01', None),
+            ('2025-01-00', None),
+            (True, None),
+            (None, None),
+        ]
+        for value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(format_date(value), expected)
+
+    def test_other_date_strings_left_to_js(self):
+        for value in ('2025/1/15', '2025年1月15日', ' 2025-01-16', '2025-1-5', '45674', '2025-01-18 08:30:00',
+                      '２０２５.01.01', '0000-01-01'):
+            with self.subTest(value=value):
+                self.assertIs(format_date(value), DEFER)
+
+    def test_parse_int(self):
+        cases = [(30, 30), (7.5, 7), ('15天', 15), (' 12', 12), ('　8', 8), ('0x1A', 26), ('-3', -3),
+                 ('0', None), ('-0', None), ('abc', None), (True, None), (None, None), (1e21, 1), (1.5e-7, 1),
+                 ('１２', None)]
+        for value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(js_parse_int(value), expected)
+
+    def test_number_string(self):
+        cases = [(1004, '1004'), (1004.5, '1004.5'), (1e21, '1e+21'), (1e20, '100000000000000000000'),
+                 (1.5e-7, '1.5e-7'), (0.000001, '0.000001'), (-2.5, '-2.5')]
+        for value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(js_number_string(value), expected)
+
+class IngestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, rows, date_cells=()):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        for r, row in enumerate(rows, 1):
+            for c, value in enumerate(row, 1):
+                if value is not None:
+                    cell = sheet.cell(r, c, value)
+                    if (r, c) in date_cells:
+                        cell.number_format = 'yyyy-mm-dd'
+        path = os.path.join(self.directory.name, name)
+        workbook.save(path)
+        return path
+
+    def strict_row(self, prisoner_id, **values):
+        defaults = {'制单时间': '2025-01-16', '所属单位': ' 测试监狱 ', '罪犯编号': prisoner_id, '原判刑期': '3年6个月',
+                    '严管天数': '15天', '业务状态': '已审核'}
+        defaults.update(values)
+        return [defaults.get(header) for header in STRICT_HEADERS]
+
+    def test_strict_education_keeps_row_parser_values(self):
+        rows = [
+            STRICT_HEADERS,
+            self.strict_row(' EDGE0001 ', 出生日期=datetime.datetime(1990, 1, 1)),
+            self.strict_row(1004, 制单时间=45673, 严管天数=7.5, 业务状态='  '),
+            self.strict_row('   ', 严管起日='1982.05.10'),       # 空白编号在 JS 中为真，保留为 ''
+            self.strict_row(None),                               # 没有编号的行跳过
+            [],
+            self.strict_row('EDGE0005', 制单时间='2025/1/15', 严管天数='0', 业务状态=None, 性别=True, 民族=1),
+        ]
+        path = self.write('严管教育.xlsx', rows, date_cells={(2, 7)})
+        template_type, count, tables, deferred = ingest(path)
+        tables = column_lists(tables)
+
+        self.assertEqual(template_type, 'strict_education')
+        self.assertEqual(count, 4)
+        records, prisoners = tables['records'], tables['prisoners']
+        self.assertEqual(records['prisoner_id'], ['EDGE0001', '1004', '', 'EDGE0005'])
+        self.assertEqual(records['create_date'], ['2025-01-16', '2025-01-15', '2025-01-16', '2025/1/15'])
+        self.assertEqual(deferred, {'records': {'create_date': [3]}})
+        self.assertEqual(records['days'], [15, 7, 15, None])
+        self.assertEqual(records['status'], ['已审核', '  ', '已审核', '待审核'])
+        self.assertEqual(records['start_date'], [None, None, '1982-05-09', None])
+        self.assertEqual(prisoners['birth_date'], ['1989-12-31', None, None, None])
+        # 文字和刑期保留原值，布尔值和数值不合并
+        self.assertEqual(prisoners['prison_unit'], [' 测试监狱 '] * 4)
+        self.assertEqual(prisoners['original_term'], ['3年6个月'] * 4)
+        self.assertEqual(prisoners['gender'], [None, None, None, True])
+        self.assertEqual(prisoners['ethnicity'], [None, None, None, 1])
+
+    def test_mail_sequence_falls_back_to_row_number(self):
+        rows = [
+            ['序号', '开箱日期', '监区', '罪犯名字', '事由', '类别', '备注'],
+            [1, '2025-01-10', '一监区', '测试甲', '家信', '家庭', None],
+            [None, '2025-01-11', '二监区', '测试乙', None, None, None],
+            [None, None, '三监区', None, None, None, None],      # 没有名字和序号的行跳过
+            ['第5号', None, None, None, None, None, None],
+        ]
+        template_type, count, tables, _ = ingest(self.write('信件汇总.xlsx', rows))
+        records = column_lists(tables)['records']
+        self.assertEqual(template_type, 'mail')
+        self.assertEqual(records['sequence_no'], [1, 2, 4])
+        self.assertNotIn('prisoners', tables)
+
+    def test_blacklist_merged_title_row(self):
+        rows = [
+            ['涉黑恶罪犯名单'],
+            ['序号', '罪犯编号', '姓名', '出生日期', '原判刑期', '原判刑期起日', '三涉情况'],
+            [1, 'TEST0007', '周测试', '1979.11.22', '08_00_00', '2020.06.01', '涉恶'],
+        ]
+        template_type, count, tables, _ = ingest(self.write('名单.xlsx', rows))
+        records = column_lists(tables)['records']
+        self.assertEqual(template_type, 'blacklist')
+        self.assertEqual(records['birth_date'], ['1979-11-21'])
+        self.assertEqual(records['original_term'], ['08_00_00'])
+        self.assertEqual(records['term_start'], ['2020-05-31'])
+
+    def test_header_only_file_is_empty(self):
+        _, count, tables, _ = ingest(self.write('严管教育.xlsx', [STRICT_HEADERS]), 'strict_education')
+        self.assertIsNone(count)
+        self.assertEqual(tables, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回归测试：逐段输入的 FieldScanner 与对全文（各段以换行连接）逐个模式 re.search 的结果相同，
+包括关键词和数字分在不同段落、中间隔着空段落或其他段落的情况
+用法: python -m unittest test_field_scanner（在 utils 目录下运行）
+"""
+
+import random
+import re
+import unittest
+
+from parse_criminal_report import FIELD_SPECS, MATCH_SPAN, FieldScanner, to_number
+
+def reference_fields(full_text):
+    """按字段规则表的取值规则，对全文逐个模式 re.search"""
+    data = {}
+    for group, name, sources, kind in FIELD_SPECS:
+        if kind == 'absent':
+            value = sources[0] not in full_text
+        else:
+            value = None
+            for src in sources:
+                match = re.search(src, full_text)
+                value = to_number(match.group(1)) if match else None
+                if value:
+                    break
+        data.setdefault(group, {})[name] = value
+    return data
+
+def scan_paragraphs(paragraphs):
+    scanner = FieldScanner()
+    for paragraph in paragraphs:
+        scanner.feed(paragraph)
+    return scanner.finish()
+
+FRAGMENTS = [
+    '在押罪犯', '1,258', '人', '"法轮功"', '罪犯共', '12', '名', '重大刑事犯', '35',
+    '港澳台', '含港澳台', '3', '5', '名罪犯在担任', '禁闭', '警告', '2', '监狱', '在押',
+    '无罪犯脱逃', '涉黑罪犯', '7', '本月', '情况如下：', ' ', '　', '',
+]
+
+class FieldScannerTest(unittest.TestCase):
+    def assertSameAsFullText(self, paragraphs):
+        self.assertEqual(scan_paragraphs(paragraphs), reference_fields('\n'.join(paragraphs)))
+
+    def test_number_in_later_paragraph(self):
+        # '[^0-9]*' 跨过多个非空段落
+        self.assertSameAsFullText(['"法轮功"罪犯', '情况说明：', '其中', '在册', '12名'])
+
+    def test_blank_paragraphs_between_keyword_and_number(self):
+        self.assertSameAsFullText(['在押罪犯', '', '', '', '1258', '', '人', '重大刑事犯', '', '35', '', '名'])
+
+    def test_number_before_keyword_across_paragraphs(self):
+        self.assertSameAsFullText(['本月有', '5', '', '名罪犯在担任勤杂岗位时违规'])
+
+    def test_long_gap_within_match_span(self):
+        filler = ['情况说明' * 20] * ((MATCH_SPAN - 200) // 81)
+        self.assertSameAsFullText(['"法轮功"罪犯'] + filler + ['12名', '在押罪犯1,258人'])
+
+    def test_random_paragraph_splits(self):
+        rng = random.Random(20240501)
+        for _ in range(500):
+            paragraphs = [''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 4)))
+                          for _ in range(rng.randint(1, 30))]
+            self.assertSameAsFullText(paragraphs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word 97-2003(.doc)文本读取
+纯Python实现，不依赖Office/LibreOffice：
+1. 读取OLE2复合文档，按扇区链按需读取 WordDocument 和 0Table/1Table 流
+2. 根据FIB中的片段表(Clx/PlcPcd)还原正文文本
+3. 根据段落属性(PAPX)中的 sprmPFInTable/sprmPFTtp 区分正文段落、表格单元格和行结束
+逐段返回的格式与 docx_stream.iter_paragraphs 相同。
+"""
+
+import struct
+
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+NOSTREAM = 0xFFFFFFFF
+MAX_REG_SECT = 0xFFFFFFFA
+
+STGTY_STREAM = 2
+
+# FIB 字段偏移
+FIB_IDENT = 0xA5EC
+FIB_FLAG_ENCRYPTED = 0x0100
+FIB_FLAG_WHICH_TBL_STM = 0x0200
+FIB_RGLW_CCP_TEXT = 3
+FIB_RGFCLCB_PLCF_BTE_PAPX = 13
+FIB_RGFCLCB_CLX = 33
+
+# 段落属性
+SPRM_P_F_IN_TABLE = 0x2416
+SPRM_P_F_TTP = 0x2417
+SPRM_P_F_INNER_TTP = 0x244C
+SPRM_P_ITAP = 0x6649
+SPRM_P_HUGE_PAPX = 0x6646
+SPRM_T_DEF_TABLE = 0xD608
+
+FC_COMPRESSED = 0x40000000
+FKP_SIZE = 512
+
+PARAGRAPH_END = '\r'
+CELL_END = '\x07'
+FIELD_BEGIN = '\x13'
+FIELD_SEPARATOR = '\x14'
+FIELD_END = '\x15'
+
+# 需要转换的特殊字符，其余控制字符（图片、脚注引用等占位符）丢弃
+SPECIAL_CHARS = {
+    '\t': '\t',
+    '\x0b': '\n',
+    '\x1e': '-',
+}
+
+def is_ole_file(path):
+    """根据文件头判断是否为OLE2复合文档（.doc），与扩展名无关"""
+    with open(path, 'rb') as f:
+        return f.read(8) == OLE_MAGIC
+
+class CompoundFile:
+    """OLE2复合文档，只支持读取根存储下的流"""
+
+    def __init__(self, f):
+        self.f = f
+        header = self.read_exact(0, 512)
+        if header[:8] != OLE_MAGIC:
+            raise ValueError('不是有效的Word 97-2003文档')
+
+        self.sector_size = 1 << struct.unpack_from('<H', header, 0x1E)[0]
+        self.mini_sector_size = 1 << struct.unpack_from('<H', header, 0x20)[0]
+        first_dir_sector = struct.unpack_from('<I', header, 0x30)[0]
+        self.mini_cutoff = struct.unpack_from('<I', header, 0x38)[0]
+        first_mini_fat_sector = struct.unpack_from('<I', header, 0x3C)[0]
+        first_difat_sector, num_difat_sectors = struct.unpack_from('<II', header, 0x44)
+
+        # FAT所在扇区：头部109个，其余在DIFAT扇区链中
+        fat_sectors = list(struct.unpack_from('<109I', header, 0x4C))
+        per_sector = self.sector_size // 4
+        sector = first_difat_sector
+        for _ in range(num_difat_sectors):
+            if sector > MAX_REG_SECT:
+                break
+            entries = struct.unpack('<%dI' % per_sector, self.read_sector(sector))
+            fat_sectors.extend(entries[:-1])
+            sector = entries[-1]
+
+        fat = []
+        for sector in fat_sectors:
+            if sector > MAX_REG_SECT:
+                continue
+            fat.extend(struct.unpack('<%dI' % per_sector, self.read_sector(sector)))
+        self.fat = fat
+
+        directory = b''.join(self.read_sector(s) for s in self.chain(first_dir_sector))
+        self.entries = [directory[i:i + 128] for i in range(0, len(directory) - 127, 128)]
+
+        root = self.entries[0]
+        self.mini_stream_chain = self.chain(struct.unpack_from('<I', root, 0x74)[0])
+        self.mini_fat = []
+        if first_mini_fat_sector <= MAX_REG_SECT:
+            self.mini_fat = list(struct.unpack(
+                '<%dI' % (per_sector * len(self.chain(first_mini_fat_sector))),
+                b''.join(self.read_sector(s) for s in self.chain(first_mini_fat_sector))
+            ))
+
+        self.streams = self.root_streams()
+
+    def read_exact(self, offset, size):
+        self.f.seek(offset)
+        data = self.f.read(size)
+        if len(data) < size:
+            # 最后一个扇区可能被截短
+            data += b'\x00' * (size - len(data))
+        return data
+
+    def read_sector(self, sector):
+        return self.read_exact((sector + 1) * self.sector_size, self.sector_size)
+
+    def chain(self, start, fat=None):
+        """沿FAT取得扇区链"""
+        fat = self.fat if fat is None else fat
+        sectors = []
+        sector = start
+        while sector <= MAX_REG_SECT:
+            if sector >= len(fat) or len(sectors) > len(fat):
+                raise ValueError('文档扇区链损坏')
+            sectors.append(sector)
+            sector = fat[sector]
+        return sectors
+
+    def root_streams(self):
+        """根存储下的流：名称 -> 目录项（沿红黑树遍历兄弟节点）"""
+        streams = {}
+        child = struct.unpack_from('<I', self.entries[0], 0x4C)[0]
+        pending = [child]
+        seen = set()
+        while pending:
+            sid = pending.pop()
+            if sid == NOSTREAM or sid >= len(self.entries) or sid in seen:
+                continue
+            seen.add(sid)
+            entry = self.entries[sid]
+            name_len = struct.unpack_from('<H', entry, 0x40)[0]
+            name = entry[:max(name_len - 2, 0)].decode('utf-16-le', errors='replace')
+            if entry[0x42] == STGTY_STREAM:
+                streams[name] = entry
+            left, right = struct.unpack_from('<II', entry, 0x44)
+            pending.extend((left, right))
+        return streams
+
+    def open_stream(self, name):
+        entry = self.streams.get(name)
+        if entry is None:
+            raise ValueError(f'文档缺少 {name} 流')
+        start = struct.unpack_from('<I', entry, 0x74)[0]
+        size = struct.unpack_from('<I', entry, 0x78)[0]
+        if size < self.mini_cutoff:
+            return OleStream(self, self.chain(start, self.mini_fat), size, mini=True)
+        return OleStream(self, self.chain(start), size)
+
+class OleStream:
+    """按需读取的流，只读取请求范围内的扇区"""
+
+    def __init__(self, cf, sectors, size, mini=False):
+        self.cf = cf
+        self.sectors = sectors
+        self.size = size
+        self.mini = mini
+        self.unit = cf.mini_sector_size if mini else cf.sector_size
+
+    def read(self, offset, size):
+        size = max(0, min(size, self.size - offset))
+        parts = []
+        while size > 0:
+            index, skip = divmod(offset, self.unit)
+            if index >= len(self.sectors):
+                break
+            take = min(self.unit - skip, size)
+            parts.append(self.read_unit(self.sectors[index], skip, take))
+            offset += take
+            size -= take
+        return b''.join(parts)
+
+    def read_unit(self, sector, skip, take):
+        if not self.mini:
+            return self.cf.read_exact((sector + 1) * self.cf.sector_size + skip, take)
+        # 迷你扇区位于根存储的迷你流中
+        position = sector * self.cf.mini_sector_size + skip
+        index, inner = divmod(position, self.cf.sector_size)
+        big = self.cf.mini_stream_chain[index]
+        return self.cf.read_exact((big + 1) * self.cf.sector_size + inner, take)
+
+def read_fib(word):
+    """读取FIB中需要的字段"""
+    base = word.read(0, 34)
+    ident, n_fib = struct.unpack_from('<HH', base, 0)
+    if ident != FIB_IDENT:
+        raise ValueError('不是有效的Word 97-2003文档')
+    if n_fib < 101:
+        raise ValueError('不支持Word 95及更早版本的文档')
+    flags = struct.unpack_from('<H', base, 0x0A)[0]
+    if flags & FIB_FLAG_ENCRYPTED:
+        raise ValueError('文档已加密，无法解析')
+
+    pos = 32
+    csw = struct.unpack('<H', word.read(pos, 2))[0]
+    pos += 2 + csw * 2
+    cslw = struct.unpack('<H', word.read(pos, 2))[0]
+    rglw = word.read(pos + 2, cslw * 4)
+    pos += 2 + cslw * 4
+    cb_rgfclcb = struct.unpack('<H', word.read(pos, 2))[0]
+    rgfclcb = word.read(pos + 2, cb_rgfclcb * 8)
+
+    def fclcb(index):
+        return struct.unpack_from('<II', rgfclcb, index * 8)
+
+    return {
+        'table_stream': '1Table' if flags & FIB_FLAG_WHICH_TBL_STM else '0Table',
+        'ccp_text': struct.unpack_from('<i', rglw, FIB_RGLW_CCP_TEXT * 4)[0],
+        'clx': fclcb(FIB_RGFCLCB_CLX),
+        'bte_papx': fclcb(FIB_RGFCLCB_PLCF_BTE_PAPX),
+    }
+
+def read_pieces(table, fc, lcb):
+    """读取片段表，返回 [(起始CP, 结束CP, 起始FC, 是否8位压缩)]"""
+    clx = table.read(fc, lcb)
+    pos = 0
+    while pos < len(clx) and clx[pos] == 0x01:
+        # Prc：跳过片段级属性
+        pos += 3 + struct.unpack_from('<h', clx, pos + 1)[0]
+    if pos >= len(clx) or clx[pos] != 0x02:
+        raise ValueError('文档片段表损坏')
+
+    lcb_pcd = struct.unpack_from('<I', clx, pos + 1)[0]
+    plc = clx[pos + 5:pos + 5 + lcb_pcd]
+    count = (len(plc) - 4) // 12
+    cps = struct.unpack_from('<%dI' % (count + 1), plc, 0)
+    pieces = []
+    for i in range(count):
+        fc_value = struct.unpack_from('<I', plc, (count + 1) * 4 + i * 8 + 2)[0]
+        compressed = bool(fc_value & FC_COMPRESSED)
+        fc_value &= ~FC_COMPRESSED
+        if compressed:
+            fc_value //= 2
+        pieces.append((cps[i], cps[i + 1], fc_value, compressed))
+    return pieces
+
+class ParagraphProperties:
+    """按段落标记的FC查找段落是否在表格中、是否为表格行结束"""
+
+    def __init__(self, word, table, fc, lcb, data=None):
+        self.word = word
+        self.data = data
+        self.pages = {}
+        plc = table.read(fc, lcb)
+        count = (len(plc) - 4) // 8 if lcb else 0
+        self.fcs = struct.unpack_from('<%dI' % (count + 1), plc, 0) if count else ()
+        self.pns = [pn & 0x3FFFFF for pn in struct.unpack_from('<%dI' % count, plc, (count + 1) * 4)] if count else []
+
+    def lookup(self, fc):
+        """返回 (是否在表格中, 是否为表格行结束)"""
+        page = self.find_page(fc)
+        if page is None:
+            return False, False
+        rgfc, papx_offsets, data = page
+        for i in range(len(papx_offsets)):
+            if rgfc[i] <= fc < rgfc[i + 1]:
+                return self.parse_papx(data, papx_offsets[i])
+        return False, False
+
+    def find_page(self, fc):
+        lo, hi = 0, len(self.pns)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.fcs[mid + 1] <= fc:
+                lo = mid + 1
+            elif self.fcs[mid] > fc:
+                hi = mid
+            else:
+                return self.load_page(self.pns[mid])
+        return None
+
+    def load_page(self, pn):
+        if pn not in self.pages:
+            data = self.word.read(pn * FKP_SIZE, FKP_SIZE)
+            crun = data[FKP_SIZE - 1]
+            rgfc = struct.unpack_from('<%dI' % (crun + 1), data, 0)
+            offsets = [data[(crun + 1) * 4 + i * 13] * 2 for i in range(crun)]
+            self.pages[pn] = (rgfc, offsets, data)
+        return self.pages[pn]
+
+    def parse_papx(self, data, offset):
+        if offset == 0:
+            return False, False
+        cb = data[offset]
+        if cb:
+            start, size = offset + 1, 2 * cb - 1
+        else:
+            start, size = offset + 2, 2 * data[offset + 1]
+        # 前两个字节是样式序号(istd)，之后是sprm列表
+        return self.parse_grpprl(data[start + 2:start + size])
+
+    def parse_grpprl(self, grpprl, in_table=False, row_end=False):
+        pos = 0
+        while pos + 2 <= len(grpprl):
+            sprm = struct.unpack_from('<H', grpprl, pos)[0]
+            pos += 2
+            operand_size = sprm_operand_size(sprm, grpprl, pos)
+            operand = grpprl[pos:pos + operand_size]
+            if sprm == SPRM_P_F_IN_TABLE and operand:
+                in_table = operand[0] != 0
+            elif sprm == SPRM_P_ITAP and len(operand) >= 4:
+                in_table = in_table or struct.unpack('<i', operand[:4])[0] > 0
+            elif sprm in (SPRM_P_F_TTP, SPRM_P_F_INNER_TTP) and operand:
+                row_end = operand[0] != 0
+            elif sprm == SPRM_P_HUGE_PAPX and len(operand) >= 4 and self.data is not None:
+                # 属性过大时存放在 Data 流中（表格行结束标记常见）
+                data_offset = struct.unpack('<I', operand[:4])[0]
+                cb = struct.unpack('<H', self.data.read(data_offset, 2))[0]
+                in_table, row_end = self.parse_grpprl(self.data.read(data_offset + 2, cb), in_table, row_end)
+            pos += operand_size
+        return in_table, row_end
+
+def sprm_operand_size(sprm, grpprl, pos):
+    """根据sprm的spra位确定操作数长度"""
+    spra = sprm >> 13
+    if spra in (0, 1):
+        return 1
+    if spra in (2, 4, 5):
+        return 2
+    if spra == 3:
+        return 4
+    if spra == 7:
+        return 3
+    # 变长操作数，第一个字节（sprmTDefTable 为前两个字节）是长度
+    if sprm == SPRM_T_DEF_TABLE:
+        return 2 + struct.unpack_from('<H', grpprl, pos)[0] - 1 if pos + 2 <= len(grpprl) else 0
+    return 1 + grpprl[pos] if pos < len(grpprl) else 0
+
+def iter_characters(word, pieces, ccp_text):
+    """按片段逐个返回正文字符及其FC：(字符, fc)"""
+    for cp_start, cp_end, fc, compressed in pieces:
+        if cp_start >= ccp_text:
+            break
+        cp_end = min(cp_end, ccp_text)
+        count = cp_end - cp_start
+        width = 1 if compressed else 2
+        raw = word.read(fc, count * width)
+        text = raw.decode('cp1252', errors='replace') if compressed else raw.decode('utf-16-le', errors='replace')
+        for i, char in enumerate(text):
+            yield char, fc + i * width
+
+def iter_paragraphs(doc_path):
+    """
+    逐段返回 .doc 文档正文文本，格式与 docx_stream.iter_paragraphs 相同：
+    - ('paragraph', text, index)
+    - ('table', text, (表格序号, 行号, 列号))：.doc 中列号为单元格序号
+    域代码只保留显示结果，图片等对象占位符被丢弃。
+    """
+    with open(doc_path, 'rb') as f:
+        cf = CompoundFile(f)
+        word = cf.open_stream('WordDocument')
+        fib = read_fib(word)
+        table = cf.open_stream(fib['table_stream'])
+        pieces = read_pieces(table, *fib['clx'])
+        data = cf.open_stream('Data') if 'Data' in cf.streams else None
+        properties = ParagraphProperties(word, table, *fib['bte_papx'], data=data)
+
+        chars = []
+        # 域嵌套层级：True 表示正处于域代码部分（不输出）
+        fields = []
+        paragraph_count = 0
+        table_count = 0
+        row = col = 0
+        in_table_before = False
+
+        for char, fc in iter_characters(word, pieces, fib['ccp_text']):
+            if char == FIELD_BEGIN:
+                fields.append(True)
+                continue
+            if char == FIELD_SEPARATOR:
+                if fields:
+                    fields[-1] = False
+                continue
+            if char == FIELD_END:
+                if fields:
+                    fields.pop()
+                continue
+            if any(fields) and char not in (PARAGRAPH_END, CELL_END):
+                continue
+
+            if char not in (PARAGRAPH_END, CELL_END):
+                if char in SPECIAL_CHARS:
+                    chars.append(SPECIAL_CHARS[char])
+                elif char >= ' ':
+                    chars.append(char)
+                continue
+
+            text = ''.join(chars)
+            chars = []
+            in_table, row_end = properties.lookup(fc)
+            if char == CELL_END:
+                in_table = True
+
+            if not in_table:
+                in_table_before = False
+                yield 'paragraph', text, paragraph_count
+                paragraph_count += 1
+                continue
+
+            if not in_table_before:
+                # 新表格
+                in_table_before = True
+                table_count += 1
+                row = col = 0
+            if row_end:
+                # 行结束标记不是单元格
+                row += 1
+                col = 0
+                continue
+            yield 'table', text, (table_count - 1, row, col)
+            if char == CELL_END:
+                col += 1
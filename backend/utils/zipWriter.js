@@ -0,0 +1,213 @@
+/**
+ * ZIP 写入
+ * 条目的数据是已经压缩好的字节（deflate 或不压缩），写入时原样复制，不再重新压缩。
+ * 依次写出各条目的本地文件头和数据，最后写中央目录；文件名按 UTF-8 标记，超过 4GB 时自动使用 ZIP64
+ */
+const fs = require('fs')
+const zlib = require('zlib')
+
+const METHOD_STORE = 0
+const METHOD_DEFLATE = 8
+
+const MAX_32 = 0xFFFFFFFF
+const MAX_16 = 0xFFFF
+// 通用标志位 11：文件名为 UTF-8
+const FLAG_UTF8 = 0x0800
+
+let crcTable = null
+
+/**
+ * CRC-32（Node 20.15 起 zlib 自带 crc32，旧版本使用查表计算）
+ * @param {Buffer} data - 数据
+ * @param {number} [value] - 前面数据的 CRC，用于分块计算
+ */
+function crc32(data, value = 0) {
+    if (zlib.crc32) return zlib.crc32(data, value)
+    if (!crcTable) {
+        crcTable = new Int32Array(256)
+        for (let n = 0; n < 256; n++) {
+            let c = n
+            for (let k = 0; k < 8; k++) {
+                c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1
+            }
+            crcTable[n] = c
+        }
+    }
+    let crc = value ^ -1
+    for (let i = 0; i < data.length; i++) {
+        crc = crcTable[(crc ^ data[i]) & 0xFF] ^ (crc >>> 8)
+    }
+    return (crc ^ -1) >>> 0
+}
+
+/**
+ * Date 转为 DOS 日期和时间
+ */
+function dosDateTime(time) {
+    const date = new Date(time)
+    const year = Math.max(1980, date.getFullYear())
+    return {
+        time: (date.getHours() << 11) | (date.getMinutes() << 5) | Math.floor(date.getSeconds() / 2),
+        date: ((year - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate()
+    }
+}
+
+/**
+ * ZIP64 扩展字段，只包含取值超出 32 位的项
+ */
+function zip64Extra(values) {
+    if (values.length === 0) return Buffer.alloc(0)
+    const extra = Buffer.alloc(4 + values.length * 8)
+    extra.writeUInt16LE(0x0001, 0)
+    extra.writeUInt16LE(values.length * 8, 2)
+    values.forEach((value, i) => extra.writeBigUInt64LE(BigInt(value), 4 + i * 8))
+    return extra
+}
+
+/**
+ * 创建 ZIP 写入器
+ * @param {Writable} output - 输出流（文件或 HTTP 响应）
+ */
+function createZipWriter(output) {
+    const central = []
+    let offset = 0
+
+    function write(chunk) {
+        if (output.destroyed) {
+            return Promise.reject(new Error('输出已关闭'))
+        }
+        offset += chunk.length
+        if (output.write(chunk)) return Promise.resolve()
+        return new Promise((resolve, reject) => {
+            const cleanup = () => {
+                output.off('drain', onDrain)
+                output.off('error', onError)
+                output.off('close', onClose)
+            }
+            const onDrain = () => {
+                cleanup()
+                resolve()
+            }
+            const onError = (err) => {
+                cleanup()
+                reject(err)
+            }
+            // 输出被中途关闭（如下载被取消）
+            const onClose = () => onError(new Error('输出已关闭'))
+            output.once('drain', onDrain)
+            output.once('error', onError)
+            output.once('close', onClose)
+        })
+    }
+
+    /**
+     * 写入一个条目
+     * @param {Object} entry - { name, method, crc32, size, compressedSize, time }
+     * @param {Buffer|string} data - 压缩后的数据，或保存压缩后数据的文件路径
+     */
+    async function addEntry(entry, data) {
+        const name = Buffer.from(entry.name, 'utf8')
+        const { time, date } = dosDateTime(entry.time || Date.now())
+        const large = entry.size >= MAX_32 || entry.compressedSize >= MAX_32
+        const headerOffset = offset
+
+        const extra = large ? zip64Extra([entry.size, entry.compressedSize]) : Buffer.alloc(0)
+        const header = Buffer.alloc(30)
+        header.writeUInt32LE(0x04034b50, 0)
+        header.writeUInt16LE(large ? 45 : 20, 4)
+        header.writeUInt16LE(FLAG_UTF8, 6)
+        header.writeUInt16LE(entry.method, 8)
+        header.writeUInt16LE(time, 10)
+        header.writeUInt16LE(date, 12)
+        header.writeUInt32LE(entry.crc32, 14)
+        header.writeUInt32LE(large ? MAX_32 : entry.compressedSize, 18)
+        header.writeUInt32LE(large ? MAX_32 : entry.size, 22)
+        header.writeUInt16LE(name.length, 26)
+        header.writeUInt16LE(extra.length, 28)
+        await write(Buffer.concat([header, name, extra]))
+
+        if (Buffer.isBuffer(data)) {
+            await write(data)
+        } else {
+            for await (const chunk of fs.createReadStream(data)) {
+                await write(chunk)
+            }
+        }
+
+        central.push({ entry, name, time, date, offset: headerOffset })
+    }
+
+    /**
+     * 写出中央目录并结束输出
+     * @returns {Promise<number>} ZIP 文件总大小
+     */
+    async function finish() {
+        const centralOffset = offset
+        for (const { entry, name, time, date, offset: headerOffset } of central) {
+            const values = []
+            if (entry.size >= MAX_32) values.push(entry.size)
+            if (entry.compressedSize >= MAX_32) values.push(entry.compressedSize)
+            if (headerOffset >= MAX_32) values.push(headerOffset)
+            const extra = zip64Extra(values)
+
+            const header = Buffer.alloc(46)
+            header.writeUInt32LE(0x02014b50, 0)
+            header.writeUInt16LE(values.length ? 45 : 20, 4)
+            header.writeUInt16LE(values.length ? 45 : 20, 6)
+            header.writeUInt16LE(FLAG_UTF8, 8)
+            header.writeUInt16LE(entry.method, 10)
+            header.writeUInt16LE(time, 12)
+            header.writeUInt16LE(date, 14)
+            header.writeUInt32LE(entry.crc32, 16)
+            header.writeUInt32LE(Math.min(entry.compressedSize, MAX_32), 20)
+            header.writeUInt32LE(Math.min(entry.size, MAX_32), 24)
+            header.writeUInt16LE(name.length, 28)
+            header.writeUInt16LE(extra.length, 30)
+            header.writeUInt32LE(Math.min(headerOffset, MAX_32), 42)
+            await write(Buffer.concat([header, name, extra]))
+        }
+        const centralSize = offset - centralOffset
+
+        if (central.length >= MAX_16 || centralOffset >= MAX_32 || centralSize >= MAX_32) {
+            // ZIP64 目录结束记录和定位符
+            const zip64Offset = offset
+            const record = Buffer.alloc(56)
+            record.writeUInt32LE(0x06064b50, 0)
+            record.writeBigUInt64LE(44n, 4)
+            record.writeUInt16LE(45, 12)
+            record.writeUInt16LE(45, 14)
+            record.writeBigUInt64LE(BigInt(central.length), 24)
+            record.writeBigUInt64LE(BigInt(central.length), 32)
+            record.writeBigUInt64LE(BigInt(centralSize), 40)
+            record.writeBigUInt64LE(BigInt(centralOffset), 48)
+            const locator = Buffer.alloc(20)
+            locator.writeUInt32LE(0x07064b50, 0)
+            locator.writeBigUInt64LE(BigInt(zip64Offset), 8)
+            locator.writeUInt32LE(1, 16)
+            await write(Buffer.concat([record, locator]))
+        }
+
+        const end = Buffer.alloc(22)
+        end.writeUInt32LE(0x06054b50, 0)
+        end.writeUInt16LE(Math.min(central.length, MAX_16), 8)
+        end.writeUInt16LE(Math.min(central.length, MAX_16), 10)
+        end.writeUInt32LE(Math.min(centralSize, MAX_32), 12)
+        end.writeUInt32LE(Math.min(centralOffset, MAX_32), 16)
+        await write(end)
+
+        await new Promise((resolve, reject) => {
+            output.once('error', reject)
+            output.end(resolve)
+        })
+        return offset
+    }
+
+    return { addEntry, finish }
+}
+
+module.exports = {
+    METHOD_STORE,
+    METHOD_DEFLATE,
+    crc32,
+    createZipWriter
+}
@@ -32,7 +32,7 @@ echo ✓ 安装成功！
 echo ========================================
 echo.
 echo 测试解析器...
-python parse_criminal_report.py "../../muban/XX省XX监狱2025年某月犯情动态.docx"
+python parse_criminal_report.py --pretty "../../muban/XX省XX监狱2025年某月犯情动态.docx"
 
 echo.
 pause